@@ -1,8 +1,12 @@
 from fastapi import APIRouter
-from .endpoints import posts, auth
+from .endpoints import posts, auth, users, metrics, notifications, admin
 
 api_router = APIRouter()
 
 # Include all API endpoints
 api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
-api_router.include_router(posts.router, prefix="/posts", tags=["Posts"]) 
\ No newline at end of file
+api_router.include_router(users.router, prefix="/users", tags=["Users"])
+api_router.include_router(posts.router, prefix="/posts", tags=["Posts"])
+api_router.include_router(notifications.router, prefix="/notifications", tags=["Notifications"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+api_router.include_router(admin.router, prefix="/admin", tags=["Admin"])
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Annotated, Optional
+
+from app.models import User
+from app.core.auth import get_admin_user
+from app.core.dependencies import get_export_service
+from app.services.export_service import EXPORT_ENTITIES, Checkpoint, ExportService
+
+router = APIRouter(
+    tags=["Admin"]
+)
+
+export_service_dependency = Annotated[ExportService, Depends(get_export_service)]
+
+# Export Data Endpoint
+@router.get("/export")
+def export_data(
+    service: export_service_dependency,
+    admin: User = Depends(get_admin_user),
+    entities: List[str] = Query(list(EXPORT_ENTITIES)),
+    cursor: Optional[str] = None,
+    gzip: bool = False,
+):
+    """
+    Export posts, likes, retweets and follows as NDJSON
+     entities : which tables to export, in order (repeat the parameter for several)
+     cursor : resume right after the checkpoint line that carried this cursor
+     gzip : compress the stream; the body is a .ndjson.gz file
+    Streams one JSON object per line with a "type" field, checkpoint lines every
+    EXPORT_CHECKPOINT_ROWS rows and a final "done" line
+    Returns the streaming response
+    """
+    chunks = service.export(entities, cursor, gzip)
+    body = (chunk for chunk in chunks if not isinstance(chunk, Checkpoint))
+    if gzip:
+        return StreamingResponse(
+            body,
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="export.ndjson.gz"'},
+        )
+    return StreamingResponse(body, media_type="application/x-ndjson")
@@ -1,14 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from jose import JWTError
+from typing import Optional
 
-from app.core.security import create_access_token, get_password_hash
-from app.core.auth import authenticate_user, get_current_user
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    get_password_hash,
+    REFRESH_TOKEN_TYPE,
+)
+from app.core.auth import authenticate_user, get_current_user, get_token_payload, verify_token
 from app.core.config import get_settings
-from app.core.dependencies import get_db
-from app.schemas import Token, UserCreate, User
-from app.models import User as UserModel
+from app.core.database import replica_router
+from app.core.dependencies import get_db, get_user_repository
+from app.core.exceptions import (
+    raise_conflict_exception,
+    raise_bad_request_exception,
+    raise_forbidden_exception,
+    raise_unauthorized_exception,
+)
+from app.core.rate_limit import limit_login, limit_register
+from app.core.revocation import revocation_list
+from app.schemas import Token, TokenRefresh, UserCreate, User
+from app.repositories.user_repository import UserRepository
 
 settings = get_settings()
 router = APIRouter()
@@ -20,46 +38,49 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     """
     return current_user
 
-@router.post("/register", response_model=User)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+@router.post("/register", response_model=User, dependencies=[Depends(limit_register)])
+def register_user(user: UserCreate, repo: UserRepository = Depends(get_user_repository)):
     """
     Register a new user
+    A sync endpoint, so bcrypt and the INSERT run in the threadpool, off the event loop
+    Inserts the user with a single INSERT and lets the unique indexes on
+    username and email detect conflicts, even between concurrent registrations
+    Returns the new user
     """
-    # Check if username already exists
-    db_user = db.query(UserModel).filter(UserModel.username == user.username).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Username already registered"
-        )
-    
-    # Check if email already exists
-    db_user = db.query(UserModel).filter(UserModel.email == user.email).first()
-    if db_user:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Email already registered"
-        )
-    
-    # Create new user
     hashed_password = get_password_hash(user.password)
-    db_user = UserModel(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    try:
+        db_user = repo.create(
+            username=user.username,
+            email=user.email,
+            hashed_password=hashed_password
+        )
+    except IntegrityError as e:
+        repo.db.rollback()
+        if repo.conflicting_field(e) == "email":
+            raise_conflict_exception("Email already registered")
+        raise_conflict_exception("Username already registered")
+
+    # The new account's first authenticated reads must not hit a replica that hasn't caught up
+    replica_router.mark_write([f"user:{db_user.username}"])
     return db_user
 
-@router.post("/token", response_model=Token)
-async def login_for_access_token(
+def _issue_tokens(username: str) -> dict:
+    access_token = create_access_token(
+        data={"sub": username},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_refresh_token(data={"sub": username})
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/token", response_model=Token, dependencies=[Depends(limit_login)])
+def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     """
     OAuth2 compatible token login, get an access token for future requests
+    A sync endpoint, so the bcrypt check runs in the threadpool, off the event loop
+    Also returns a refresh token that can be exchanged for new tokens without the password
     """
     user = authenticate_user(db, form_data.username, form_data.password)
     if not user:
@@ -68,11 +89,45 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username},
-        expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"} 
\ No newline at end of file
+
+    return _issue_tokens(user.username)
+
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(body: TokenRefresh, db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access and refresh token pair
+    Skips password verification, so short-lived access tokens stay cheap to renew
+    Revokes the presented refresh token so each one can only be used once: new
+    tokens are issued only after its revocation row was committed, and a token
+    someone else revoked first (even a moment ago, in another worker) gets a 401
+    """
+    revocation_list.sync(db)
+    payload = verify_token(body.refresh_token, REFRESH_TOKEN_TYPE)
+    if not revocation_list.revoke(db, payload["jti"], payload["exp"]):
+        raise_unauthorized_exception("Refresh token has already been used")
+    return _issue_tokens(payload["sub"])
+
+@router.post("/logout", status_code=204)
+def logout(
+    db: Session = Depends(get_db),
+    payload: dict = Depends(get_token_payload),
+    body: Optional[TokenRefresh] = None,
+):
+    """
+    Revoke the current access token, and the refresh token if one is given
+    The refresh token is checked first, so a rejected logout revokes nothing
+    Returns nothing
+    """
+    refresh_payload = None
+    if body is not None:
+        try:
+            refresh_payload = decode_token(body.refresh_token, REFRESH_TOKEN_TYPE)
+        except JWTError:
+            raise_bad_request_exception("Invalid refresh token")
+        if refresh_payload.get("sub") != payload["sub"]:
+            raise_forbidden_exception("Refresh token belongs to another user")
+    if payload.get("jti"):
+        revocation_list.revoke(db, payload["jti"], payload["exp"])
+    if refresh_payload is not None:
+        revocation_list.revoke(db, refresh_payload["jti"], refresh_payload["exp"])
+    return
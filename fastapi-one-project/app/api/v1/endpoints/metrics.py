@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from app.core.metrics import metrics
+
+router = APIRouter()
+
+# Get Metrics Endpoint
+@router.get("/", response_model=dict)
+def read_metrics():
+    """
+    Get process metrics
+    Returns a snapshot of the counters and gauges recorded by this worker
+    """
+    return metrics.snapshot()
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Annotated, Optional
+
+from app.models import User
+from app.schemas import Notification as NotificationSchema, UnreadCount
+from app.core.auth import get_current_user
+from app.core.dependencies import get_notification_service, get_read_notification_service
+from app.core.rate_limit import limit_writes
+from app.services.notification_service import NotificationService
+
+router = APIRouter(
+    tags=["Notifications"]
+)
+
+service_dependency = Annotated[NotificationService, Depends(get_notification_service)]
+read_service_dependency = Annotated[NotificationService, Depends(get_read_notification_service)]
+
+# Get Notifications Endpoint
+@router.get("/", response_model=List[NotificationSchema])
+def read_notifications(
+    service: read_service_dependency,
+    current_user: User = Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[int] = None,
+):
+    """
+    Get the current user's notifications
+     limit : is the number of notifications to return
+     before : only return notifications older than this sort_key (pass the last sort_key of the previous page)
+    Orders the notifications by latest activity in descending order
+    Returns the notifications
+    """
+    return service.get_inbox(current_user.id, limit, before)
+
+# Get Unread Count Endpoint
+@router.get("/unread_count", response_model=UnreadCount)
+def read_unread_count(
+    service: read_service_dependency,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Get the number of unread notifications
+    Reads the user's counter row instead of counting notifications
+    Returns the unread count
+    """
+    return {"unread": service.unread_count(current_user.id)}
+
+# Mark Notifications Read Endpoint
+@router.post("/read", response_model=UnreadCount, dependencies=[Depends(limit_writes)])
+def mark_notifications_read(
+    service: service_dependency,
+    current_user: User = Depends(get_current_user),
+    up_to: Optional[int] = None,
+):
+    """
+    Mark notifications as read
+    Takes an optional up_to sort_key; without it every notification is marked read
+    Returns the unread count left
+    """
+    return {"unread": service.mark_read(current_user.id, up_to)}
@@ -1,40 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Annotated
-from datetime import timedelta, datetime, timezone
+from fastapi import APIRouter, Depends, Query
+from typing import List, Annotated, Optional
 
-from app.models import Post, User, Like, Retweet
-from app.schemas import Post as PostSchema, PostCreate, PostUpdate, PostWithCounts
+from app.models import User
+from app.schemas import (
+    Post as PostSchema,
+    PostCreate,
+    PostRevision,
+    PostUpdate,
+    PostWithCounts,
+    ScheduledPost,
+    ScheduledPostCreate,
+    TimelineEntry,
+)
 from app.core.auth import get_current_user
-from app.core.dependencies import get_db
-from app.core.exceptions import raise_not_found_exception, raise_forbidden_exception
+from app.core.dependencies import get_feed_service, get_post_service, get_read_post_service, get_scheduled_post_service
+from app.core.rate_limit import limit_writes
+from app.services.feed_service import FeedService
+from app.services.post_service import PostService
+from app.services.scheduled_post_service import ScheduledPostService
 
 router = APIRouter(
     tags=["Posts"]
 )
 
-db_dependency = Annotated[Session, Depends(get_db)]
+service_dependency = Annotated[PostService, Depends(get_post_service)]
+read_service_dependency = Annotated[PostService, Depends(get_read_post_service)]
+feed_service_dependency = Annotated[FeedService, Depends(get_feed_service)]
+scheduled_service_dependency = Annotated[ScheduledPostService, Depends(get_scheduled_post_service)]
 
 # Get Posts Endpoint
 @router.get("/", response_model=List[PostSchema])
-def read_posts(db: db_dependency, skip: int = 0, limit: int = 10):
+def read_posts(
+    service: read_service_dependency,
+    skip: int = 0,
+    limit: int = 10,
+    before: Optional[int] = None,
+):
     """
     Get posts
      skip : is the number of posts to skip, means the number of posts to skip from the beginning
      limit : is the number of posts to return
-    Takes the skip and limit parameters to paginate the posts
-    Orders the posts by timestamp in descending order
+     before : only return posts older than this post id (pass the last id of the previous page)
+    Takes the skip, limit and before parameters to paginate the posts
+    Orders the posts by id (creation order) in descending order
     Returns the posts
     """
-    posts = db.query(Post).order_by(Post.timestamp.desc()).offset(skip).limit(limit).all()
-    return posts
+    return service.get_posts(skip, limit, before)
+
+# Get Timeline Endpoint
+@router.get("/timeline/", response_model=List[TimelineEntry])
+def read_timeline(
+    service: read_service_dependency,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[int] = None,
+):
+    """
+    Get the timeline
+     limit : is the number of entries to return
+     before : only return entries older than this event_id (pass the last event_id of the previous page)
+    Interleaves posts and retweets by time, newest first
+    Shows each post once, at its most recent retweet
+    Returns the timeline entries
+    """
+    return service.get_timeline(limit, before)
+
+# Get For You Feed Endpoint
+@router.get("/for_you/", response_model=List[PostWithCounts])
+def read_for_you(
+    service: feed_service_dependency,
+    current_user: User = Depends(get_current_user),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Get the ranked "For You" feed
+     skip : is the number of posts to skip in the ranking
+     limit : is the number of posts to return
+    Takes the current user and the skip and limit parameters
+    Ranks recent posts of followed users and trending posts by recency,
+    like/retweet velocity and how often the current user engages with the author
+    Returns the posts with counts, best first
+    """
+    return service.get_for_you(current_user.id, skip, limit)
 
 # Create New Post Endpoint
-@router.post("/", response_model=PostSchema)
+@router.post("/", response_model=PostSchema, dependencies=[Depends(limit_writes)])
 def create_new_post(
     post: PostCreate,
-    db: db_dependency,
+    service: service_dependency,
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -43,25 +96,59 @@ def create_new_post(
     Creates a new post in the database
     Returns the new post
     """
-    db_post = Post(content=post.content, owner_id=current_user.id)
-    db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
-    
-    # Add owner_username to response
-    return {
-        "id": db_post.id,
-        "content": db_post.content,
-        "timestamp": db_post.timestamp,
-        "owner_id": db_post.owner_id,
-        "owner_username": current_user.username
-    }
+    return service.create_post(current_user.id, post)
+
+# Schedule Post Endpoint
+@router.post("/scheduled/", response_model=ScheduledPost, status_code=201, dependencies=[Depends(limit_writes)])
+def schedule_post(
+    scheduled_create: ScheduledPostCreate,
+    service: scheduled_service_dependency,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Schedule a post
+    Takes the content of the post and the publish_at time to publish it at
+    Checks that publish_at is in the future and not too far ahead
+    Stores the post until then; at publish_at it is published like a new post
+    Returns the scheduled post
+    """
+    return service.schedule_post(current_user.id, scheduled_create)
+
+# Get Scheduled Posts Endpoint
+@router.get("/scheduled/", response_model=List[ScheduledPost])
+def read_scheduled_posts(
+    service: scheduled_service_dependency,
+    current_user: User = Depends(get_current_user),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Get the current user's scheduled posts
+    Takes the limit parameter
+    Returns the posts not published yet, the next to go out first
+    """
+    return service.get_scheduled_posts(current_user.id, limit)
+
+# Cancel Scheduled Post Endpoint
+@router.delete("/scheduled/{scheduled_id}", status_code=204, dependencies=[Depends(limit_writes)])
+def cancel_scheduled_post(
+    scheduled_id: int,
+    service: scheduled_service_dependency,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Cancel a scheduled post
+    Takes the scheduled_id of the post to cancel
+    Checks that it belongs to the current user and has not been published
+    Returns nothing
+    """
+    service.cancel_scheduled_post(scheduled_id, current_user.id)
+    return
 
 # Delete Existing Post Endpoint
-@router.delete("/{post_id}", response_model=dict)
-async def delete_existing_post(
+@router.delete("/{post_id}", response_model=dict, dependencies=[Depends(limit_writes)])
+def delete_existing_post(
     post_id: int,
-    db: db_dependency,
+    service: service_dependency,
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -69,74 +156,55 @@ async def delete_existing_post(
     Takes the post_id of the post to delete
     Checks if the post exists in the database
     Checks if the post belongs to the current user
-    Deletes the post from the database
+    Marks the post deleted (sets deleted_at), so reads skip it at once
+    Queues a purge job that removes it with its likes and retweets
     Returns a success message
     """
-    try:
-        # Get the post
-        post = db.query(Post).filter(Post.id == post_id).first()
-        
-        # Check if post exists
-        if post is None:
-            raise_not_found_exception('Post not found')
-            
-        # Check if user owns the post
-        if post.owner_id != current_user.id:
-            raise_forbidden_exception('Not authorized to delete this post')
-        
-        # Delete the post
-        db.delete(post)
-        db.commit()
-        
-        return {"status": "success", "message": "Post deleted successfully"}
-        
-    except Exception as e:
-        db.rollback()
-        if isinstance(e, HTTPException):
-            raise e
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    service.delete_post(post_id, current_user.id)
+    return {"status": "success", "message": "Post deleted successfully"}
 
 # Update Post Endpoint
-@router.put("/{post_id}", response_model=PostSchema)
+@router.put("/{post_id}", response_model=PostSchema, dependencies=[Depends(limit_writes)])
 def update_post(
     post_id: int,
     post_update: PostUpdate,
-    db: db_dependency,
+    service: service_dependency,
     current_user: User = Depends(get_current_user),
 ):
     """
     Update an existing post
     Takes the post_id of the post to update
     Takes the post_update data from the request body
-    Checks if the post exists in the database
-    Checks if the post belongs to the current user
-    Updates the post in the database
+    Updates the post only if it exists, belongs to the current user and is within
+    the 10-minute edit window, all in one statement
+    Records the replaced content as a revision
     Returns the updated post
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
-        raise_not_found_exception('Post not found')
-    if post.owner_id != current_user.id:
-        raise_forbidden_exception('Not authorized to edit this post')
+    return service.update_post(post_id, current_user.id, post_update)
 
-    # Check if the post is within the 10-minute edit window
-    post_timestamp_aware = post.timestamp.replace(tzinfo=timezone.utc)
-    time_since_creation = datetime.now(timezone.utc) - post_timestamp_aware
-    if time_since_creation > timedelta(minutes=10):
-        raise_not_found_exception("You can only edit a post within 10 minutes of its creation")
-    post.content = post_update.content
-    db.add(post)
-    db.commit()
-    return post
+# Get Post Revisions Endpoint
+@router.get("/{post_id}/revisions", response_model=List[PostRevision])
+def read_post_revisions(
+    post_id: int,
+    service: read_service_dependency,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[int] = None,
+):
+    """
+    Get the edit history of a post
+     limit : is the number of revisions to return
+     before : only return revisions older than this revision id (pass the last id of the previous page)
+    Checks if the post exists in the database
+    Each revision is the content an edit replaced, newest first
+    Returns the revisions
+    """
+    return service.get_revisions(post_id, limit, before)
 
 # Like Post Endpoint
-@router.post("/{post_id}/like", status_code=204)
+@router.post("/{post_id}/like", status_code=204, dependencies=[Depends(limit_writes)])
 def like_post(
     post_id: int,
-    db: db_dependency,
+    service: service_dependency,
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -147,44 +215,31 @@ def like_post(
     Adds the post to the current user's liked posts
     Returns nothing
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if post is None:
-        raise_not_found_exception('Post not found')
-    like = db.query(Like).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if like:
-        raise_not_found_exception("Already liked")
-    new_like = Like(user_id=current_user.id, post_id=post_id)
-    db.add(new_like)
-    db.commit()
+    service.like_post(post_id, current_user.id)
     return
 
 # Unlike Post Endpoint
-@router.post("/{post_id}/unlike", status_code=204)
+@router.post("/{post_id}/unlike", status_code=204, dependencies=[Depends(limit_writes)])
 def unlike_post(
     post_id: int,
-    db: db_dependency,
+    service: service_dependency,
     current_user: User = Depends(get_current_user),
 ):
     """
     Unlike a post
     Takes the post_id of the post to unlike
-    Checks if the post exists in the database
     Checks if the post is liked by the current user
     Removes the post from the current user's liked posts
     Returns nothing
     """
-    like = db.query(Like).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if not like:
-        raise_not_found_exception("Not liked yet")
-    db.delete(like)
-    db.commit()
+    service.unlike_post(post_id, current_user.id)
     return
 
 # Retweet Post Endpoint
-@router.post("/{post_id}/retweet", status_code=204)
+@router.post("/{post_id}/retweet", status_code=204, dependencies=[Depends(limit_writes)])
 def retweet_post(
     post_id: int,
-    db: db_dependency,
+    service: service_dependency,
     current_user: User = Depends(get_current_user),
 ):
     """
@@ -195,98 +250,40 @@ def retweet_post(
     Adds the post to the current user's retweeted posts
     Returns nothing
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if post is None:
-        raise_not_found_exception('Post not found')
-    retweet = db.query(Retweet).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if retweet:
-        raise_not_found_exception("Already retweeted")
-    new_retweet = Retweet(user_id=current_user.id, post_id=post_id)
-    db.add(new_retweet)
-    db.commit()
+    service.retweet_post(post_id, current_user.id)
     return
 
 # Unretweet Post Endpoint
-@router.post("/{post_id}/unretweet", status_code=204)
+@router.post("/{post_id}/unretweet", status_code=204, dependencies=[Depends(limit_writes)])
 def unretweet_post(
     post_id: int,
-    db: db_dependency,
+    service: service_dependency,
     current_user: User = Depends(get_current_user),
 ):
     """
     Unretweet a post
     Takes the post_id of the post to unretweet
-    Checks if the post exists in the database
     Checks if the post is retweeted by the current user
     Removes the post from the current user's retweeted posts
     Returns nothing
     """
-    retweet = db.query(Retweet).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if not retweet:
-        raise_not_found_exception("Not retweeted yet")
-    db.delete(retweet)
-    db.commit()
+    service.unretweet_post(post_id, current_user.id)
     return
 
 # Get Posts with Counts Endpoint
 @router.get("/with_counts/", response_model=List[PostWithCounts])
 def read_posts_with_counts(
-    db: db_dependency,
-    current_user: User = Depends(get_current_user)
+    service: read_service_dependency,
+    current_user: User = Depends(get_current_user),
+    skip: int = 0,
+    limit: int = 100,
+    before: Optional[int] = None,
 ):
     """
     Get posts with counts
-    Takes the db dependency and current user
-    Creates a subquery to count the number of likes for each post
-    Creates a subquery to count the number of retweets for each post
-    Fetches the posts along with their like/retweet counts and owner username
+    Takes the current user and the skip, limit and before parameters
+    Fetches a page of posts along with their like/retweet counts, owner username
+    and whether the current user owns them, in a single query
     Returns the posts with counts and owner username
     """
-    likes_subq = (
-        db.query(
-            Like.post_id,
-            func.count(Like.user_id).label('likes_count')
-        )
-        .group_by(Like.post_id)
-        .subquery()
-    )
-
-    retweets_subq = (
-        db.query(
-            Retweet.post_id,
-            func.count(Retweet.user_id).label('retweets_count')
-        )
-        .group_by(Retweet.post_id)
-        .subquery()
-    )
-
-    posts = (
-        db.query(
-            Post,
-            User.username.label('owner_username'),
-            func.coalesce(likes_subq.c.likes_count, 0).label('likes_count'),
-            func.coalesce(retweets_subq.c.retweets_count, 0).label('retweets_count')
-        )
-        .join(User, Post.owner_id == User.id)
-        .outerjoin(likes_subq, Post.id == likes_subq.c.post_id)
-        .outerjoin(retweets_subq, Post.id == retweets_subq.c.post_id)
-        .order_by(Post.timestamp.desc())
-        .all()
-    )
-
-    response_posts = []
-    for post, owner_username, likes_count, retweets_count in posts:
-        response_posts.append(PostWithCounts(
-            id=post.id,
-            content=post.content,
-            timestamp=post.timestamp,
-            owner_id=post.owner_id,  # Make sure owner_id is included
-            owner_username=owner_username,
-            likes_count=likes_count,
-            retweets_count=retweets_count,
-            is_owner=post.owner_id == current_user.id  # Add is_owner flag
-        ))
-
-    return response_posts
-
-
+    return service.get_posts_with_counts(current_user.id, skip, limit, before)
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Annotated, Optional
+
+from app.models import User
+from app.schemas import Post as PostSchema, UserProfile
+from app.core.auth import get_current_user
+from app.core.dependencies import get_profile_service, get_read_profile_service
+from app.core.rate_limit import limit_writes
+from app.services.profile_service import ProfileService
+
+router = APIRouter(
+    tags=["Users"]
+)
+
+service_dependency = Annotated[ProfileService, Depends(get_profile_service)]
+read_service_dependency = Annotated[ProfileService, Depends(get_read_profile_service)]
+
+# Get User Profile Endpoint
+@router.get("/{username}", response_model=UserProfile)
+def read_user_profile(
+    username: str,
+    service: read_service_dependency,
+):
+    """
+    Get a user's profile
+    Takes the username
+    Reads the post, follower, following and likes counts from user_stats
+    Returns the profile
+    """
+    return service.get_profile(username)
+
+# Get User Posts Endpoint
+@router.get("/{username}/posts", response_model=List[PostSchema])
+def read_user_posts(
+    username: str,
+    service: read_service_dependency,
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[int] = None,
+):
+    """
+    Get a user's posts
+     limit : is the number of posts to return
+     before : only return posts older than this post id (pass the last id of the previous page)
+    Orders the posts by id (creation order) in descending order
+    Returns the posts
+    """
+    return service.get_user_posts(username, limit, before)
+
+# Follow User Endpoint
+@router.post("/{username}/follow", status_code=204, dependencies=[Depends(limit_writes)])
+def follow_user(
+    username: str,
+    service: service_dependency,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Follow a user
+    Takes the username
+    Checks if the user exists and is not already followed
+    Updates both users' counters in the same transaction
+    Returns nothing
+    """
+    service.follow(current_user.id, username)
+    return
+
+# Unfollow User Endpoint
+@router.post("/{username}/unfollow", status_code=204, dependencies=[Depends(limit_writes)])
+def unfollow_user(
+    username: str,
+    service: service_dependency,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Unfollow a user
+    Takes the username
+    Checks if the user is followed
+    Returns nothing
+    """
+    service.unfollow(current_user.id, username)
+    return
@@ -0,0 +1,124 @@
+import argparse
+import gzip
+import json
+import time
+from contextlib import nullcontext
+
+from .core.config import get_settings
+from .core.database import SessionLocal, create_tables, get_engine
+from .core.ids import default_worker_id
+from .core.sharding import shard_router
+from .core.worker_lease import worker_id_lease
+from .jobs import enqueue
+from .repositories.sharded_post_repository import open_post_repository
+from .repositories.user_repository import UserRepository
+from .services.bulk_loader import BulkLoader
+from .services.export_service import EXPORT_ENTITIES, ExportService, export_to_file
+from .services.profile_service import REBUILD_CHUNK_SIZE, ProfileService
+
+
+def rebuild_user_stats(args) -> None:
+    with SessionLocal() as db:
+        if args.enqueue:
+            # Picked up by the app's job worker, one chunk per job
+            enqueue(db, "rebuild_user_stats", {"chunk_size": args.chunk_size})
+            db.commit()
+            print("Queued a user_stats rebuild")
+            return
+        with open_post_repository(db, shard_router) as posts:
+            rebuilt = ProfileService(UserRepository(db), posts).rebuild_all_stats(args.chunk_size)
+    print(f"Rebuilt user_stats for {rebuilt} users")
+
+
+def export_data(args) -> None:
+    settings = get_settings()
+    service = ExportService(
+        SessionLocal,
+        shard_router,
+        batch_size=settings.EXPORT_BATCH_SIZE,
+        checkpoint_rows=settings.EXPORT_CHECKPOINT_ROWS,
+    )
+    export_to_file(service, args.output, args.entities, compress=args.gzip, resume=args.resume)
+    print(f"Exported {', '.join(args.entities)} to {args.output}")
+
+
+def _read_records(path: str):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+class _ProgressPrinter:
+    # At most one line per table per second, so large loads don't flood the terminal
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._printed = {}
+
+    def __call__(self, table: str, rows: int, seconds: float) -> None:
+        now = time.monotonic()
+        if now - self._printed.get(table, 0) >= self.interval:
+            self._printed[table] = now
+            print(f"{table}: {rows} rows ({rows / max(seconds, 1e-9):,.0f} rows/s overall)")
+
+
+def _worker_id():
+    # Like the app: a configured SNOWFLAKE_WORKER_ID is checked, otherwise a free id is leased for the command
+    if get_settings().SNOWFLAKE_WORKER_ID is not None:
+        default_worker_id()
+        return nullcontext()
+    return worker_id_lease.hold()
+
+
+def load_data(args) -> None:
+    create_tables()
+    shard_router.create_tables()
+    loader = BulkLoader(
+        get_engine(),
+        shard_router,
+        chunk_size=args.chunk_size,
+        hash_workers=args.hash_workers,
+        defer_indexes=not args.keep_indexes,
+        share_password_hashes=args.share_password_hashes,
+        rebuild_stats=not args.skip_stats,
+        progress=_ProgressPrinter(),
+    )
+    # Posts without an id or timestamp and every retweet take a snowflake id from the column default
+    with _worker_id():
+        report = loader.load(_read_records(args.input))
+    loaded = ", ".join(f"{count} {table}" for table, count in report.rows.items() if count)
+    print(f"Loaded {loaded or 'nothing'} in {report.seconds:.1f}s ({report.rows_per_second * 60:,.0f} rows/min)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-user-stats", help="Recompute profile counters from the source tables")
+    rebuild.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE, help="Users per committed chunk")
+    rebuild.add_argument("--enqueue", action="store_true", help="Queue the rebuild as a job instead of running it here")
+    rebuild.set_defaults(handler=rebuild_user_stats)
+
+    export = commands.add_parser("export", help="Stream posts, likes, retweets and follows to an NDJSON file")
+    export.add_argument("output", help="File to write (use a .ndjson.gz name with --gzip)")
+    export.add_argument("--entities", nargs="+", choices=EXPORT_ENTITIES, default=list(EXPORT_ENTITIES))
+    export.add_argument("--gzip", action="store_true", help="Compress the output")
+    export.add_argument("--resume", action="store_true", help="Continue an interrupted export from its last checkpoint")
+    export.set_defaults(handler=export_data)
+
+    load = commands.add_parser("load", help="Bulk load users, posts, follows, likes and retweets from an NDJSON file")
+    load.add_argument("input", help="NDJSON records with a type field, as written by export (.gz is decompressed)")
+    load.add_argument("--chunk-size", type=int, default=5000, help="Rows per executemany and transaction")
+    load.add_argument("--hash-workers", type=int, help="Password hashing processes (default: one per CPU)")
+    load.add_argument("--keep-indexes", action="store_true", help="Maintain secondary indexes during the load (small top-ups)")
+    load.add_argument("--share-password-hashes", action="store_true", help="Hash each distinct password once (fixture data only)")
+    load.add_argument("--skip-stats", action="store_true", help="Don't rebuild user_stats after the load")
+    load.set_defaults(handler=load_data)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Optional, Sequence
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .metrics import metrics
+from .response_cache import UNSAFE_METHODS
+
+READ_METHODS = ("GET", "HEAD")
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    At most limit requests run at once; up to max_queue more wait in FIFO order
+    A request is shed instead of queued when the queue is full or when the expected
+    wait (from the recent service time) is already past max_wait_seconds, and a queued
+    request is shed once it has waited max_wait_seconds. Shedding early keeps latency
+    bounded for the requests that are admitted instead of letting every one time out.
+    Not thread-safe: it belongs to the event loop serving the worker's requests.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait_seconds: float, clock=time.monotonic):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self.service_seconds = 0.0  # Moving average of how long an admitted request holds its slot
+        self._clock = clock
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self) -> float:
+        # Everyone ahead of us, drained limit at a time
+        return (self.queue_depth + 1) * self.service_seconds / max(1, self.limit)
+
+    async def acquire(self) -> float:
+        """
+        Waits for a slot and returns when it was granted (pass it to release)
+        Raises Overloaded when the request should be shed
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return self._clock()
+        if self.queue_depth >= self.max_queue:
+            raise self._shed("queue_full")
+        if self.expected_wait() > self.max_wait_seconds:
+            raise self._shed("deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            await asyncio.wait_for(waiter, self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            self._remove(waiter)
+            raise self._shed("timeout")
+        except BaseException:
+            # Cancelled (the client went away); hand on a slot we were given but won't use
+            if waiter.done() and not waiter.cancelled():
+                self.release(self._clock())
+            else:
+                self._remove(waiter)
+            raise
+        return self._clock()
+
+    def release(self, started: float) -> None:
+        elapsed = self._clock() - started
+        self.service_seconds = elapsed if not self.service_seconds else 0.8 * self.service_seconds + 0.2 * elapsed
+        # The slot passes straight to the oldest waiter, so in_flight stays the same
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._publish()
+                return
+        self.in_flight -= 1
+        self._publish()
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._publish()
+
+    def _shed(self, reason: str) -> Overloaded:
+        metrics.increment("admission_shed_total", pool=self.name, reason=reason)
+        # Roughly when a slot should be free again
+        return Overloaded(reason, max(self.expected_wait(), self.service_seconds))
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission_in_flight", self.in_flight, pool=self.name)
+        metrics.set_gauge("admission_queue_depth", self.queue_depth, pool=self.name)
+
+
+class AdmissionControlMiddleware:
+    """
+    Runs database-bound requests through a read pool (GET, HEAD) and a write pool
+    Writes get their own, smaller pool: SQLite has a single writer, so extra
+    concurrent writes only queue on its lock while holding a worker thread, and
+    a burst of them must not starve reads. Writes under auth_paths (login, token
+    refresh) are CPU-bound bcrypt and JWT work rather than database writes, so they
+    go through the auth pool instead, when one is given, and neither starves the
+    other. Shed requests get a 503 with Retry-After.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        read: ConcurrencyLimiter,
+        write: ConcurrencyLimiter,
+        paths: Sequence[str],
+        exclude_paths: Sequence[str] = (),
+        auth: Optional[ConcurrencyLimiter] = None,
+        auth_paths: Sequence[str] = (),
+    ):
+        self.app = app
+        self.read = read
+        self.write = write
+        self.paths = tuple(paths)
+        self.exclude_paths = tuple(exclude_paths)
+        self.auth = auth
+        self.auth_paths = tuple(auth_paths)
+
+    def _limiter(self, scope: Scope) -> Optional[ConcurrencyLimiter]:
+        path = scope["path"]
+        if not path.startswith(self.paths) or path.startswith(self.exclude_paths):
+            return None
+        if scope["method"] in READ_METHODS:
+            return self.read
+        if scope["method"] in UNSAFE_METHODS:
+            if self.auth is not None and path.startswith(self.auth_paths):
+                return self.auth
+            return self.write
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = self._limiter(scope) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            started = await limiter.acquire()
+        except Overloaded as exc:
+            metrics.increment("admission_requests_total", pool=limiter.name, result="shed")
+            response = JSONResponse(
+                {"detail": "Server is overloaded, please retry later"},
+                status_code=503,
+                headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+            )
+            await response(scope, receive, send)
+            return
+        metrics.increment("admission_requests_total", pool=limiter.name, result="admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(started)
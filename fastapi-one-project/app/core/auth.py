@@ -1,41 +1,67 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from jose import JWTError
 from typing import Optional
 
-from .security import verify_password, create_access_token
+from .security import verify_password, decode_token, ACCESS_TOKEN_TYPE
 from .config import get_settings
-from .dependencies import get_db
+from .exceptions import raise_forbidden_exception
+from .dependencies import get_read_db
+from .revocation import revocation_list
 from app.models import User
+from app.repositories.user_repository import UserRepository
 
 settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def verify_token(token: str, token_type: str = ACCESS_TOKEN_TYPE) -> dict:
+    """
+    Decode a token and reject it if it has been revoked
+    The revocation check is an in-memory lookup, not a query
+    """
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+        payload = decode_token(token, token_type)
     except JWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    jti = payload.get("jti")
+    if jti and revocation_list.is_revoked(jti, payload["exp"]):
+        raise _credentials_exception()
+    return payload
 
-    user = db.query(User).filter(User.username == username).first()
+def get_token_payload(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_read_db)
+) -> dict:
+    revocation_list.sync(db)
+    return verify_token(token)
+
+async def get_current_user(
+    payload: dict = Depends(get_token_payload),
+    db: Session = Depends(get_read_db)
+) -> User:
+    # Cached: every authenticated request looks its user up
+    user = UserRepository(db).get_by_username_cached(payload["sub"])
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
     return user
 
+def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.username not in settings.ADMIN_USERNAMES:
+        raise_forbidden_exception("Admin privileges required")
+    return current_user
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     user = db.query(User).filter(User.username == username).first()
     if not user or not verify_password(password, user.hashed_password):
         return None
-    return user 
\ No newline at end of file
+    return user
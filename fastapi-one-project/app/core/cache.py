@@ -0,0 +1,272 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+from .config import get_settings
+from .metrics import metrics
+
+# Cached values are JSON-able dicts; None means "not found" and is never stored
+CacheValue = Optional[dict]
+
+
+class LRUCache:
+    """
+    In-process tier: at most max_entries values, each kept until its own expiry
+    The least recently used entry is evicted first
+    """
+
+    def __init__(self, max_entries: int, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+
+    def get(self, key: str) -> CacheValue:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: dict, ttl_seconds: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SharedCacheBackend(ABC):
+    """
+    Tier shared by every worker, holding serialized values with a TTL
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class MemorySharedCache(SharedCacheBackend):
+    """
+    Local stand-in for the shared tier, for tests and single-process deployments
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[bytes, float]] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None or entry[1] <= self._clock():
+                self._values.pop(key, None)
+                return None
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        with self._lock:
+            self._values[key] = (value, self._clock() + ttl_seconds)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class RedisSharedCache(SharedCacheBackend):
+    """
+    Shared tier on a Redis-compatible server
+    Takes any client exposing get/set(ex=)/delete/scan_iter (redis-py, or a local stand-in)
+    """
+
+    def __init__(self, client, prefix: str = "cache:"):
+        self._client = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisSharedCache":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_SHARED_URL requires the 'redis' package") from exc
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(self._prefix + key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._client.set(self._prefix + key, value, ex=max(1, int(ttl_seconds)))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._prefix + key)
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: CacheValue = None
+        self.error: Optional[BaseException] = None
+
+
+class TieredCache:
+    """
+    Read-through cache: the local LRU tier, then the shared tier, then the loader
+    Concurrent misses for the same key are coalesced (single-flight): one caller
+    loads, the others wait for its result instead of stampeding the database.
+    invalidate() clears this worker's local tier and the shared tier; other
+    workers' local tiers catch up within local_ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        local: LRUCache,
+        shared: Optional[SharedCacheBackend] = None,
+        local_ttl_seconds: float = 5.0,
+        shared_ttl_seconds: float = 300.0,
+        load_timeout: float = 10.0,
+    ):
+        self.name = name
+        self.local = local
+        self.shared = shared
+        self.local_ttl_seconds = local_ttl_seconds
+        self.shared_ttl_seconds = shared_ttl_seconds
+        self.load_timeout = load_timeout
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def _key(self, key) -> str:
+        return f"{self.name}:{key}"
+
+    def get_or_load(self, key, loader: Callable[[], CacheValue]) -> CacheValue:
+        """
+        Takes a key and a loader returning the value (None when it doesn't exist)
+        Returns the cached value, loading it at most once across concurrent callers
+        """
+        if not self.enabled:
+            return loader()
+        key = self._key(key)
+        value = self.local.get(key)
+        if value is not None:
+            metrics.increment("cache_requests_total", cache=self.name, tier="local", result="hit")
+            return value
+        metrics.increment("cache_requests_total", cache=self.name, tier="local", result="miss")
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            metrics.increment("cache_coalesced_total", cache=self.name)
+            if not flight.done.wait(self.load_timeout):
+                # The leader is stuck; don't let every follower hang with it
+                return loader()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = self._load(key, loader)
+            return flight.value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _load(self, key: str, loader: Callable[[], CacheValue]) -> CacheValue:
+        if self.shared is not None:
+            data = self.shared.get(key)
+            metrics.increment("cache_requests_total", cache=self.name, tier="shared", result="miss" if data is None else "hit")
+            if data is not None:
+                value = json.loads(data)
+                self.local.set(key, value, self.local_ttl_seconds)
+                return value
+        value = loader()
+        metrics.increment("cache_loads_total", cache=self.name)
+        if value is not None:
+            self.local.set(key, value, self.local_ttl_seconds)
+            if self.shared is not None:
+                self.shared.set(key, json.dumps(value, separators=(",", ":")).encode(), self.shared_ttl_seconds)
+        return value
+
+    def invalidate(self, key) -> None:
+        key = self._key(key)
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+        metrics.increment("cache_invalidations_total", cache=self.name)
+
+    def clear(self) -> None:
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+@lru_cache()
+def get_shared_cache() -> Optional[SharedCacheBackend]:
+    settings = get_settings()
+    if settings.CACHE_SHARED_URL:
+        return RedisSharedCache.from_url(settings.CACHE_SHARED_URL)
+    return None
+
+
+def _tiered_cache(name: str) -> TieredCache:
+    settings = get_settings()
+    cache = TieredCache(
+        name,
+        LRUCache(settings.CACHE_LOCAL_MAX_ENTRIES),
+        get_shared_cache(),
+        local_ttl_seconds=settings.CACHE_LOCAL_TTL_SECONDS,
+        shared_ttl_seconds=settings.CACHE_SHARED_TTL_SECONDS,
+    )
+    cache.enabled = settings.CACHE_ENABLED
+    return cache
+
+
+post_cache = _tiered_cache("posts")
+user_cache = _tiered_cache("users")
@@ -0,0 +1,206 @@
+import gzip
+import zlib
+from typing import Collection, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import metrics
+
+# Preference order when the client accepts several encodings equally
+ENCODINGS = ("br", "gzip")
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/x-ndjson", "image/svg+xml")
+# Highest levels, for content compressed once and served many times
+MAX_LEVELS = {"gzip": 9, "br": 11}
+
+
+def load_brotli():
+    # Brotli is optional: without the 'brotli' package only gzip is offered
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def available_encodings() -> Tuple[str, ...]:
+    return ENCODINGS if load_brotli() is not None else ("gzip",)
+
+
+def is_compressible(media_type: str) -> bool:
+    return media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """
+    Takes an Accept-Encoding header
+    Returns each listed encoding with its quality
+    """
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(available: Collection[str], accept_encoding: str) -> Optional[str]:
+    """
+    Takes the encodings on offer and an Accept-Encoding header
+    Returns the best one the client accepts, or None for the identity encoding
+    """
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, wildcard)
+        if encoding in available and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return load_brotli().compress(content, quality=level)
+    # mtime=0 keeps the output, and so any ETag derived from it, stable across runs
+    return gzip.compress(content, compresslevel=level, mtime=0)
+
+
+class StreamCompressor:
+    """
+    Incremental gzip or brotli: each compress() returns everything the chunk
+    can already be decoded to, so streamed responses keep flowing
+    """
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = load_brotli().Compressor(quality=level)
+        else:
+            # wbits=31 writes gzip framing
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(chunk) + self._brotli.flush()
+        return self._zlib.compress(chunk) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with gzip, or brotli when installed and preferred
+    Bodies below minimum_size and responses that are already encoded (such as
+    precompressed cache entries and static assets) pass through untouched.
+    A body that arrives in one piece is compressed in one go and keeps a
+    Content-Length; streamed bodies are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, levels: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": 6, "br": 4, **(levels or {})}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(available_encodings(), Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self.levels[encoding], self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, level: int, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.start: Optional[Message] = None
+        self.passthrough = False
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.compressor: Optional[StreamCompressor] = None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.start = message
+            # Partial content passes through: its Content-Range and strong ETag describe the identity bytes
+            self.passthrough = (
+                message["status"] in (204, 206, 304)
+                or "content-encoding" in headers
+                or "content-range" in headers
+                or not is_compressible(headers.get("content-type", ""))
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body, more_body = message.get("body", b""), message.get("more_body", False)
+        if self.compressor is not None:
+            await self._send_compressed(body, more_body)
+            return
+        self.buffer.append(body)
+        self.buffered += len(body)
+        if more_body and self.buffered < self.minimum_size:
+            return
+        body, self.buffer = b"".join(self.buffer), []
+        if self.buffered < self.minimum_size:
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+        headers = self._encoded_headers()
+        if not more_body:
+            compressed = compress(body, self.encoding, self.level)
+            headers["Content-Length"] = str(len(compressed))
+            self._count(len(body), len(compressed))
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": compressed})
+            return
+        # Streamed: the length isn't known up front
+        del headers["Content-Length"]
+        self.compressor = StreamCompressor(self.encoding, self.level)
+        await self.send(self.start)
+        await self._send_compressed(body, more_body)
+
+    def _encoded_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(scope=self.start)
+        headers["Content-Encoding"] = self.encoding
+        vary = {value.strip().lower() for value in headers.get("vary", "").split(",")}
+        if "accept-encoding" not in vary and "*" not in vary:
+            headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # The compressed bytes differ from what a strong validator promised
+            headers["ETag"] = f"W/{etag}"
+        return headers
+
+    async def _send_compressed(self, body: bytes, more_body: bool) -> None:
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        self._count(len(body), len(data))
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _count(self, raw: int, compressed: int) -> None:
+        metrics.increment("response_compression_bytes_total", raw, stage="in", encoding=self.encoding)
+        metrics.increment("response_compression_bytes_total", compressed, stage="out", encoding=self.encoding)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 from functools import lru_cache
 
 class Settings(BaseSettings):
@@ -11,13 +11,109 @@ class Settings(BaseSettings):
     # Security
     SECRET_KEY: str = "your-secret-key"  # In production, use environment variable
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    ADMIN_USERNAMES: List[str] = []  # Users allowed on the /admin endpoints
+    TOKEN_REVOCATION_PARTITION_MINUTES: int = 15
+    TOKEN_REVOCATION_PARTITION_CAPACITY: int = 100_000
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["*"]
     
     # Database
     SQLALCHEMY_DATABASE_URL: str = "sqlite:///./app.db"
+    SQLALCHEMY_REPLICA_URLS: List[str] = []  # Read replicas; empty sends reads to the primary
+    REPLICA_SELECTION: str = "round_robin"  # or "least_connections"
+    REPLICA_STICKY_SECONDS: float = 5.0  # Read-your-writes window after a client's own commit
+    SQLALCHEMY_SHARD_URLS: List[str] = []  # Shards for posts, likes and retweets; empty keeps them on the primary
+    DB_CREATE_TABLES: bool = True  # Create missing tables, columns and indexes when the app starts up
+    SNOWFLAKE_WORKER_ID: Optional[int] = None  # 0-7, distinct per worker process; unset leases a free one from the database
+    SNOWFLAKE_WORKER_LEASE_SECONDS: float = 30.0  # A worker id not renewed for this long can be claimed by another process
+
+    # Rate limiting (token buckets, requests per minute)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORAGE_URL: Optional[str] = None  # e.g. redis://localhost:6379/0 to share limits across workers
+    RATE_LIMIT_SHARDS: int = 16
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 10
+    RATE_LIMIT_REGISTER_PER_MINUTE: int = 5
+    RATE_LIMIT_WRITES_PER_MINUTE: int = 60
+
+    # Background jobs
+    JOBS_ENABLED: bool = True  # Run the in-process worker with the app
+    JOBS_CONCURRENCY: int = 2
+    JOBS_BATCH_SIZE: int = 10
+    JOBS_POLL_INTERVAL: float = 1.0  # Seconds between polls when no enqueue woke the worker
+    JOBS_MAX_ATTEMPTS: int = 5
+    JOBS_BACKOFF_SECONDS: float = 2.0  # Doubles per attempt, with jitter
+    JOBS_MAX_BACKOFF_SECONDS: float = 300.0
+    JOBS_LEASE_SECONDS: float = 60.0  # A claimed job not finished by then is retried by another worker
+    JOBS_DRAIN_TIMEOUT: float = 10.0  # Seconds shutdown waits for due jobs to finish
+    JOBS_RETENTION_SECONDS: float = 86400.0  # Finished jobs (and their idempotency keys) are kept this long
+
+    # Response compression and caching
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller bodies are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # Only with the optional 'brotli' package
+    RESPONSE_CACHE_TTL_SECONDS: float = 1.0  # Per-credential microcache of feed reads; 0 disables it
+    RESPONSE_CACHE_MAX_ENTRIES: int = 10_000
+    RESPONSE_CACHE_PATHS: List[str] = ["/api/v1/posts/with_counts/", "/api/v1/posts/timeline/"]
+    RESPONSE_CACHE_GZIP_LEVEL: int = 9  # Cached bodies are compressed once and served many times
+    RESPONSE_CACHE_BROTLI_QUALITY: int = 9
+
+    # Read-through cache of posts and users
+    CACHE_ENABLED: bool = True
+    CACHE_LOCAL_MAX_ENTRIES: int = 10_000  # Per cache, per worker
+    CACHE_LOCAL_TTL_SECONDS: float = 5.0  # Bounds how long another worker's write can go unseen
+    CACHE_SHARED_URL: Optional[str] = None  # e.g. redis://localhost:6379/1 for a tier shared by all workers
+    CACHE_SHARED_TTL_SECONDS: float = 300.0
+
+    # Idempotency-Key support on write routes
+    IDEMPOTENCY_STORE: str = "database"  # "database" shares keys across workers, "memory" keeps them per process
+    IDEMPOTENCY_PATHS: List[str] = ["/api/v1/posts/", "/api/v1/users/", "/api/v1/notifications/"]
+    IDEMPOTENCY_TTL_SECONDS: float = 86_400.0  # How long a completed response can be replayed
+    IDEMPOTENCY_LEASE_SECONDS: float = 60.0  # A claim left by a crashed request can be taken over after this
+    IDEMPOTENCY_MEMORY_MAX_ENTRIES: int = 100_000
+
+    # Admission control: per-worker concurrency limits on database-bound routes
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_PATHS: List[str] = ["/api/v1/"]
+    ADMISSION_EXCLUDE_PATHS: List[str] = ["/api/v1/metrics"]  # Monitoring must keep working under overload
+    ADMISSION_READ_CONCURRENCY: int = 32  # Stays below the 40 threads sync endpoints run on
+    ADMISSION_READ_QUEUE: int = 128
+    ADMISSION_WRITE_CONCURRENCY: int = 4  # SQLite has one writer; more only wait on its lock
+    ADMISSION_WRITE_QUEUE: int = 64
+    # Login, registration and token refresh are bcrypt/JWT CPU work, kept out of the write pool
+    ADMISSION_AUTH_PATHS: List[str] = ["/api/v1/auth/token", "/api/v1/auth/refresh", "/api/v1/auth/register"]
+    ADMISSION_AUTH_CONCURRENCY: int = 4  # bcrypt holds a thread on a core; more only slows every login down
+    ADMISSION_AUTH_QUEUE: int = 64
+    ADMISSION_MAX_WAIT_SECONDS: float = 2.0  # Queued longer than this (or expected to be) is shed with a 503
+
+    # Deleted posts
+    POST_PURGE_CHUNK_SIZE: int = 1000  # Likes and retweets removed per purge job, so no job holds the write lock for long
+
+    # Ranked "For You" feed
+    FEED_CANDIDATES_PER_SOURCE: int = 300  # Posts taken from followed users and from trending, each
+    FEED_TRENDING_WINDOW_HOURS: float = 24.0  # Trending candidates are drawn from posts this recent
+    FEED_RECENCY_HALF_LIFE_HOURS: float = 6.0  # A post's recency score halves every this many hours
+    FEED_WEIGHT_RECENCY: float = 1.0
+    FEED_WEIGHT_VELOCITY: float = 0.6  # Likes and retweets per hour since posting
+    FEED_WEIGHT_AFFINITY: float = 0.4  # How often the reader has liked or retweeted the author
+    FEED_WEIGHT_FOLLOWED: float = 0.5  # Bonus for authors the reader follows over trending strangers
+    FEED_RANKED_CACHE_MAX_ENTRIES: int = 10_000  # Ranked lists kept per worker
+    FEED_REFRESH_SECONDS: float = 30.0  # After this a ranked list picks up new posts from followed users
+    FEED_REBUILD_SECONDS: float = 300.0  # After this it is ranked again from scratch
+    FEED_LATENCY_BUDGET_MS: float = 50.0  # Optional stages are skipped once ranking has used this much
+
+    # Scheduled posts
+    SCHEDULED_POSTS_MAX_DAYS: int = 365  # How far ahead a post can be scheduled
+    SCHEDULED_POSTS_LOOKAHEAD_SECONDS: float = 300.0  # Posts due this soon are leased into a worker's timer heap
+    SCHEDULED_POSTS_SCAN_SECONDS: float = 60.0  # Between recovery scans; keep it below the lookahead
+    SCHEDULED_POSTS_LEASE_SECONDS: float = 60.0  # A post a dead worker held is taken over this long after it was due
+    SCHEDULED_POSTS_BATCH_SIZE: int = 1000  # Posts leased per scan
+
+    # Data export
+    EXPORT_BATCH_SIZE: int = 1000  # Rows fetched per round trip from the streaming cursor
+    EXPORT_CHECKPOINT_ROWS: int = 10_000  # Rows between resumable checkpoints
     
     class Config:
         case_sensitive = True
@@ -1,14 +1,212 @@
-from sqlalchemy import create_engine
+import itertools
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateIndex
 from .config import get_settings
+from .metrics import metrics
 
 settings = get_settings()
 
-engine = create_engine(
-    settings.SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Only needed for SQLite
+def create_db_engine(url: str) -> Engine:
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}  # Only needed for SQLite
+    return create_engine(url, connect_args=connect_args)
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> Engine:
+    """
+    The primary database engine, created on first use
+    Importing the app builds no engine, so workers, tests and tooling that never
+    touch the primary don't pay for it
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_db_engine(settings.SQLALCHEMY_DATABASE_URL)
+    return _engine
+
+class _LazySessionmaker(sessionmaker):
+    # Binds to get_engine() when the first session is opened, unless configured with another bind
+    def __call__(self, **local_kw) -> Session:
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def upsert(db: Session, table):
+    """
+    INSERT for the session's dialect that supports on_conflict_do_nothing / on_conflict_do_update
+    """
+    return _UPSERT_INSERTS[db.get_bind().dialect.name](table)
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+Base = declarative_base()
+
+def create_tables() -> None:
+    # Called from the app's lifespan and the CLI, never at import
+    Base.metadata.create_all(bind=get_engine())
+    upgrade_schema(get_engine())
+
+def upgrade_schema(engine: Engine, tables=None) -> None:
+    """
+    Brings tables that already existed up to the models
+    create_all skips an existing table whole, so a database created before a
+    column or index was added to a model never gets it. Every step checks the
+    live schema first, so this is safe to run on every start. A NOT NULL or
+    UNIQUE column is added nullable, filled by the callable in its
+    info["backfill"] and constrained afterwards.
+    """
+    quote = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        existing = set(inspector.get_table_names())
+        tables = [table for table in tables or Base.metadata.sorted_tables if table.name in existing]
+        for table in tables:
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            missing = [column for column in table.columns if column.name not in columns]
+            constrained = [column for column in missing if not column.nullable or column.unique]
+            for column in constrained:
+                if "backfill" not in column.info:
+                    raise RuntimeError(f"{table.name}.{column.name} can't be added to an existing table without a backfill")
+            for column in missing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(
+                    f"ALTER TABLE {quote.format_table(table)} ADD COLUMN {quote.format_column(column)} {column_type}"
+                ))
+            if constrained:
+                for column in constrained:
+                    column.info["backfill"](conn)
+                _constrain_columns(conn, table, constrained)
+        for table in tables:
+            for index in table.indexes:
+                # IF NOT EXISTS rather than checkfirst: the inspector doesn't report expression indexes
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+def _constrain_columns(conn, table, columns) -> None:
+    quote = conn.dialect.identifier_preparer
+    if conn.dialect.name == "sqlite":
+        # SQLite can't alter a column: the table is recreated from the model and its rows copied across
+        old = quote.quote(f"_old_{table.name}")
+        conn.execute(text(f"ALTER TABLE {quote.format_table(table)} RENAME TO {old}"))
+        for index in inspect(conn).get_indexes(f"_old_{table.name}"):
+            conn.execute(text(f"DROP INDEX {quote.quote(index['name'])}"))
+        table.create(bind=conn)
+        names = ", ".join(quote.format_column(column) for column in table.columns)
+        conn.execute(text(f"INSERT INTO {quote.format_table(table)} ({names}) SELECT {names} FROM {old}"))
+        conn.execute(text(f"DROP TABLE {old}"))
+        return
+    for column in columns:
+        if not column.nullable:
+            conn.execute(text(f"ALTER TABLE {quote.format_table(table)} ALTER COLUMN {quote.format_column(column)} SET NOT NULL"))
+        if column.unique:
+            conn.execute(text(f"ALTER TABLE {quote.format_table(table)} ADD UNIQUE ({quote.format_column(column)})"))
+
+class ReplicaRouter:
+    """
+    Chooses the database read sessions are bound to
+    Reads go to the replica pool, picked round-robin or by fewest sessions in
+    flight. Clients that committed a write within the last sticky_seconds read
+    from the primary instead, so they always see their own writes.
+    """
+
+    STRATEGIES = ("round_robin", "least_connections")
+
+    def __init__(
+        self,
+        replicas: Iterable[Engine] = (),
+        strategy: str = "round_robin",
+        sticky_seconds: float = 5.0,
+        clock=time.monotonic,
+    ):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown replica selection strategy: {strategy}")
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sticky: Dict[str, float] = {}
+        self._next_sticky_sweep = 0.0
+        self.configure(replicas)
+
+    def configure(self, replicas: Iterable[Engine]) -> None:
+        with self._lock:
+            self._replicas: List[Engine] = list(replicas)
+            self._sessionmakers = [
+                sessionmaker(autocommit=False, autoflush=False, bind=replica) for replica in self._replicas
+            ]
+            self._in_flight = [0] * len(self._replicas)
+            self._round_robin = itertools.cycle(range(len(self._replicas))) if self._replicas else None
+
+    @property
+    def replicas(self) -> List[Engine]:
+        return self._replicas
+
+    def in_flight(self) -> List[int]:
+        return list(self._in_flight)
+
+    def mark_write(self, keys: Iterable[str]) -> None:
+        if not self._replicas:
+            return
+        now = self._clock()
+        with self._lock:
+            for key in keys:
+                self._sticky[key] = now + self.sticky_seconds
+            if now >= self._next_sticky_sweep:
+                self._sticky = {key: until for key, until in self._sticky.items() if until > now}
+                self._next_sticky_sweep = now + self.sticky_seconds
+
+    def is_sticky(self, keys: Iterable[str]) -> bool:
+        now = self._clock()
+        return any(self._sticky.get(key, 0) > now for key in keys)
+
+    def _choose(self) -> int:
+        with self._lock:
+            if self.strategy == "least_connections":
+                index = min(range(len(self._replicas)), key=self._in_flight.__getitem__)
+            else:
+                index = next(self._round_robin)
+            self._in_flight[index] += 1
+            return index
+
+    def read_session(self, keys: Iterable[str] = ()) -> Optional[Session]:
+        """
+        Open a session on a replica, or return None when the caller should read from the primary
+        """
+        if not self._replicas or self.is_sticky(keys):
+            metrics.increment("db_read_sessions_total", target="primary")
+            return None
+        index = self._choose()
+        session = self._sessionmakers[index]()
+        session.info["replica_index"] = index
+        metrics.increment("db_read_sessions_total", target=f"replica-{index}")
+        return session
+
+    def release(self, session: Session) -> None:
+        session.close()
+        index = session.info.pop("replica_index", None)
+        if index is not None:
+            with self._lock:
+                self._in_flight[index] -= 1
+
+replica_router = ReplicaRouter(
+    [create_db_engine(url) for url in settings.SQLALCHEMY_REPLICA_URLS],
+    strategy=settings.REPLICA_SELECTION,
+    sticky_seconds=settings.REPLICA_STICKY_SECONDS,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base() 
\ No newline at end of file
+@event.listens_for(Session, "after_commit")
+def _mark_sticky_after_commit(session: Session) -> None:
+    # get_db records who the session writes for; their reads stick to the primary for a while
+    keys = session.info.get("sticky_keys")
+    if keys:
+        replica_router.mark_write(keys)
@@ -1,24 +1,143 @@
-from fastapi import Depends
+from fastapi import Depends, Request
+from jose import JWTError, jwt
 from sqlalchemy.orm import Session
-from typing import Generator
-from .database import SessionLocal
+from typing import Generator, List
+from .config import get_settings
+from .database import SessionLocal, replica_router
+from .sharding import shard_router
+from ..repositories.notification_repository import NotificationRepository
 from ..repositories.post_repository import PostRepository
+from ..repositories.scheduled_post_repository import ScheduledPostRepository
+from ..repositories.sharded_post_repository import open_post_repository
+from ..repositories.user_repository import UserRepository
+from ..services.export_service import ExportService
+from ..services.feed_service import FeedService
+from ..services.notification_service import NotificationService
 from ..services.post_service import PostService
+from ..services.profile_service import ProfileService
+from ..services.scheduled_post_service import ScheduledPostService
+from ..services.user_service import UserService
 
-# Database dependency
-def get_db() -> Generator[Session, None, None]:
+def sticky_keys(request: Request) -> List[str]:
+    """
+    Identify who a request reads or writes for: the client address and, when a
+    bearer token is present, its subject. The token is not verified here; the
+    keys only decide whether reads go to the primary.
+    """
+    keys = [f"ip:{request.client.host}"] if request.client else []
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = jwt.get_unverified_claims(token).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            keys.append(f"user:{subject}")
+    return keys
+
+# Database dependency (primary, for writes)
+def get_db(request: Request) -> Generator[Session, None, None]:
     db = SessionLocal()
+    db.info["sticky_keys"] = sticky_keys(request)
     try:
         yield db
     finally:
         db.close()
 
+# Read database dependency (a replica, or the primary when none is configured
+# or the client has just written). The primary session is only opened if used.
+def get_read_db(request: Request, db: Session = Depends(get_db)) -> Generator[Session, None, None]:
+    replica = replica_router.read_session(sticky_keys(request))
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        replica_router.release(replica)
+
 # Repository dependencies
-def get_post_repository(db: Session = Depends(get_db)) -> PostRepository:
-    return PostRepository(db)
+def _post_repository(db: Session) -> Generator[PostRepository, None, None]:
+    # Posts stay on the given session unless shards are configured
+    with open_post_repository(db, shard_router) as repo:
+        yield repo
+
+def get_post_repository(db: Session = Depends(get_db)) -> Generator[PostRepository, None, None]:
+    yield from _post_repository(db)
+
+def get_read_post_repository(db: Session = Depends(get_read_db)) -> Generator[PostRepository, None, None]:
+    yield from _post_repository(db)
+
+def get_user_repository(db: Session = Depends(get_db)) -> UserRepository:
+    return UserRepository(db)
+
+def get_read_user_repository(db: Session = Depends(get_read_db)) -> UserRepository:
+    return UserRepository(db)
+
+def get_scheduled_post_repository(db: Session = Depends(get_db)) -> ScheduledPostRepository:
+    return ScheduledPostRepository(db)
+
+def get_notification_repository(db: Session = Depends(get_db)) -> NotificationRepository:
+    return NotificationRepository(db)
+
+def get_read_notification_repository(db: Session = Depends(get_read_db)) -> NotificationRepository:
+    return NotificationRepository(db)
 
 # Service dependencies
 def get_post_service(
     repo: PostRepository = Depends(get_post_repository),
 ) -> PostService:
-    return PostService(repo) 
\ No newline at end of file
+    return PostService(repo)
+
+def get_read_post_service(
+    repo: PostRepository = Depends(get_read_post_repository),
+) -> PostService:
+    return PostService(repo)
+
+def get_feed_service(
+    posts: PostRepository = Depends(get_read_post_repository),
+    users: UserRepository = Depends(get_read_user_repository),
+) -> FeedService:
+    return FeedService(posts, users)
+
+def get_scheduled_post_service(
+    repo: ScheduledPostRepository = Depends(get_scheduled_post_repository),
+) -> ScheduledPostService:
+    return ScheduledPostService(repo)
+
+def get_user_service(
+    repo: UserRepository = Depends(get_user_repository),
+) -> UserService:
+    return UserService(repo)
+
+def get_profile_service(
+    users: UserRepository = Depends(get_user_repository),
+    posts: PostRepository = Depends(get_post_repository),
+) -> ProfileService:
+    return ProfileService(users, posts)
+
+def get_read_profile_service(
+    users: UserRepository = Depends(get_read_user_repository),
+    posts: PostRepository = Depends(get_read_post_repository),
+) -> ProfileService:
+    return ProfileService(users, posts)
+
+def get_notification_service(
+    repo: NotificationRepository = Depends(get_notification_repository),
+) -> NotificationService:
+    return NotificationService(repo)
+
+def get_read_notification_service(
+    repo: NotificationRepository = Depends(get_read_notification_repository),
+) -> NotificationService:
+    return NotificationService(repo)
+
+def get_export_service() -> ExportService:
+    # Streams outlive the request's dependencies, so the export opens its own sessions
+    settings = get_settings()
+    return ExportService(
+        SessionLocal,
+        shard_router,
+        batch_size=settings.EXPORT_BATCH_SIZE,
+        checkpoint_rows=settings.EXPORT_CHECKPOINT_ROWS,
+    )
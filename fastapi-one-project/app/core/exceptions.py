@@ -17,4 +17,11 @@ def raise_unauthorized_exception(detail: str = "Incorrect username or password")
     )
 
 def raise_conflict_exception(detail: str = "Conflict occurred"):
-    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail) 
\ No newline at end of file
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+def raise_too_many_requests_exception(detail: str = "Too many requests", retry_after: int = 1):
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)},
+    )
\ No newline at end of file
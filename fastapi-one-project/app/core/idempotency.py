@@ -0,0 +1,314 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.jobs import enqueue, job
+from app.models import IdempotencyKey
+from .cache import LRUCache
+from .config import get_settings
+from .database import SessionLocal, upsert
+from .metrics import metrics
+from .response_cache import UNSAFE_METHODS, credential_key
+
+HEADER = "idempotency-key"
+REPLAYED_HEADER = "idempotent-replayed"
+MAX_KEY_LENGTH = 255
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+@dataclass
+class IdempotencyRecord:
+    fingerprint: str
+    response: Optional[StoredResponse]  # None while the first request is still running
+
+
+class IdempotencyStore(ABC):
+    """
+    Where keys are claimed and completed responses kept
+    Methods may block, so the middleware runs them off the event loop when blocking is set
+    """
+
+    blocking = False
+
+    @abstractmethod
+    def claim(self, key: str, fingerprint: str, lease_seconds: float) -> Optional[IdempotencyRecord]:
+        """
+        Takes a key, the request's fingerprint and how long the claim holds
+        Returns None when the caller now owns the key, otherwise the existing record
+        """
+
+    @abstractmethod
+    def complete(self, key: str, response: StoredResponse, ttl_seconds: float) -> None:
+        ...
+
+    @abstractmethod
+    def release(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    """
+    Keys held in this process, for tests and single-process deployments
+    """
+
+    def __init__(self, max_entries: int, clock=time.monotonic):
+        self._lock = threading.Lock()
+        self._records = LRUCache(max_entries, clock)
+
+    def claim(self, key: str, fingerprint: str, lease_seconds: float) -> Optional[IdempotencyRecord]:
+        with self._lock:
+            record = self._records.get(key)
+            if record is None:
+                self._records.set(key, IdempotencyRecord(fingerprint, None), lease_seconds)
+            return record
+
+    def complete(self, key: str, response: StoredResponse, ttl_seconds: float) -> None:
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                self._records.set(key, IdempotencyRecord(record.fingerprint, response), ttl_seconds)
+
+    def release(self, key: str) -> None:
+        self._records.delete(key)
+
+    def clear(self) -> None:
+        self._records.clear()
+
+
+class DatabaseIdempotencyStore(IdempotencyStore):
+    """
+    Keys in the idempotency_keys table, shared by every worker
+    A claim is one INSERT ... ON CONFLICT that also takes over an expired row;
+    the existing row is read only when the key is already taken.
+    Expired rows are pruned by a background job, queued at most once an hour per worker.
+    """
+
+    blocking = True
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal, clock=time.time):
+        self._session_factory = session_factory
+        self._clock = clock
+        self._next_prune = 0.0
+
+    def claim(self, key: str, fingerprint: str, lease_seconds: float) -> Optional[IdempotencyRecord]:
+        now = self._clock()
+        with self._session_factory() as db:
+            values = dict(fingerprint=fingerprint, status_code=None, headers=None, body=None, expires_at=now + lease_seconds)
+            statement = upsert(db, IdempotencyKey).values(key=key, **values)
+            statement = statement.on_conflict_do_update(
+                index_elements=[IdempotencyKey.key], set_=values, where=IdempotencyKey.expires_at <= now
+            )
+            claimed = db.execute(statement).rowcount > 0
+            db.commit()
+            if claimed:
+                return None
+            row = db.scalar(select(IdempotencyKey).where(IdempotencyKey.key == key))
+        if row is None:
+            # Released between our insert and read; the caller's retry will claim it
+            return IdempotencyRecord(fingerprint, None)
+        if row.status_code is None:
+            return IdempotencyRecord(row.fingerprint, None)
+        headers = [(name, value) for name, value in json.loads(row.headers)]
+        return IdempotencyRecord(row.fingerprint, StoredResponse(row.status_code, headers, row.body))
+
+    def complete(self, key: str, response: StoredResponse, ttl_seconds: float) -> None:
+        now = self._clock()
+        with self._session_factory() as db:
+            db.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    status_code=response.status_code,
+                    headers=json.dumps(response.headers, separators=(",", ":")),
+                    body=response.body,
+                    expires_at=now + ttl_seconds,
+                )
+            )
+            if now >= self._next_prune:
+                self._next_prune = now + 3600
+                enqueue(db, "prune_idempotency_keys", idempotency_key=f"prune_idempotency_keys:{int(now // 3600)}")
+            db.commit()
+
+    def release(self, key: str) -> None:
+        with self._session_factory() as db:
+            db.execute(delete(IdempotencyKey).where(IdempotencyKey.key == key))
+            db.commit()
+
+    def clear(self) -> None:
+        with self._session_factory() as db:
+            db.execute(delete(IdempotencyKey))
+            db.commit()
+
+
+@job("prune_idempotency_keys")
+def prune_idempotency_keys(db: Session, payload: dict) -> None:
+    db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < time.time()))
+
+
+@lru_cache()
+def get_idempotency_store() -> IdempotencyStore:
+    settings = get_settings()
+    if settings.IDEMPOTENCY_STORE == "memory":
+        return MemoryIdempotencyStore(settings.IDEMPOTENCY_MEMORY_MAX_ENTRIES)
+    return DatabaseIdempotencyStore()
+
+
+def _error(status_code: int, detail: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code, headers=headers)
+
+
+class IdempotencyMiddleware:
+    """
+    Makes unsafe requests carrying an Idempotency-Key safe to retry
+    The first request with a key runs and, if it succeeds, its response is stored;
+    a retry with the same key, credential, method and path gets that response back
+    without running the handler again. Duplicates arriving while the first is still
+    running wait for it in this worker, and get a 409 with Retry-After in any other.
+    Reusing a key for a different request body is refused with a 422. Failed
+    requests (4xx and 5xx) release their key, so the retry runs again.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        paths: Sequence[str],
+        ttl_seconds: float,
+        lease_seconds: float,
+        store: Optional[IdempotencyStore] = None,
+    ):
+        self.app = app
+        self.paths = tuple(paths)
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._store = store
+        self._in_flight: Dict[str, asyncio.Event] = {}
+
+    @property
+    def store(self) -> IdempotencyStore:
+        # Resolved on first use, so importing the app doesn't pick the store
+        return self._store or get_idempotency_store()
+
+    async def _call(self, function: Callable, *args):
+        if self.store.blocking:
+            return await asyncio.to_thread(function, *args)
+        return function(*args)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in UNSAFE_METHODS or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        client_key = headers.get(HEADER)
+        if client_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not 0 < len(client_key) <= MAX_KEY_LENGTH:
+            await _error(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")(scope, receive, send)
+            return
+
+        body = await _read_body(receive)
+        key = hashlib.sha256(
+            "\n".join((credential_key(headers), scope["method"], scope["path"], client_key)).encode()
+        ).hexdigest()
+        fingerprint = hashlib.sha256(scope["query_string"] + b"\n" + body).hexdigest()
+
+        # Duplicates in this worker wait for the one in flight, then find its stored response
+        while key in self._in_flight:
+            metrics.increment("idempotency_requests_total", result="coalesced")
+            await self._in_flight[key].wait()
+        done = self._in_flight[key] = asyncio.Event()
+        try:
+            record = await self._call(self.store.claim, key, fingerprint, self.lease_seconds)
+            if record is not None:
+                await self._answer(record, fingerprint, scope, receive, send)
+                return
+            metrics.increment("idempotency_requests_total", result="claimed")
+            await self._run(key, body, scope, receive, send)
+        finally:
+            del self._in_flight[key]
+            done.set()
+
+    async def _answer(self, record: IdempotencyRecord, fingerprint: str, scope: Scope, receive: Receive, send: Send) -> None:
+        if record.fingerprint != fingerprint:
+            metrics.increment("idempotency_requests_total", result="mismatch")
+            response = _error(422, "Idempotency-Key was already used for a different request")
+        elif record.response is None:
+            metrics.increment("idempotency_requests_total", result="in_progress")
+            response = _error(409, "A request with this Idempotency-Key is still in progress", {"Retry-After": "1"})
+        else:
+            metrics.increment("idempotency_requests_total", result="replayed")
+            await _replay(record.response, send)
+            return
+        await response(scope, receive, send)
+
+    async def _run(self, key: str, body: bytes, scope: Scope, receive: Receive, send: Send) -> None:
+        sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        messages: List[Message] = []
+
+        async def capture(message: Message) -> None:
+            messages.append(message)
+
+        try:
+            await self.app(scope, replay_receive, capture)
+        except BaseException:
+            await self._call(self.store.release, key)
+            raise
+        start = messages[0]
+        if 200 <= start["status"] < 400:
+            response = StoredResponse(
+                start["status"],
+                [(name.decode("latin-1"), value.decode("latin-1")) for name, value in start["headers"]],
+                b"".join(message.get("body", b"") for message in messages[1:] if message["type"] == "http.response.body"),
+            )
+            await self._call(self.store.complete, key, response, self.ttl_seconds)
+        else:
+            await self._call(self.store.release, key)
+        for message in messages:
+            await send(message)
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+async def _replay(response: StoredResponse, send: Send) -> None:
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response.headers]
+    headers.append((REPLAYED_HEADER.encode(), b"true"))
+    await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": response.body})
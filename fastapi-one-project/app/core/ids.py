@@ -0,0 +1,149 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from .config import get_settings
+
+# Snowflake-style ids: | 41 bits ms since EPOCH_MS | 4 bits shard | 3 bits worker | 5 bits sequence |
+# 53 bits in total, so ids stay exact as JavaScript numbers in the frontend.
+# Each worker process draws from its own sequence space, so workers only coordinate
+# once, to claim a distinct worker id (see app/core/worker_lease.py).
+EPOCH_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+TIMESTAMP_BITS = 41
+SHARD_BITS = 4
+WORKER_BITS = 3
+SEQUENCE_BITS = 5
+
+MAX_SHARDS = 1 << SHARD_BITS
+MAX_WORKERS = 1 << WORKER_BITS
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+WORKER_SHIFT = SEQUENCE_BITS
+SHARD_SHIFT = SEQUENCE_BITS + WORKER_BITS
+TIMESTAMP_SHIFT = SEQUENCE_BITS + WORKER_BITS + SHARD_BITS
+
+
+class SnowflakeGenerator:
+    """
+    Time-ordered ids for one shard and worker
+    Ids from the same generator always increase. When the clock goes backwards or
+    a millisecond runs out of sequence numbers the generator borrows the next
+    millisecond instead of waiting, so it never blocks.
+    """
+
+    def __init__(self, shard: int, worker: int = 0, clock=time.time):
+        if not 0 <= shard < MAX_SHARDS:
+            raise ValueError(f"Shard must be between 0 and {MAX_SHARDS - 1}")
+        if not 0 <= worker < MAX_WORKERS:
+            raise ValueError(f"Worker must be between 0 and {MAX_WORKERS - 1}")
+        self.shard = shard
+        self.worker = worker
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self) -> int:
+        with self._lock:
+            now_ms = int(self._clock() * 1000) - EPOCH_MS
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_ms += 1
+                self._sequence = 0
+            return id_at(self._last_ms + EPOCH_MS, self.shard, self.worker, self._sequence)
+
+
+def id_at(timestamp_ms: int, shard: int = 0, worker: int = 0, sequence: int = 0) -> int:
+    """
+    The id for a Unix time in milliseconds; with the defaults it is the lowest id
+    of that millisecond, which makes it a keyset cursor for "older than this time"
+    """
+    return (
+        ((timestamp_ms - EPOCH_MS) << TIMESTAMP_SHIFT)
+        | (shard << SHARD_SHIFT)
+        | (worker << WORKER_SHIFT)
+        | sequence
+    )
+
+
+def shard_of(snowflake_id: int) -> int:
+    return (snowflake_id >> SHARD_SHIFT) & (MAX_SHARDS - 1)
+
+
+def worker_of(snowflake_id: int) -> int:
+    return (snowflake_id >> WORKER_SHIFT) & (MAX_WORKERS - 1)
+
+
+def timestamp_ms_of(snowflake_id: int) -> int:
+    """
+    Unix time in milliseconds at which the id was generated
+    """
+    return (snowflake_id >> TIMESTAMP_SHIFT) + EPOCH_MS
+
+
+class TimestampIds:
+    """
+    Snowflake ids for rows that carry a timestamp but no id, such as imported
+    posts or retweets made before retweets had ids, so they sort where their
+    timestamp says; the worker and sequence bits give 256 ids per millisecond
+    and shard before spilling into the next millisecond
+    """
+    PER_MILLISECOND = MAX_WORKERS << SEQUENCE_BITS
+
+    def __init__(self):
+        self._issued: Dict[Tuple[int, int], int] = {}
+
+    def id_for(self, timestamp: datetime, shard: int) -> int:
+        if timestamp.tzinfo is None:
+            # Stored timestamps are naive UTC
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        timestamp_ms = int(timestamp.timestamp() * 1000)
+        while self._issued.get((timestamp_ms, shard), 0) >= self.PER_MILLISECOND:
+            timestamp_ms += 1
+        issued = self._issued.get((timestamp_ms, shard), 0)
+        self._issued[(timestamp_ms, shard)] = issued + 1
+        return id_at(timestamp_ms, shard, issued >> SEQUENCE_BITS, issued & MAX_SEQUENCE)
+
+
+_leased_worker_id: Optional[int] = None
+
+
+def set_leased_worker_id(worker: Optional[int]) -> None:
+    # Called by the worker id lease when it claims, loses or releases an id
+    global _leased_worker_id
+    _leased_worker_id = worker
+
+
+def default_worker_id() -> int:
+    """
+    The worker bits for this process: SNOWFLAKE_WORKER_ID when set (give each
+    worker a distinct value), otherwise the id this process holds a lease on
+    Raises ValueError for an out-of-range SNOWFLAKE_WORKER_ID and RuntimeError
+    when neither is there, rather than risk two processes sharing an id
+    """
+    configured = get_settings().SNOWFLAKE_WORKER_ID
+    if configured is not None:
+        if not 0 <= configured < MAX_WORKERS:
+            raise ValueError(f"SNOWFLAKE_WORKER_ID must be between 0 and {MAX_WORKERS - 1}")
+        return configured
+    if _leased_worker_id is None:
+        raise RuntimeError("No snowflake worker id: set SNOWFLAKE_WORKER_ID or start the app, which leases one")
+    return _leased_worker_id
+
+
+_generators: Dict[Tuple[int, int], SnowflakeGenerator] = {}
+_generators_lock = threading.Lock()
+
+
+def next_id(shard: int = 0, worker: Optional[int] = None) -> int:
+    if worker is None:
+        worker = default_worker_id()
+    generator = _generators.get((shard, worker))
+    if generator is None:
+        with _generators_lock:
+            generator = _generators.setdefault((shard, worker), SnowflakeGenerator(shard, worker))
+    return generator.next_id()
@@ -0,0 +1,47 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+def _metric_key(name: str, labels: Dict[str, object]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{key}="{labels[key]}"' for key in sorted(labels))
+    return f"{name}{{{rendered}}}"
+
+
+class MetricsRegistry:
+    """
+    Process-local counters and gauges, keyed Prometheus-style as name{label="value"}
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        key = _metric_key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_metric_key(name, labels), 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"counters": dict(self._counters), "gauges": dict(self._gauges)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+
+metrics = MetricsRegistry()
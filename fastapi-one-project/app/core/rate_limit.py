@@ -0,0 +1,220 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Dict, List, NamedTuple
+
+from fastapi import Depends, Request
+from fastapi.security import OAuth2PasswordRequestForm
+
+from .auth import get_current_user
+from .config import get_settings
+from .exceptions import raise_too_many_requests_exception
+from .metrics import metrics
+from app.models import User
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+
+class RateLimitBackend(ABC):
+    """
+    Token-bucket storage. A bucket holds up to `capacity` tokens and refills at
+    `refill_rate` tokens per second; each request consumes `cost` tokens.
+    """
+
+    @abstractmethod
+    def consume(self, key: str, capacity: float, refill_rate: float, cost: float = 1.0) -> RateLimitResult:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets", "next_sweep")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [tokens, updated_at, expires_at]
+        self.buckets: Dict[str, List[float]] = {}
+        self.next_sweep = 0.0
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    In-process buckets split across independently locked shards
+    A bucket expires once it would have refilled completely, so dropping it is
+    indistinguishable from keeping it; each shard sweeps expired buckets at most
+    once per sweep_interval.
+    """
+
+    def __init__(self, shards: int = 16, sweep_interval: float = 60.0, clock=time.monotonic):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._sweep_interval = sweep_interval
+        self._clock = clock
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def consume(self, key: str, capacity: float, refill_rate: float, cost: float = 1.0) -> RateLimitResult:
+        shard = self._shard(key)
+        now = self._clock()
+        with shard.lock:
+            if now >= shard.next_sweep:
+                self._sweep(shard, now)
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            shard.buckets[key] = [tokens, now, now + (capacity - tokens) / refill_rate]
+
+        retry_after = 0.0 if allowed else (cost - tokens) / refill_rate
+        return RateLimitResult(allowed, tokens, retry_after)
+
+    def _sweep(self, shard: _Shard, now: float) -> None:
+        expired = [key for key, bucket in shard.buckets.items() if bucket[2] <= now]
+        for key in expired:
+            del shard.buckets[key]
+        shard.next_sweep = now + self._sweep_interval
+
+    def __len__(self) -> int:
+        return sum(len(shard.buckets) for shard in self._shards)
+
+    def clear(self) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                shard.buckets.clear()
+                shard.next_sweep = 0.0
+
+
+# Runs atomically inside Redis (or any server speaking its protocol and EVAL),
+# using the server clock so every worker sees the same buckets.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / refill_rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / refill_rate * 1000) + 1)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Buckets shared across workers through a Redis-compatible server
+    Takes any client exposing `eval` and `scan_iter`/`delete` (redis-py, or a local stand-in)
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self._client = client
+        self._prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisRateLimitBackend":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("RATE_LIMIT_STORAGE_URL requires the 'redis' package") from exc
+        return cls(redis.Redis.from_url(url))
+
+    def consume(self, key: str, capacity: float, refill_rate: float, cost: float = 1.0) -> RateLimitResult:
+        allowed, remaining, retry_after = self._client.eval(
+            _TOKEN_BUCKET_SCRIPT, 1, self._prefix + key, capacity, refill_rate, cost
+        )
+        return RateLimitResult(bool(int(allowed)), float(remaining), float(retry_after))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+
+@lru_cache()
+def get_rate_limit_backend() -> RateLimitBackend:
+    settings = get_settings()
+    if settings.RATE_LIMIT_STORAGE_URL:
+        return RedisRateLimitBackend.from_url(settings.RATE_LIMIT_STORAGE_URL)
+    return MemoryRateLimitBackend(shards=settings.RATE_LIMIT_SHARDS)
+
+
+def check_rate_limit(scope: str, identity: str, per_minute: int, cost: float = 1.0) -> RateLimitResult:
+    """
+    Consume from the bucket for (scope, identity) and raise 429 when it is empty
+    """
+    settings = get_settings()
+    if not settings.RATE_LIMIT_ENABLED or per_minute <= 0:
+        return RateLimitResult(True, float(per_minute), 0.0)
+
+    result = get_rate_limit_backend().consume(f"{scope}:{identity}", per_minute, per_minute / 60, cost)
+    metrics.increment("rate_limit_requests_total", scope=scope, outcome="allowed" if result.allowed else "limited")
+    if not result.allowed:
+        raise_too_many_requests_exception(retry_after=max(1, math.ceil(result.retry_after)))
+    return result
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+class IPRateLimit:
+    """
+    Dependency limiting requests per client IP
+    Takes the scope name and the Settings attribute holding the per-minute limit
+    """
+
+    def __init__(self, scope: str, limit_setting: str):
+        self.scope = scope
+        self.limit_setting = limit_setting
+
+    def __call__(self, request: Request) -> None:
+        check_rate_limit(self.scope, client_ip(request), getattr(get_settings(), self.limit_setting))
+
+
+class UserRateLimit(IPRateLimit):
+    """
+    Dependency limiting requests per authenticated user
+    """
+
+    def __call__(self, current_user: User = Depends(get_current_user)) -> None:
+        check_rate_limit(self.scope, str(current_user.id), getattr(get_settings(), self.limit_setting))
+
+
+class LoginRateLimit(IPRateLimit):
+    """
+    Dependency limiting login attempts per client IP and per attempted username,
+    so a burst is rejected before any bcrypt work is done
+    """
+
+    def __call__(self, request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+        per_minute = getattr(get_settings(), self.limit_setting)
+        check_rate_limit(self.scope, client_ip(request), per_minute)
+        check_rate_limit(f"{self.scope}_username", form_data.username.lower(), per_minute)
+
+
+limit_login = LoginRateLimit("login", "RATE_LIMIT_LOGIN_PER_MINUTE")
+limit_register = IPRateLimit("register", "RATE_LIMIT_REGISTER_PER_MINUTE")
+limit_writes = UserRateLimit("writes", "RATE_LIMIT_WRITES_PER_MINUTE")
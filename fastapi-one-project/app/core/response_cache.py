@@ -0,0 +1,153 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Set, Tuple
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_settings
+from .metrics import metrics
+from .static_assets import Asset, asset_response
+
+settings = get_settings()
+
+CacheKey = Tuple[str, str, str]
+UNSAFE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+# Cached responses are per-credential, so shared caches must not keep them
+CACHED_RESPONSE_CACHE_CONTROL = "private, no-cache"
+
+
+def credential_key(headers: Headers) -> str:
+    # The whole Authorization header, hashed: only the same token can read an entry back
+    authorization = headers.get("authorization", "")
+    return hashlib.sha256(authorization.encode()).hexdigest()[:32] if authorization else ""
+
+
+class ResponseCache:
+    """
+    Process-local microcache of whole responses, stored already compressed
+    Entries live ttl_seconds and the least recently used are evicted past
+    max_entries. Each entry belongs to the credential it was served to.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, Tuple[Asset, float]]" = OrderedDict()
+        self._by_credential: Dict[str, Set[CacheKey]] = {}
+
+    def get(self, key: CacheKey) -> Optional[Asset]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= self._clock():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: CacheKey, asset: Asset) -> None:
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (asset, self._clock() + self.ttl_seconds)
+            self._by_credential.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, credential: str) -> None:
+        # A client's own write drops what was cached for it, so it reads its writes
+        with self._lock:
+            for key in list(self._by_credential.get(credential, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_credential.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: CacheKey) -> None:
+        if self._entries.pop(key, None) is None:
+            return
+        keys = self._by_credential.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_credential[key[0]]
+
+
+class ResponseCacheMiddleware:
+    """
+    Serves repeat GETs of the given path prefixes from a ResponseCache
+    Only complete 200 responses that set no cookies are stored. They are compressed once,
+    at the given levels, when stored, and every hit is answered from those bytes with an
+    ETag, so a hit costs no query, no serialization and no compression.
+    Any unsafe request invalidates what is cached for its credential.
+    """
+
+    def __init__(self, app: ASGIApp, cache: ResponseCache, paths: Sequence[str], levels: Dict[str, int]):
+        self.app = app
+        self.cache = cache
+        self.paths = tuple(paths)
+        self.levels = levels
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.cache.ttl_seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope, receive)
+        if request.method in UNSAFE_METHODS:
+            self.cache.invalidate(credential_key(request.headers))
+            await self.app(scope, receive, send)
+            return
+        if request.method != "GET" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        key = (credential_key(request.headers), scope["path"], scope["query_string"].decode("latin-1"))
+        asset = self.cache.get(key)
+        if asset is not None:
+            metrics.increment("response_cache_requests_total", result="hit")
+            await asset_response(asset, request, cache_control=CACHED_RESPONSE_CACHE_CONTROL)(scope, receive, send)
+            return
+        metrics.increment("response_cache_requests_total", result="miss")
+
+        captured = _CapturedResponse()
+        await self.app(scope, receive, captured)
+        asset = captured.asset(self.levels)
+        if asset is None:
+            await captured.replay(send)
+            return
+        self.cache.set(key, asset)
+        await asset_response(asset, request, cache_control=CACHED_RESPONSE_CACHE_CONTROL)(scope, receive, send)
+
+
+class _CapturedResponse:
+    def __init__(self):
+        self.messages = []
+
+    async def __call__(self, message: Message) -> None:
+        self.messages.append(message)
+
+    def asset(self, levels: Dict[str, int]) -> Optional[Asset]:
+        start, bodies = self.messages[0], self.messages[1:]
+        headers = Headers(raw=start["headers"])
+        if start["status"] != 200 or "set-cookie" in headers or "content-encoding" in headers:
+            return None
+        body = b"".join(message.get("body", b"") for message in bodies if message["type"] == "http.response.body")
+        return Asset.from_bytes(body, headers.get("content-type", "application/octet-stream"), levels)
+
+    async def replay(self, send: Send) -> None:
+        for message in self.messages:
+            await send(message)
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_TTL_SECONDS, settings.RESPONSE_CACHE_MAX_ENTRIES)
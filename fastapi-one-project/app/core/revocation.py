@@ -0,0 +1,166 @@
+import hashlib
+import math
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .metrics import metrics
+from app.jobs import enqueue, job
+from app.models import RevokedToken
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings using double hashing of one blake2b digest
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class _Partition:
+    __slots__ = ("bloom", "exact")
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.bloom = BloomFilter(capacity, error_rate)
+        # Exact jtis until the partition outgrows its capacity; after that the
+        # Bloom filter answers alone and a false positive only forces a re-login
+        self.exact: Optional[Set[str]] = set()
+
+
+class RevocationList:
+    """
+    Denylist of revoked token ids, partitioned by token expiry
+    A token can only be revoked until it expires, so each partition covers a
+    window of expiry times and is dropped as soon as the window has passed.
+    Memory is bounded by the revocations made within one token lifetime.
+
+    The list is per process; revocations are persisted to the revoked_tokens
+    table and every worker pulls rows it hasn't seen at most once per
+    sync_interval, so checking a token never costs a query of its own.
+    """
+
+    def __init__(
+        self,
+        partition_seconds: int = 900,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        sync_interval: float = 5.0,
+        clock=time.time,
+    ):
+        self.partition_seconds = partition_seconds
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._partitions: Dict[int, _Partition] = {}
+        self._last_synced_id = 0
+        self._next_sync = 0.0
+
+    def _sweep(self, now: float) -> None:
+        current = int(now // self.partition_seconds)
+        for key in [key for key in self._partitions if key < current]:
+            del self._partitions[key]
+
+    def add(self, jti: str, expires_at: int) -> None:
+        now = self._clock()
+        if expires_at <= now:
+            return
+        key = int(expires_at // self.partition_seconds)
+        with self._lock:
+            self._sweep(now)
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = self._partitions[key] = _Partition(self.capacity, self.error_rate)
+            partition.bloom.add(jti)
+            if partition.exact is not None:
+                partition.exact.add(jti)
+                if len(partition.exact) > self.capacity:
+                    partition.exact = None
+
+    def is_revoked(self, jti: str, expires_at: int) -> bool:
+        partition = self._partitions.get(int(expires_at // self.partition_seconds))
+        if partition is None or jti not in partition.bloom:
+            return False
+        exact = partition.exact
+        return True if exact is None else jti in exact
+
+    def __len__(self) -> int:
+        return sum(len(p.exact) if p.exact is not None else self.capacity for p in self._partitions.values())
+
+    def revoke(self, db: Session, jti: str, expires_at: int) -> bool:
+        """
+        Persist a revocation so other workers pick it up, and apply it locally
+        The INSERT into the unique jti column is unconditional, so of two workers
+        revoking the same token at once exactly one succeeds; that makes it the
+        gate for using a refresh token once.
+        Pruning expired rows is left to a background job, queued at most once an hour
+        Returns False when the token was already revoked
+        """
+        try:
+            db.execute(insert(RevokedToken).values(jti=jti, expires_at=expires_at))
+            enqueue(db, "prune_revoked_tokens", idempotency_key=f"prune_revoked_tokens:{int(self._clock() // 3600)}")
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            self.add(jti, expires_at)
+            return False
+        self.add(jti, expires_at)
+        metrics.increment("tokens_revoked_total")
+        return True
+
+    def sync(self, db: Session, force: bool = False) -> None:
+        """
+        Load revocations persisted since the last sync
+        """
+        now = self._clock()
+        if not force and now < self._next_sync:
+            return
+        self._next_sync = now + self.sync_interval
+        rows = db.execute(
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+            .where(RevokedToken.id > self._last_synced_id, RevokedToken.expires_at > int(now))
+            .order_by(RevokedToken.id)
+        ).all()
+        for row_id, jti, expires_at in rows:
+            self.add(jti, expires_at)
+            self._last_synced_id = max(self._last_synced_id, row_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+            self._last_synced_id = 0
+            self._next_sync = 0.0
+
+
+settings = get_settings()
+revocation_list = RevocationList(
+    partition_seconds=settings.TOKEN_REVOCATION_PARTITION_MINUTES * 60,
+    capacity=settings.TOKEN_REVOCATION_PARTITION_CAPACITY,
+)
+
+
+@job("prune_revoked_tokens")
+def prune_revoked_tokens(db: Session, payload: dict) -> None:
+    db.execute(delete(RevokedToken).where(RevokedToken.expires_at < int(time.time())))
@@ -1,24 +1,53 @@
+import uuid
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from .config import get_settings
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+@lru_cache()
+def get_pwd_context():
+    # Built on the first hash or verify: passlib and the bcrypt backend load then, not at import
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+def _create_token(data: dict, token_type: str, expires_delta: timedelta) -> str:
     to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt 
\ No newline at end of file
+    to_encode.update({
+        "exp": datetime.utcnow() + expires_delta,
+        "jti": uuid.uuid4().hex,
+        "type": token_type,
+    })
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    if not expires_delta:
+        expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return _create_token(data, ACCESS_TOKEN_TYPE, expires_delta)
+
+def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    if not expires_delta:
+        expires_delta = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    return _create_token(data, REFRESH_TOKEN_TYPE, expires_delta)
+
+def decode_token(token: str, token_type: str = ACCESS_TOKEN_TYPE) -> dict:
+    """
+    Decode and verify a token of the given type
+    Tokens issued before token types existed carry no "type" and count as access tokens
+    Raises JWTError when the token is invalid, expired or of the wrong type
+    """
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if payload.get("type", ACCESS_TOKEN_TYPE) != token_type:
+        raise JWTError("Unexpected token type")
+    return payload
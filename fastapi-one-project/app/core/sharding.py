@@ -0,0 +1,62 @@
+from typing import Iterable, List
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from .config import get_settings
+from .database import Base, create_db_engine, upgrade_schema
+from .ids import MAX_SHARDS, shard_of
+
+settings = get_settings()
+
+# Tables that live on the shards; users, follows and tokens stay on the primary
+SHARDED_TABLES = ("posts", "likes", "retweets", "post_revisions")
+
+
+class ShardRouter:
+    """
+    Maps users and posts to the database that holds them
+    Posts live on their owner's shard (owner_id modulo the shard count) and
+    the shard is encoded in the post id, so a post is found from its id alone.
+    Likes and retweets live next to the post they point at, which keeps
+    per-post counts shard-local.
+    """
+
+    def __init__(self, shards: Iterable[Engine] = ()):
+        self.configure(shards)
+
+    def configure(self, shards: Iterable[Engine]) -> None:
+        shards = list(shards)
+        if len(shards) > MAX_SHARDS:
+            raise ValueError(f"At most {MAX_SHARDS} shards are supported")
+        self._shards: List[Engine] = shards
+        # Commits don't expire loaded posts: an expired Post.owner would lazy load from the shard, which has no users
+        self._sessionmakers = [
+            sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=shard) for shard in shards
+        ]
+
+    @property
+    def shards(self) -> List[Engine]:
+        return self._shards
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
+
+    def shard_for_user(self, user_id: int) -> int:
+        return user_id % self.shard_count if self._shards else 0
+
+    def shard_for_post(self, post_id: int) -> int:
+        return shard_of(post_id) if self._shards else 0
+
+    def session(self, shard: int) -> Session:
+        return self._sessionmakers[shard]()
+
+    def create_tables(self) -> None:
+        tables = [Base.metadata.tables[name] for name in SHARDED_TABLES]
+        for shard in self._shards:
+            Base.metadata.create_all(bind=shard, tables=tables)
+            upgrade_schema(shard, tables)
+
+
+shard_router = ShardRouter([create_db_engine(url) for url in settings.SQLALCHEMY_SHARD_URLS])
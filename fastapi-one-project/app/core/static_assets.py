@@ -0,0 +1,184 @@
+import hashlib
+import mimetypes
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, Response
+from starlette.types import Receive, Scope, Send
+
+from .compression import MAX_LEVELS, available_encodings, choose_encoding, compress, is_compressible
+
+# Hashed URLs never change content, so browsers and CDNs may keep them for a year without revalidating
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unhashed URLs (and the landing page) are cached but revalidated with the ETag on every use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+HASH_LENGTH = 12
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+@dataclass
+class Asset:
+    """
+    A file held in memory with its precompressed variants
+    Compression happens once, when the asset is built; serving never compresses
+    """
+    content: bytes
+    media_type: str
+    digest: str
+    encodings: Dict[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def from_bytes(cls, content: bytes, media_type: str, levels: Dict[str, int] = MAX_LEVELS) -> "Asset":
+        asset = cls(content, media_type, hashlib.sha256(content).hexdigest()[:HASH_LENGTH])
+        if is_compressible(media_type):
+            variants = {encoding: compress(content, encoding, levels[encoding]) for encoding in available_encodings()}
+            # A variant that doesn't save anything isn't worth a Vary split
+            asset.encodings = {encoding: data for encoding, data in variants.items() if len(data) < len(content)}
+        return asset
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        # Each encoding is a different representation and gets its own validator
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Returns the inclusive (first, last) byte of a single-range header
+    Raises ValueError when the range can't be satisfied; multiple ranges return None (full body)
+    """
+    match = _RANGE.match(header.replace(" ", ""))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last n bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or first > last:
+        raise ValueError("Range starts past the end")
+    return first, last
+
+
+def asset_response(
+    asset: Asset, request: Request, immutable: bool = False, cache_control: Optional[str] = None
+) -> Response:
+    """
+    Takes an asset and the request for it
+    Answers conditional requests with 304, single byte ranges with 206 and
+    everything else with the best precompressed variant the client accepts
+    Returns a response whose body is sliced from memory
+    """
+    if cache_control is None:
+        cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+    headers = {
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if asset.encodings:
+        headers["Vary"] = "Accept-Encoding"
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # Ranges are served from the identity encoding, so byte offsets mean the same on every request
+    use_range = range_header is not None and (if_range is None or if_range == asset.etag())
+    encoding = None if use_range else choose_encoding(asset.encodings, request.headers.get("accept-encoding", ""))
+    body = asset.encodings[encoding] if encoding else asset.content
+    headers["ETag"] = asset.etag(encoding)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and (
+        if_none_match.strip() == "*" or headers["ETag"] in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        headers.pop("Accept-Ranges")
+        return Response(status_code=304, headers=headers)
+
+    status_code = 200
+    if use_range:
+        try:
+            byte_range = _parse_range(range_header, len(body))
+        except ValueError:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{len(body)}"})
+        if byte_range is not None:
+            first, last = byte_range
+            headers["Content-Range"] = f"bytes {first}-{last}/{len(body)}"
+            body = body[first:last + 1]
+            status_code = 206
+
+    headers["Content-Length"] = str(len(body))
+    if request.method == "HEAD":
+        body = b""
+    return Response(body, status_code=status_code, headers=headers, media_type=asset.media_type)
+
+
+class StaticAssets:
+    """
+    Serves a directory from memory under content-hashed names
+    Each file is reachable as name.<hash>.ext, cached as immutable, and under
+    its plain name, revalidated with its ETag. Files are read and compressed
+    once, on load() or the first request; changes on disk need a restart.
+    """
+
+    def __init__(self, directory: Path, prefix: str = "/static"):
+        self.directory = Path(directory)
+        self.prefix = prefix.rstrip("/")
+        self._lock = threading.Lock()
+        self._assets: Optional[Dict[str, Tuple[Asset, bool]]] = None
+        self._hashed_names: Dict[str, str] = {}
+
+    def load(self) -> None:
+        if self._assets is not None:
+            return
+        with self._lock:
+            if self._assets is not None:
+                return
+            assets, hashed_names = {}, {}
+            for path in sorted(self.directory.rglob("*")):
+                if not path.is_file():
+                    continue
+                name = path.relative_to(self.directory).as_posix()
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                asset = Asset.from_bytes(path.read_bytes(), media_type)
+                stem, dot, suffix = name.rpartition(".")
+                hashed_name = f"{stem}.{asset.digest}.{suffix}" if dot else f"{name}.{asset.digest}"
+                assets[name] = (asset, False)
+                assets[hashed_name] = (asset, True)
+                hashed_names[name] = hashed_name
+            self._hashed_names = hashed_names
+            self._assets = assets
+
+    def url(self, name: str) -> str:
+        """
+        Takes a path relative to the directory
+        Returns its content-hashed URL, or the plain URL for a file that doesn't exist
+        """
+        self.load()
+        return f"{self.prefix}/{self._hashed_names.get(name, name)}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request = Request(scope, receive)
+        if request.method not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+            await response(scope, receive, send)
+            return
+        self.load()
+        # Mounted apps see the path below the mount point
+        path, root_path = scope["path"], scope.get("root_path", "")
+        name = path[len(root_path):] if path.startswith(root_path) else path
+        entry = self._assets.get(name.lstrip("/"))
+        if entry is None:
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            response = asset_response(entry[0], request, immutable=entry[1])
+        await response(scope, receive, send)
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.models import WorkerLease
+from .config import get_settings
+from .database import SessionLocal, upsert
+from .ids import MAX_WORKERS, set_leased_worker_id
+from .metrics import metrics
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class WorkerIdLease:
+    """
+    Holds one snowflake worker id for this process through a row in worker_leases
+    The id is claimed with a conditional UPDATE, so two live processes never hold the
+    same one, and renewed every third of ttl_seconds. An id whose holder stopped
+    renewing can be claimed by another process once its lease ran out; by then the
+    old holder's ids are older than anything the new holder generates.
+    """
+
+    def __init__(
+        self, session_factory: sessionmaker, ttl_seconds: float = 30.0, holder: Optional[str] = None, clock=time.time
+    ):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}"
+        self._clock = clock
+        self.worker_id: Optional[int] = None
+        self._expires_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def claim(self) -> int:
+        """
+        Claim the lowest worker id no live lease holds
+        Raises RuntimeError when all of them are taken
+        """
+        now = self._clock()
+        with self.session_factory() as db:
+            db.execute(
+                upsert(db, WorkerLease)
+                .values([{"worker_id": worker, "holder": "", "expires_at": 0.0} for worker in range(MAX_WORKERS)])
+                .on_conflict_do_nothing()
+            )
+            free = (
+                select(WorkerLease.worker_id)
+                .where(WorkerLease.expires_at < now)
+                .order_by(WorkerLease.worker_id)
+                .limit(1)
+            )
+            # expires_at is checked again in the UPDATE, so a concurrent claim of the same row matches nothing
+            worker_id = db.execute(
+                update(WorkerLease)
+                .where(WorkerLease.worker_id == free.scalar_subquery(), WorkerLease.expires_at < now)
+                .values(holder=self.holder, expires_at=now + self.ttl_seconds)
+                .returning(WorkerLease.worker_id)
+                .execution_options(synchronize_session=False)
+            ).scalar_one_or_none()
+            db.commit()
+        if worker_id is None:
+            raise RuntimeError(f"All {MAX_WORKERS} snowflake worker ids are leased; run fewer workers")
+        self.worker_id = worker_id
+        self._expires_at = now + self.ttl_seconds
+        set_leased_worker_id(worker_id)
+        metrics.increment("worker_id_claims_total")
+        return worker_id
+
+    def renew(self) -> bool:
+        """
+        Extend the lease on the id this process holds
+        Returns False when it was lost, after which the process stops generating ids until it claims a new one
+        """
+        expires_at = self._clock() + self.ttl_seconds
+        with self.session_factory() as db:
+            renewed = db.execute(
+                update(WorkerLease)
+                .where(WorkerLease.worker_id == self.worker_id, WorkerLease.holder == self.holder)
+                .values(expires_at=expires_at)
+                .execution_options(synchronize_session=False)
+            ).rowcount > 0
+            db.commit()
+        if renewed:
+            self._expires_at = expires_at
+        else:
+            logger.error("Lost the lease on snowflake worker id %s", self.worker_id)
+            self._drop()
+        return renewed
+
+    def expire(self) -> None:
+        # A lease that couldn't be renewed in time may already belong to another process
+        if self.worker_id is not None and self._clock() >= self._expires_at:
+            logger.error("Lease on snowflake worker id %s ran out before it could be renewed", self.worker_id)
+            self._drop()
+
+    def _drop(self) -> None:
+        metrics.increment("worker_id_leases_lost_total")
+        self.worker_id = None
+        set_leased_worker_id(None)
+
+    def release(self) -> None:
+        if self.worker_id is None:
+            return
+        set_leased_worker_id(None)
+        with self.session_factory() as db:
+            db.execute(
+                update(WorkerLease)
+                .where(WorkerLease.worker_id == self.worker_id, WorkerLease.holder == self.holder)
+                .values(expires_at=0.0)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        self.worker_id = None
+
+    def _keep(self) -> None:
+        try:
+            if self.worker_id is None or not self.renew():
+                self.claim()
+        except Exception:
+            logger.exception("Renewing snowflake worker id failed")
+            self.expire()
+
+    @contextmanager
+    def hold(self) -> Iterator[int]:
+        """
+        Claim an id for a command that runs outside the app, such as a bulk load
+        A background thread renews it until the block exits, then it is released
+        """
+        worker_id = self.claim()
+        stop = threading.Event()
+
+        def keep() -> None:
+            while not stop.wait(self.ttl_seconds / 3):
+                self._keep()
+
+        thread = threading.Thread(target=keep, name="worker-id-lease", daemon=True)
+        thread.start()
+        try:
+            yield worker_id
+        finally:
+            stop.set()
+            thread.join()
+            self.release()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        await asyncio.to_thread(self.claim)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            await asyncio.to_thread(self.release)
+        except Exception:
+            logger.exception("Releasing snowflake worker id failed")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.ttl_seconds / 3)
+            await asyncio.to_thread(self._keep)
+
+
+worker_id_lease = WorkerIdLease(SessionLocal, ttl_seconds=settings.SNOWFLAKE_WORKER_LEASE_SECONDS)
@@ -0,0 +1,15 @@
+"""
+Background jobs: deferred work persisted in the jobs table and run by JobWorker
+"""
+from .registry import job, get_handler
+from .queue import enqueue
+from .worker import JobWorker, job_worker, run_pending
+
+__all__ = [
+    "job",
+    "get_handler",
+    "enqueue",
+    "JobWorker",
+    "job_worker",
+    "run_pending",
+]
@@ -0,0 +1,123 @@
+import json
+import random
+import time
+from typing import List, Optional
+
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import upsert
+from app.core.metrics import metrics
+from app.models import Job
+from .registry import get_handler
+
+settings = get_settings()
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[dict] = None,
+    idempotency_key: Optional[str] = None,
+    delay: float = 0.0,
+) -> None:
+    """
+    Queue a job in the caller's transaction
+    Nothing is committed here: the job exists only if the write that queued it
+    commits, and the request pays for one INSERT instead of the work itself.
+    A job whose idempotency key is already in the table is dropped.
+    """
+    handler = get_handler(kind)
+    now = time.time()
+    statement = upsert(db, Job).values(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        idempotency_key=idempotency_key,
+        status=PENDING,
+        attempts=0,
+        max_attempts=handler.max_attempts,
+        run_at=now + delay,
+        created_at=now,
+    )
+    if idempotency_key is not None:
+        statement = statement.on_conflict_do_nothing(index_elements=[Job.idempotency_key])
+    db.execute(statement)
+    # Tells the worker to look for work as soon as this transaction commits
+    db.info["jobs_enqueued"] = True
+    metrics.increment("jobs_enqueued_total", kind=kind)
+
+
+def claim(db: Session, limit: int, lease_seconds: float, now: Optional[float] = None) -> List[Row]:
+    """
+    Lease up to limit due jobs, including running jobs whose lease has expired
+    One UPDATE ... RETURNING, so concurrent workers never claim the same job
+    """
+    now = time.time() if now is None else now
+    due = (
+        select(Job.id)
+        .where(or_(
+            and_(Job.status == PENDING, Job.run_at <= now),
+            and_(Job.status == RUNNING, Job.locked_until < now),
+        ))
+        .order_by(Job.run_at)
+        .limit(limit)
+    )
+    rows = db.execute(
+        update(Job)
+        .where(Job.id.in_(due.scalar_subquery()))
+        .values(status=RUNNING, attempts=Job.attempts + 1, locked_until=now + lease_seconds)
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    return rows
+
+
+def complete(db: Session, job_id: int) -> None:
+    # Not committed here: the caller commits it with the handler's own writes
+    db.execute(
+        update(Job)
+        .where(Job.id == job_id)
+        .values(status=DONE, locked_until=None, finished_at=time.time())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def backoff_delay(attempts: int) -> float:
+    """
+    Seconds before retry number attempts: doubling from JOBS_BACKOFF_SECONDS up to
+    JOBS_MAX_BACKOFF_SECONDS, with jitter so failed batches don't retry in lockstep
+    """
+    delay = min(settings.JOBS_MAX_BACKOFF_SECONDS, settings.JOBS_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def retry_or_fail(db: Session, job: Row, error: str) -> None:
+    now = time.time()
+    if job.attempts >= job.max_attempts:
+        values = dict(status=FAILED, finished_at=now)
+        metrics.increment("jobs_failed_total", kind=job.kind)
+    else:
+        values = dict(status=PENDING, run_at=now + backoff_delay(job.attempts))
+        metrics.increment("jobs_retried_total", kind=job.kind)
+    db.execute(
+        update(Job)
+        .where(Job.id == job.id)
+        .values(locked_until=None, last_error=error, **values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def purge_finished(db: Session, older_than: float) -> int:
+    deleted = db.execute(
+        delete(Job).where(Job.status.in_((DONE, FAILED)), Job.finished_at < older_than)
+    ).rowcount
+    db.commit()
+    return deleted
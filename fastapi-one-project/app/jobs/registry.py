@@ -0,0 +1,38 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+class JobHandler(NamedTuple):
+    func: Callable[[Session, Union[dict, List[dict]]], None]
+    max_attempts: int
+    batch: bool
+
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job(kind: str, max_attempts: Optional[int] = None, batch: bool = False):
+    """
+    Register the decorated function as the handler for a job kind
+    Handlers take the worker's session and the job payload, or with batch=True
+    the payloads of every job of that kind claimed together. Their writes are
+    committed together with the jobs being marked done, so a job that fails
+    part-way leaves nothing behind and is retried from scratch.
+    """
+    def decorator(func: Callable[[Session, Union[dict, List[dict]]], None]):
+        _handlers[kind] = JobHandler(func, max_attempts or settings.JOBS_MAX_ATTEMPTS, batch)
+        return func
+
+    return decorator
+
+
+def get_handler(kind: str) -> JobHandler:
+    try:
+        return _handlers[kind]
+    except KeyError:
+        raise ValueError(f"Unknown job kind: {kind}") from None
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.core.metrics import metrics
+from .queue import claim, complete, purge_finished, retry_or_fail
+from .registry import get_handler
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def run_job(session_factory: sessionmaker, job: Row) -> bool:
+    """
+    Run one claimed job; its handler's writes and the job's completion commit together
+    Returns whether the job succeeded
+    """
+    return _run_together(session_factory, job.kind, [job])
+
+
+def _run_together(session_factory: sessionmaker, kind: str, jobs: List[Row]) -> bool:
+    with session_factory() as db:
+        try:
+            handler = get_handler(kind)
+            if handler.batch:
+                handler.func(db, [json.loads(job.payload) for job in jobs])
+            else:
+                handler.func(db, json.loads(jobs[0].payload))
+            for job in jobs:
+                complete(db, job.id)
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            for job in jobs:
+                logger.warning("Job %s (%s) failed on attempt %s: %r", job.id, job.kind, job.attempts, exc)
+                retry_or_fail(db, job, repr(exc))
+            return False
+    metrics.increment("jobs_completed_total", len(jobs), kind=kind)
+    return True
+
+
+def run_jobs(session_factory: sessionmaker, jobs: List[Row]) -> None:
+    """
+    Run claimed jobs; jobs of a batch kind go to their handler in one call
+    """
+    batches: Dict[str, List[Row]] = {}
+    for job in jobs:
+        try:
+            batch = get_handler(job.kind).batch
+        except ValueError:
+            batch = False
+        if batch:
+            batches.setdefault(job.kind, []).append(job)
+        else:
+            run_job(session_factory, job)
+    for kind, batch_jobs in batches.items():
+        _run_together(session_factory, kind, batch_jobs)
+
+
+def run_pending(session_factory: sessionmaker = SessionLocal, batch_size: int = 100) -> int:
+    """
+    Run every due job in the calling thread until none are left
+    Used by tests and one-off scripts instead of the background worker
+    Returns the number of jobs run
+    """
+    processed = 0
+    while True:
+        with session_factory() as db:
+            jobs = claim(db, batch_size, settings.JOBS_LEASE_SECONDS)
+        if not jobs:
+            return processed
+        run_jobs(session_factory, jobs)
+        processed += len(jobs)
+
+
+class JobWorker:
+    """
+    In-process worker pool for the jobs table
+    Runs as asyncio tasks next to the app; claiming and handlers run in threads
+    so the event loop never waits on the database. A commit that enqueued jobs
+    wakes the worker immediately, otherwise it polls every poll_interval.
+    On stop the tasks keep draining due jobs for up to drain_timeout seconds;
+    whatever they don't reach stays queued for the next start.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        concurrency: int = 2,
+        batch_size: int = 10,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0,
+        drain_timeout: float = 10.0,
+        retention_seconds: float = 86400.0,
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.drain_timeout = drain_timeout
+        self.retention_seconds = retention_seconds
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self._next_purge = 0.0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, unfinished = await asyncio.wait(self._tasks, timeout=self.drain_timeout)
+        for task in unfinished:
+            # Jobs interrupted here keep their lease and are claimed again once it expires
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def wake(self) -> None:
+        """
+        Ask the worker to claim jobs now; safe to call from any thread
+        """
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _claim(self) -> List[Row]:
+        with self.session_factory() as db:
+            now = time.time()
+            if now >= self._next_purge:
+                self._next_purge = now + self.retention_seconds / 24
+                purge_finished(db, now - self.retention_seconds)
+            return claim(db, self.batch_size, self.lease_seconds, now)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                jobs = await asyncio.to_thread(self._claim)
+            except Exception:
+                logger.exception("Claiming jobs failed")
+                jobs = []
+            if jobs:
+                await asyncio.to_thread(run_jobs, self.session_factory, jobs)
+                continue
+            if self._stopping:
+                return
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+job_worker = JobWorker(
+    SessionLocal,
+    concurrency=settings.JOBS_CONCURRENCY,
+    batch_size=settings.JOBS_BATCH_SIZE,
+    poll_interval=settings.JOBS_POLL_INTERVAL,
+    lease_seconds=settings.JOBS_LEASE_SECONDS,
+    drain_timeout=settings.JOBS_DRAIN_TIMEOUT,
+    retention_seconds=settings.JOBS_RETENTION_SECONDS,
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_worker_after_commit(session: Session) -> None:
+    if session.info.pop("jobs_enqueued", False):
+        job_worker.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued_after_rollback(session: Session) -> None:
+    session.info.pop("jobs_enqueued", None)
@@ -1,20 +1,62 @@
+import asyncio
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from pathlib import Path
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
 
+from .core.admission import AdmissionControlMiddleware, ConcurrencyLimiter
+from .core.compression import CompressionMiddleware
 from .core.config import get_settings
-from .core.database import Base, engine
+from .core.database import create_tables
+from .core.idempotency import IdempotencyMiddleware
+from .core.ids import default_worker_id
+from .core.response_cache import ResponseCacheMiddleware, response_cache
+from .core.sharding import shard_router
+from .core.static_assets import Asset, StaticAssets, asset_response
+from .core.worker_lease import worker_id_lease
 from .api.v1.api import api_router
+from .jobs import job_worker
+from .services.post_scheduler import post_scheduler
 
 settings = get_settings()
+APP_DIR = Path(__file__).parent
+static_assets = StaticAssets(APP_DIR / "static", prefix="/static")
+
+def _create_tables() -> None:
+    create_tables()
+    shard_router.create_tables()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup work lives here rather than at import, so importing the app stays cheap
+    if settings.DB_CREATE_TABLES:
+        await asyncio.to_thread(_create_tables)
+    # Every process needs its own snowflake worker id: a configured one is checked,
+    # otherwise a free one is leased, and startup fails when none is left
+    if settings.SNOWFLAKE_WORKER_ID is None:
+        await worker_id_lease.start()
+    else:
+        default_worker_id()
+    # Hash, compress and render once before the first request rather than during it
+    await asyncio.to_thread(get_landing_page)
+    # The job worker runs alongside the app and drains due jobs on shutdown;
+    # the post scheduler hands back the scheduled posts it holds
+    if settings.JOBS_ENABLED:
+        await job_worker.start()
+        await post_scheduler.start()
+    try:
+        yield
+    finally:
+        await post_scheduler.stop()
+        await job_worker.stop()
+        await worker_id_lease.stop()
 
 # Create FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.PROJECT_NAME,
     description="A social network API built with FastAPI",
     version=settings.VERSION,
@@ -22,6 +64,43 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Shed database-bound requests with a 503 when their pool is saturated, instead of
+# letting them pile up behind the database; CORS headers still reach shed responses
+if settings.ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        read=ConcurrencyLimiter(
+            "read", settings.ADMISSION_READ_CONCURRENCY, settings.ADMISSION_READ_QUEUE, settings.ADMISSION_MAX_WAIT_SECONDS
+        ),
+        write=ConcurrencyLimiter(
+            "write", settings.ADMISSION_WRITE_CONCURRENCY, settings.ADMISSION_WRITE_QUEUE, settings.ADMISSION_MAX_WAIT_SECONDS
+        ),
+        paths=settings.ADMISSION_PATHS,
+        exclude_paths=settings.ADMISSION_EXCLUDE_PATHS,
+        auth=ConcurrencyLimiter(
+            "auth", settings.ADMISSION_AUTH_CONCURRENCY, settings.ADMISSION_AUTH_QUEUE, settings.ADMISSION_MAX_WAIT_SECONDS
+        ),
+        auth_paths=settings.ADMISSION_AUTH_PATHS,
+    )
+
+# Feed reads are served from a short-lived, precompressed cache; it sits inside CORS,
+# so hits and misses alike get the CORS headers for the requesting origin
+app.add_middleware(
+    ResponseCacheMiddleware,
+    cache=response_cache,
+    paths=settings.RESPONSE_CACHE_PATHS,
+    levels={"gzip": settings.RESPONSE_CACHE_GZIP_LEVEL, "br": settings.RESPONSE_CACHE_BROTLI_QUALITY},
+)
+
+# Retried writes carrying an Idempotency-Key get the first response back instead of running twice;
+# it sits inside CORS, so a replay gets the CORS headers for the retrying origin
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths=settings.IDEMPOTENCY_PATHS,
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    lease_seconds=settings.IDEMPOTENCY_LEASE_SECONDS,
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -31,16 +110,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Compress everything else above the size threshold; already encoded responses pass through
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    levels={"gzip": settings.COMPRESSION_GZIP_LEVEL, "br": settings.COMPRESSION_BROTLI_QUALITY},
+)
+
+# Static files are served from memory under content-hashed names
+app.mount("/static", static_assets, name="static")
 
-# Configure templates
-templates = Jinja2Templates(directory="app/templates")
+@lru_cache()
+def get_landing_page() -> Asset:
+    """
+    Render index.html once; it depends on nothing but the asset URLs
+    jinja2 is imported here, so importing the app doesn't pay for it
+    """
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+    environment = Environment(loader=FileSystemLoader(APP_DIR / "templates"), autoescape=select_autoescape())
+    page = environment.get_template("index.html").render(asset_url=static_assets.url)
+    return Asset.from_bytes(page.encode(), "text/html")
 
 # Root endpoint
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return asset_response(get_landing_page(), request)
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
\ No newline at end of file
@@ -1,10 +1,26 @@
-from .user import User, Follow
-from .post import Post, Like, Retweet
+from .user import User, Follow, UserStats
+from .post import Post, Like, Retweet, PostRevision
+from .token import RevokedToken
+from .job import Job
+from .notification import Notification, NotificationActor, NotificationCounter
+from .idempotency import IdempotencyKey
+from .scheduled_post import ScheduledPost
+from .worker_lease import WorkerLease
 
 __all__ = [
     "User",
     "Follow",
+    "UserStats",
     "Post",
     "Like",
     "Retweet",
+    "PostRevision",
+    "RevokedToken",
+    "Job",
+    "Notification",
+    "NotificationActor",
+    "NotificationCounter",
+    "IdempotencyKey",
+    "ScheduledPost",
+    "WorkerLease",
 ] 
\ No newline at end of file
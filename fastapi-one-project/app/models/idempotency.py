@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Float, Integer, LargeBinary, String, Text
+from app.core.database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of the credential, method, path and the client's Idempotency-Key
+    key = Column(String(64), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the request, so a reused key with another body is refused
+    status_code = Column(Integer)  # NULL while the first request is still running
+    headers = Column(Text)  # JSON list of [name, value]
+    body = Column(LargeBinary)
+    # Seconds since the epoch; the claim's lease while running, the replay window once completed
+    expires_at = Column(Float, nullable=False, index=True)
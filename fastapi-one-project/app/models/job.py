@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Float, Index, Integer, String, Text
+from app.core.database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    # Workers claim due jobs in run_at order
+    __table_args__ = (Index("ix_jobs_status_run_at", "status", "run_at"),)
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")  # JSON
+    # Enqueueing a key that is already queued (or done) is a no-op
+    idempotency_key = Column(String(255), unique=True)
+    status = Column(String(16), nullable=False, default="pending")  # pending, running, done or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    # Times are seconds since the epoch
+    run_at = Column(Float, nullable=False)
+    locked_until = Column(Float)  # A running job whose lease has passed is claimed again
+    last_error = Column(Text)
+    created_at = Column(Float, nullable=False)
+    finished_at = Column(Float)
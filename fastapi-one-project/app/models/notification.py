@@ -0,0 +1,61 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, String, func, literal_column
+from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
+from app.core.database import Base
+
+class Notification(Base):
+    """
+    One inbox row per recipient, kind and post while unread: further likes or
+    retweets of the same post fold into it ("X and 41 others liked your post")
+    instead of adding rows
+    """
+    __tablename__ = "notifications"
+    # The inbox reads a user's rows newest first and pages on sort_key
+    __table_args__ = (Index("ix_notifications_user_id_sort_key", "user_id", "sort_key"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(16), nullable=False)  # like, retweet, follow or mention
+    post_id = Column(BigInteger)
+    # Snowflake id of the latest event folded in, so grouped rows move to the top of the inbox
+    sort_key = Column(BigInteger, nullable=False)
+    last_actor_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    actor_count = Column(Integer, nullable=False, default=1)
+    read_at = Column(DateTime)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    last_actor = relationship("User", foreign_keys=[last_actor_id])
+
+    @property
+    def actor_username(self):
+        return self.last_actor.username if self.last_actor else None
+
+# The unread row a group of events folds into; follows have no post, so a missing
+# post_id counts as 0 to keep their group unique as well
+UNREAD_GROUP_KEY = (Notification.user_id, Notification.kind, func.coalesce(Notification.post_id, literal_column("0")))
+Index(
+    "ux_notifications_unread_group",
+    *UNREAD_GROUP_KEY,
+    unique=True,
+    sqlite_where=Notification.read_at.is_(None),
+    postgresql_where=Notification.read_at.is_(None),
+)
+
+class NotificationActor(Base):
+    """
+    The actors counted on an unread row, so someone who acts again isn't counted twice
+    Dropped when the row is read, as read rows take no more events
+    """
+    __tablename__ = "notification_actors"
+
+    notification_id = Column(Integer, ForeignKey("notifications.id"), primary_key=True)
+    actor_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+class NotificationCounter(Base):
+    """
+    Unread notification rows per user, kept up to date as rows are added and read
+    """
+    __tablename__ = "notification_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread = Column(Integer, nullable=False, default=0)
@@ -1,35 +1,125 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import DDL, BigInteger, Column, Integer, String, DateTime, ForeignKey, Index, bindparam, event, select, update
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.core.database import Base
+from app.core.ids import EPOCH_MS, TimestampIds, next_id
+from app.core.sharding import shard_router
+
+# 64-bit everywhere; on SQLite the post id is declared INTEGER so it becomes the rowid and
+# feeds ordered by id read the table in key order without a separate index or sort
+SnowflakeId = BigInteger().with_variant(Integer, "sqlite")
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _post_id(context) -> int:
+    # Snowflake id carrying the owner's shard, so the post can be routed by id alone
+    return next_id(shard_router.shard_for_user(context.get_current_parameters()["owner_id"]))
+
+def _retweet_id(context) -> int:
+    # Retweets live on their post's shard
+    return next_id(shard_router.shard_for_post(context.get_current_parameters()["post_id"]))
+
+def _backfill_retweet_ids(conn) -> None:
+    # Retweets made before they had ids get them from their timestamps, so timelines keep their order
+    retweets = Retweet.__table__
+    rows = conn.execute(
+        select(retweets.c.user_id, retweets.c.post_id, retweets.c.timestamp)
+        .where(retweets.c.id.is_(None))
+        .order_by(retweets.c.timestamp)
+    ).all()
+    if not rows:
+        return
+    ids = TimestampIds()
+    epoch = datetime.fromtimestamp(EPOCH_MS / 1000, timezone.utc)
+    conn.execute(
+        update(retweets)
+        .where(retweets.c.user_id == bindparam("b_user_id"), retweets.c.post_id == bindparam("b_post_id"))
+        .values(id=bindparam("b_id")),
+        [
+            {
+                "b_user_id": row.user_id,
+                "b_post_id": row.post_id,
+                "b_id": ids.id_for(row.timestamp or epoch, shard_router.shard_for_post(row.post_id)),
+            }
+            for row in rows
+        ],
+    )
 
 class Post(Base):
     __tablename__ = "posts"
+    # A user's posts newest first, for profile and home timelines
+    __table_args__ = (Index("ix_posts_owner_id_id", "owner_id", "id"),)
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Time-ordered: feeds order and page on the id instead of the timestamp
+    id = Column(SnowflakeId, primary_key=True, index=True, default=_post_id)
     content = Column(String(280), nullable=False)
-    timestamp = Column(DateTime, default=datetime.now(timezone.utc))
+    timestamp = Column(DateTime, default=_utcnow)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Set when the post is deleted; reads skip it and a background job purges it with its likes and retweets
+    deleted_at = Column(DateTime)
 
     owner = relationship("User", back_populates="posts")
     likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
     retweets = relationship("Retweet", back_populates="post", cascade="all, delete-orphan")
 
+    @property
+    def owner_username(self):
+        return self.owner.username if self.owner else None
+
 class Like(Base):
     __tablename__ = "likes"
 
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
-    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    # Indexed on its own: the primary key leads with user_id, so it can't serve per-post counts
+    post_id = Column(BigInteger, ForeignKey("posts.id"), primary_key=True, index=True)
 
     user = relationship("User")
     post = relationship("Post", back_populates="likes")
 
 class Retweet(Base):
     __tablename__ = "retweets"
+    __table_args__ = (
+        # Per-post counts and the timeline's "newer retweet of this post" probe
+        Index("ix_retweets_post_id_id", "post_id", "id"),
+        # A user's retweets newest first, for profile and home timelines
+        Index("ix_retweets_user_id_id", "user_id", "id"),
+    )
 
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
-    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
-    timestamp = Column(DateTime, default=datetime.now(timezone.utc))
+    post_id = Column(BigInteger, ForeignKey("posts.id"), primary_key=True)
+    # The primary key deduplicates; the snowflake id orders retweets in timelines
+    id = Column(BigInteger, unique=True, nullable=False, default=_retweet_id, info={"backfill": _backfill_retweet_ids})
+    timestamp = Column(DateTime, default=_utcnow)
 
     user = relationship("User")
-    post = relationship("Post", back_populates="retweets") 
\ No newline at end of file
+    post = relationship("Post", back_populates="retweets") 
+class PostRevision(Base):
+    __tablename__ = "post_revisions"
+    # A post's revisions newest first
+    __table_args__ = (Index("ix_post_revisions_post_id_id", "post_id", "id"),)
+
+    # Append-only: each row is the content an edit replaced, written by the database trigger below
+    id = Column(Integer, primary_key=True)
+    post_id = Column(BigInteger, ForeignKey("posts.id"), nullable=False)
+    content = Column(String(280), nullable=False)
+    replaced_at = Column(DateTime, nullable=False)
+
+# The edit stays a single UPDATE: the database records the replaced content in the same statement
+event.listen(PostRevision.__table__, "after_create", DDL("""
+CREATE TRIGGER post_revisions_on_edit AFTER UPDATE OF content ON posts
+WHEN OLD.content IS NOT NEW.content
+BEGIN
+    INSERT INTO post_revisions (post_id, content, replaced_at) VALUES (OLD.id, OLD.content, CURRENT_TIMESTAMP);
+END
+""").execute_if(dialect="sqlite"))
+event.listen(PostRevision.__table__, "after_create", DDL("""
+CREATE FUNCTION post_revisions_on_edit() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO post_revisions (post_id, content, replaced_at) VALUES (OLD.id, OLD.content, now() at time zone 'utc');
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER post_revisions_on_edit AFTER UPDATE OF content ON posts
+FOR EACH ROW WHEN (OLD.content IS DISTINCT FROM NEW.content) EXECUTE FUNCTION post_revisions_on_edit();
+""").execute_if(dialect="postgresql"))
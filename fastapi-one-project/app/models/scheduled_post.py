@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, Float, ForeignKey, Index, Integer, String, Text
+from app.core.database import Base
+
+class ScheduledPost(Base):
+    """
+    A post waiting for its publish_at; it becomes a row in posts only when published,
+    so its snowflake id (and its place in every feed) is the time it went out
+    """
+    __tablename__ = "scheduled_posts"
+    # Schedulers load the next due rows in publish_at order; users list theirs by owner
+    __table_args__ = (
+        Index("ix_scheduled_posts_status_publish_at", "status", "publish_at"),
+        Index("ix_scheduled_posts_owner_id_status", "owner_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    content = Column(Text, nullable=False)
+    status = Column(String(16), nullable=False, default="scheduled")  # scheduled, published or cancelled
+    # Times are seconds since the epoch
+    publish_at = Column(Float, nullable=False)
+    locked_by = Column(String(64))  # The scheduler holding the row in its timer heap
+    locked_until = Column(Float)  # Past this, another scheduler's recovery scan takes the row over
+    post_id = Column(BigInteger)  # The published post
+    created_at = Column(Float, nullable=False)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, Integer, String
+from app.core.database import Base
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # Autoincrement id lets each worker sync only the rows it hasn't seen yet
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(64), unique=True, nullable=False)
+    expires_at = Column(Integer, nullable=False, index=True)  # JWT "exp", seconds since the epoch
@@ -18,7 +18,7 @@ class User(Base):
     username = Column(String(50), unique=True, index=True, nullable=False)
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
     posts = relationship("Post", back_populates="owner")
     followers = relationship(
@@ -27,4 +27,18 @@ class User(Base):
         primaryjoin=id == Follow.c.followee_id,
         secondaryjoin=id == Follow.c.follower_id,
         backref="following",
-    ) 
\ No newline at end of file
+    ) 
+
+class UserStats(Base):
+    """
+    Profile counters, kept up to date by the writes that change them so
+    profiles never aggregate posts, likes or follows on read
+    The rebuild_user_stats job recomputes them from the source tables
+    """
+    __tablename__ = "user_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    posts_count = Column(Integer, nullable=False, default=0)
+    followers_count = Column(Integer, nullable=False, default=0)
+    following_count = Column(Integer, nullable=False, default=0)
+    likes_received = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Float, Integer, String
+from app.core.database import Base
+
+class WorkerLease(Base):
+    """
+    One row per snowflake worker id; a process may only generate ids with the
+    worker id whose lease it holds and keeps renewing
+    """
+    __tablename__ = "worker_leases"
+
+    worker_id = Column(Integer, primary_key=True, autoincrement=False)
+    holder = Column(String(64), nullable=False)  # hostname:pid of the process holding the id
+    expires_at = Column(Float, nullable=False)  # Seconds since the epoch; past this the id can be claimed again
@@ -1,40 +1,184 @@
-from typing import Generic, TypeVar, Type, Optional, List, Any
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Generic, TypeVar, Type, Optional, List, Any, Iterable, Tuple
+from sqlalchemy import DateTime, bindparam, delete, insert, inspect, update
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.cache import TieredCache
 from app.core.database import Base
 
 ModelType = TypeVar("ModelType", bound=Any)
 
 class BaseRepository(Generic[ModelType]):
+    # Read-through cache behind get_cached; writes through the repository invalidate it
+    cache: Optional[TieredCache] = None
+    # Columns never copied into the cache
+    cache_exclude: Tuple[str, ...] = ()
+
     def __init__(self, model: Type[ModelType], db: Session):
         self.model = model
         self.db = db
+        # Single-column primary key the by-id helpers filter on
+        self.pk = inspect(model).primary_key[0]
 
     def get(self, id: int) -> Optional[ModelType]:
-        return self.db.query(self.model).filter(self.model.id == id).first()
+        # Session.get answers from the identity map when the row is already loaded
+        return self.db.get(self.model, id)
+
+    def get_cached(self, id: int) -> Optional[ModelType]:
+        """
+        Like get, but served from self.cache when the repository has one
+        Returns a detached copy of the row's columns: relationships and
+        cache_exclude columns are not loaded, and it may lag a write made by
+        another worker for up to the cache's local TTL
+        """
+        if self.cache is None:
+            return self.get(id)
+        values = self.cache.get_or_load(id, lambda: self._snapshot(self.get(id)))
+        return self._restore(values) if values is not None else None
 
     def get_all(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
         return self.db.query(self.model).offset(skip).limit(limit).all()
 
     def create(self, **kwargs) -> ModelType:
-        instance = self.model(**kwargs)
-        self.db.add(instance)
-        self.db.commit()
-        self.db.refresh(instance)
+        """
+        One INSERT ... RETURNING: defaults generated by the database come back
+        with the insert, so no refresh SELECT follows the commit
+        """
+        instance = self._insert_returning(self.db, [kwargs])[0]
+        self._commit_loaded(self.db, [instance])
         return instance
 
+    def create_many(self, rows: Iterable[dict], returning: bool = True) -> List[ModelType]:
+        """
+        Insert rows with a single executemany and commit
+        Returns the new instances in the order of rows, or an empty list when returning is False
+        """
+        instances = self._insert_many(self.db, list(rows), returning)
+        self._commit_loaded(self.db, instances)
+        return instances
+
     def update(self, id: int, **kwargs) -> Optional[ModelType]:
-        instance = self.get(id)
-        if instance:
-            for key, value in kwargs.items():
-                setattr(instance, key, value)
-            self.db.commit()
-            self.db.refresh(instance)
+        """
+        One UPDATE ... WHERE id = ? RETURNING, without loading the row first
+        Returns None when no row has that id
+        """
+        keys = self._cache_keys([id])
+        instance = self._update_returning(self.db, id, kwargs)
+        if instance is None:
+            self.db.rollback()
+            return None
+        self._commit_loaded(self.db, [instance])
+        self._invalidate(keys)
         return instance
 
+    def update_many(self, rows: Iterable[dict]) -> int:
+        """
+        Update rows by primary key with a single executemany and commit
+        Takes dicts carrying the primary key and the same columns to set
+        Returns the number of rows updated
+        """
+        rows = list(rows)
+        keys = self._cache_keys([row[self.pk.key] for row in rows])
+        updated = self._update_many(self.db, rows)
+        self.db.commit()
+        self._invalidate(keys)
+        return updated
+
     def delete(self, id: int) -> bool:
-        instance = self.get(id)
-        if instance:
-            self.db.delete(instance)
-            self.db.commit()
-            return True
-        return False 
\ No newline at end of file
+        # One DELETE ... WHERE id = ?; the affected row count says whether the row existed
+        keys = self._cache_keys([id])
+        deleted = self.db.execute(delete(self.model).where(self.pk == id)).rowcount
+        self.db.commit()
+        self._invalidate(keys)
+        return deleted > 0
+
+    def delete_many(self, ids: Iterable[int]) -> int:
+        ids = list(ids)
+        keys = self._cache_keys(ids)
+        deleted = self._delete_many(self.db, ids)
+        self.db.commit()
+        self._invalidate(keys)
+        return deleted
+
+    def _cache_keys(self, ids: List[int]) -> List:
+        # Taken before a write: every key the written rows may be cached under
+        return list(ids) if self.cache is not None else []
+
+    def _invalidate(self, keys: List) -> None:
+        # After the commit, so a concurrent miss can't re-cache the old row for long
+        for key in keys:
+            self.cache.invalidate(key)
+
+    def _snapshot(self, instance: Optional[ModelType]) -> Optional[dict]:
+        if instance is None:
+            return None
+        values = {}
+        for attr in inspect(self.model).column_attrs:
+            if attr.key in self.cache_exclude:
+                continue
+            value = getattr(instance, attr.key)
+            values[attr.key] = value.isoformat() if isinstance(value, datetime) else value
+        return values
+
+    def _restore(self, values: dict) -> ModelType:
+        values = dict(values)
+        for attr in inspect(self.model).column_attrs:
+            if isinstance(attr.columns[0].type, DateTime) and isinstance(values.get(attr.key), str):
+                values[attr.key] = datetime.fromisoformat(values[attr.key])
+        instance = self.model(**values)
+        make_transient_to_detached(instance)
+        return instance
+
+    def _insert_many(self, db: Session, rows: List[dict], returning: bool) -> List[ModelType]:
+        # Not committed here; commit with _commit_loaded to keep the returned values
+        if not rows:
+            return []
+        if not returning:
+            db.execute(insert(self.model), rows)
+            return []
+        return self._insert_returning(db, rows)
+
+    def _update_many(self, db: Session, rows: List[dict]) -> int:
+        if not rows:
+            return 0
+        # Core executemany: the ORM's bulk update by primary key doesn't report affected rows
+        table = self.model.__table__
+        columns = [key for key in rows[0] if key != self.pk.key]
+        statement = (
+            update(table)
+            .where(table.c[self.pk.name] == bindparam("b_pk"))
+            .values({column: bindparam(f"b_{column}") for column in columns})
+        )
+        return db.execute(
+            statement,
+            [{"b_pk": row[self.pk.key], **{f"b_{column}": row[column] for column in columns}} for row in rows],
+        ).rowcount
+
+    def _delete_many(self, db: Session, ids: List[int]) -> int:
+        if not ids:
+            return 0
+        return db.execute(delete(self.model).where(self.pk.in_(ids))).rowcount
+
+    def _insert_returning(self, db: Session, rows: List[dict]) -> List[ModelType]:
+        return list(db.scalars(insert(self.model).returning(self.model, sort_by_parameter_order=True), rows))
+
+    def _update_returning(self, db: Session, id: int, values: dict) -> Optional[ModelType]:
+        return db.scalars(
+            update(self.model).where(self.pk == id).values(**values).returning(self.model)
+        ).one_or_none()
+
+    @staticmethod
+    def _commit_loaded(db: Session, instances: List[ModelType]) -> None:
+        """
+        Commit, keeping the column values RETURNING just loaded
+        A plain commit would expire them and the next attribute access would
+        reload each instance with a SELECT
+        """
+        loaded = [
+            (instance, {attr.key: getattr(instance, attr.key) for attr in inspect(instance).mapper.column_attrs})
+            for instance in instances
+        ]
+        db.commit()
+        for instance, values in loaded:
+            for key, value in values.items():
+                set_committed_value(instance, key, value)
@@ -0,0 +1,48 @@
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from ..models import Follow, Like, Post, Retweet
+
+# Exportable tables and the unique key each is read in; the key order matches an
+# existing index, so every export query is an index walk from the checkpoint on
+EXPORT_TABLES = {
+    "posts": (Post.__table__, ("id",)),
+    "likes": (Like.__table__, ("user_id", "post_id")),
+    "retweets": (Retweet.__table__, ("id",)),
+    "follows": (Follow, ("follower_id", "followee_id")),
+}
+# Rows left out of exports: soft-deleted posts are waiting to be purged
+EXPORT_FILTERS = {
+    "posts": (Post.__table__.c.deleted_at.is_(None),),
+}
+
+
+class ExportRepository:
+    """
+    Streams whole tables as plain rows, without ORM objects or an identity map
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def key_of(entity: str, row: dict) -> List:
+        return [row[name] for name in EXPORT_TABLES[entity][1]]
+
+    def stream(self, entity: str, after: Optional[Sequence] = None, batch_size: int = 1000) -> Iterator[List[dict]]:
+        """
+        Yield the rows of an entity in key order, batch_size rows at a time
+        Takes the key of the last row already exported to resume after it
+        The query runs once on a server-side cursor (stream_results) and rows
+        are fetched yield_per at a time, so memory is bounded by one batch
+        """
+        table, key_names = EXPORT_TABLES[entity]
+        key = [table.c[name] for name in key_names]
+        query = select(table).where(*EXPORT_FILTERS.get(entity, ())).order_by(*key)
+        if after is not None:
+            query = query.where(tuple_(*key) > tuple_(*after) if len(key) > 1 else key[0] > after[0])
+        result = self.db.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+        for partition in result.mappings().partitions():
+            yield [dict(row) for row in partition]
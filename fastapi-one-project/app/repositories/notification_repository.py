@@ -0,0 +1,153 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, case, delete, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload
+
+from .base import BaseRepository
+from ..core.database import upsert
+from ..core.ids import next_id
+from ..models import Notification, NotificationActor, NotificationCounter
+from ..models.notification import UNREAD_GROUP_KEY
+
+# (recipient user_id, kind, post_id or None)
+GroupKey = Tuple[int, str, Optional[int]]
+
+notifications = Notification.__table__
+actors_table = NotificationActor.__table__
+counters = NotificationCounter.__table__
+
+
+class NotificationRepository(BaseRepository[Notification]):
+    def __init__(self, db: Session):
+        super().__init__(Notification, db)
+
+    def get_inbox(self, user_id: int, limit: int = 20, before: Optional[int] = None) -> List[Notification]:
+        # Keyset page on the (user_id, sort_key) index, newest activity first
+        query = (
+            self.db.query(Notification)
+            .options(joinedload(Notification.last_actor))
+            .filter(Notification.user_id == user_id)
+        )
+        if before is not None:
+            query = query.filter(Notification.sort_key < before)
+        return query.order_by(Notification.sort_key.desc()).limit(limit).all()
+
+    def unread_count(self, user_id: int) -> int:
+        return self.db.scalar(select(NotificationCounter.unread).where(NotificationCounter.user_id == user_id)) or 0
+
+    def mark_read(self, user_id: int, up_to: Optional[int] = None) -> int:
+        """
+        Mark the user's unread notifications read, up to a sort_key if given
+        The counter drops by the number of rows actually changed
+        Returns the unread count left
+        """
+        unread = [Notification.user_id == user_id, Notification.read_at.is_(None)]
+        if up_to is not None:
+            unread.append(Notification.sort_key <= up_to)
+        # Read rows take no more events, so the actors counted on them can go
+        self.db.execute(
+            delete(NotificationActor)
+            .where(NotificationActor.notification_id.in_(select(Notification.id).where(*unread)))
+            .execution_options(synchronize_session=False)
+        )
+        query = (
+            update(Notification)
+            .where(*unread)
+            .values(read_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        )
+        marked = self.db.execute(query).rowcount
+        if marked:
+            self.db.execute(
+                update(NotificationCounter)
+                .where(NotificationCounter.user_id == user_id)
+                .values(unread=case((NotificationCounter.unread > marked, NotificationCounter.unread - marked), else_=0))
+                .execution_options(synchronize_session=False)
+            )
+        self.db.commit()
+        return self.unread_count(user_id)
+
+    def add_events(self, groups: Dict[GroupKey, List[int]]) -> None:
+        """
+        Fold grouped events into the inbox; not committed here
+        Takes, per group, the distinct actors in the order they acted
+        Each group lands on the recipient's unread row for that kind and post,
+        which is opened first when there is none; the partial unique index on
+        unread rows turns a concurrent open of the same row into a no-op. Only
+        actors not yet counted on the row add to actor_count. Opening rows,
+        recording actors, updating rows and counters are each one statement.
+        """
+        if not groups:
+            return
+        now = datetime.now(timezone.utc)
+        opened = {
+            (row.user_id, row.kind, row.post_id): row.id
+            for row in self.db.execute(
+                upsert(self.db, notifications)
+                .on_conflict_do_nothing(index_elements=UNREAD_GROUP_KEY, index_where=notifications.c.read_at.is_(None))
+                .returning(notifications.c.id, notifications.c.user_id, notifications.c.kind, notifications.c.post_id),
+                [
+                    {
+                        "user_id": user_id, "kind": kind, "post_id": post_id, "sort_key": next_id(),
+                        "last_actor_id": actors[-1], "actor_count": 0, "updated_at": now,
+                    }
+                    for (user_id, kind, post_id), actors in groups.items()
+                ],
+            )
+        }
+        row_ids = dict(opened)
+        existing = [key for key in groups if key not in opened]
+        if existing:
+            row_ids.update(
+                ((row.user_id, row.kind, row.post_id), row.id)
+                for row in self.db.execute(
+                    select(Notification.id, Notification.user_id, Notification.kind, Notification.post_id)
+                    .where(Notification.read_at.is_(None))
+                    .where(tuple_(*UNREAD_GROUP_KEY).in_([(user_id, kind, post_id or 0) for user_id, kind, post_id in existing]))
+                )
+            )
+
+        counted = set(
+            self.db.execute(
+                upsert(self.db, actors_table)
+                .on_conflict_do_nothing()
+                .returning(actors_table.c.notification_id, actors_table.c.actor_id),
+                [
+                    {"notification_id": row_ids[key], "actor_id": actor_id}
+                    for key, actors in groups.items()
+                    for actor_id in actors
+                ],
+            ).all()
+        )
+        updates = []
+        for key, actors in groups.items():
+            added = [actor_id for actor_id in actors if (row_ids[key], actor_id) in counted]
+            # A repeat by someone already counted (like, unlike, like) isn't news
+            if added:
+                updates.append({
+                    "b_id": row_ids[key], "b_added": len(added), "b_actor": added[-1],
+                    "b_sort_key": next_id(), "b_updated_at": now,
+                })
+        if updates:
+            self.db.execute(
+                update(notifications)
+                .where(notifications.c.id == bindparam("b_id"))
+                .values(
+                    actor_count=notifications.c.actor_count + bindparam("b_added"),
+                    last_actor_id=bindparam("b_actor"),
+                    sort_key=bindparam("b_sort_key"),
+                    updated_at=bindparam("b_updated_at"),
+                ),
+                updates,
+            )
+
+        new_unread = Counter(user_id for user_id, _, _ in opened)
+        if new_unread:
+            statement = upsert(self.db, counters)
+            statement = statement.on_conflict_do_update(
+                index_elements=[counters.c.user_id],
+                set_={"unread": counters.c.unread + statement.excluded.unread},
+            )
+            self.db.execute(statement, [{"user_id": user_id, "unread": count} for user_id, count in new_unread.items()])
@@ -1,70 +1,442 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, joinedload
+from datetime import datetime, timezone
+from sqlalchemy import Integer, Select, delete, func, literal, select, tuple_, union_all, update
+from sqlalchemy.engine import Row
+from typing import Callable, Collection, Dict, List, Optional, Tuple
 from .base import BaseRepository
-from ..models import Post, Like, Retweet
+from ..core.cache import post_cache
+from ..jobs import enqueue
+from ..models import Post, PostRevision, Like, Retweet, User
+
+# A timeline page re-queries with a doubled window at most this many times
+# when retweets of the same post crowd out the first window
+TIMELINE_MAX_ROUNDS = 4
 
 class PostRepository(BaseRepository[Post]):
+    """
+    Single home for post query shapes: every endpoint goes through
+    PostService to these methods, so batching, caching and instrumentation
+    only need to land here.
+    """
+
+    cache = post_cache
+
     def __init__(self, db: Session):
         super().__init__(Post, db)
 
-    def get_posts_with_counts(self, current_user_id: int, skip: int = 0, limit: int = 100) -> List[Post]:
-        likes_subq = (
-            self.db.query(
-                Like.post_id,
-                func.count(Like.user_id).label('likes_count')
+    def get(self, id: int) -> Optional[Post]:
+        return self._live(super().get(id))
+
+    def get_posts(
+        self, skip: int = 0, limit: int = 100, before: Optional[int] = None, owner_id: Optional[int] = None
+    ) -> List[Post]:
+        # The owner is joined in the same query so owner_username costs nothing extra
+        return (
+            self.db.query(Post)
+            .options(joinedload(Post.owner))
+            .filter(*self._before(before), *self._owned_by(owner_id), *self._not_deleted())
+            .order_by(Post.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_posts_with_counts(
+        self, current_user_id: int, skip: int = 0, limit: int = 100, before: Optional[int] = None
+    ) -> List[Row]:
+        """
+        One query for a page of posts with owner username, like/retweet counts
+        and an is_owner flag for the current user
+        Counts are correlated subqueries on the post_id indexes, so only the
+        rows of the page are counted instead of aggregating the whole tables
+        """
+        return self.db.execute(
+            self._posts_with_counts_query(current_user_id, before)
+            .add_columns(User.username.label("owner_username"))
+            .outerjoin(User, Post.owner_id == User.id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+
+    def get_timeline(
+        self, limit: int = 20, before: Optional[int] = None, user_ids: Optional[Collection[int]] = None
+    ) -> List[dict]:
+        """
+        Posts and retweets interleaved newest first, one query per page
+        Takes an optional set of users whose posts and retweets make up the stream
+        A post shows once, at its latest event: older retweets of it, and the
+        original once it has been retweeted, are skipped on every page
+        Returns entries with the event id (the cursor for before), the post
+        and who retweeted it
+        """
+        owner, retweeter = aliased(User), aliased(User)
+
+        def fetch(before: Optional[int], window: int) -> List[Row]:
+            query, events = self._timeline_query(window, before, user_ids)
+            return self.db.execute(
+                query
+                .add_columns(owner.username.label("owner_username"), retweeter.username.label("retweeted_by"))
+                .outerjoin(owner, owner.id == Post.owner_id)
+                .outerjoin(retweeter, retweeter.id == events.c.retweeter_id)
+            ).all()
+
+        return [self._timeline_entry(row._mapping) for row in self._page_timeline(fetch, limit, before)]
+
+    @staticmethod
+    def _timeline_query(window: int, before: Optional[int], user_ids: Optional[Collection[int]]):
+        """
+        The newest window events before the cursor: each source is keyset-limited
+        on its own id index, then UNION ALL merges them and an EXISTS probe on
+        (post_id, id) flags events superseded by a newer retweet in the stream
+        """
+        posts = select(
+            Post.id.label("event_id"),
+            Post.id.label("post_id"),
+            literal(None, Integer).label("retweeter_id"),
+            Post.timestamp.label("event_time"),
+        ).where(*PostRepository._not_deleted())
+        retweets = select(
+            Retweet.id.label("event_id"),
+            Retweet.post_id.label("post_id"),
+            Retweet.user_id.label("retweeter_id"),
+            Retweet.timestamp.label("event_time"),
+        )
+        newer_retweet = select(Retweet.id)
+        if before is not None:
+            posts = posts.where(Post.id < before)
+            retweets = retweets.where(Retweet.id < before)
+        if user_ids is not None:
+            posts = posts.where(Post.owner_id.in_(user_ids))
+            retweets = retweets.where(Retweet.user_id.in_(user_ids))
+            newer_retweet = newer_retweet.where(Retweet.user_id.in_(user_ids))
+        # SQLite only allows ORDER BY / LIMIT on a compound's members inside subqueries
+        posts = posts.order_by(Post.id.desc()).limit(window).subquery()
+        retweets = retweets.order_by(Retweet.id.desc()).limit(window).subquery()
+        events = union_all(select(posts), select(retweets)).subquery("events")
+        superseded = newer_retweet.where(
+            Retweet.post_id == events.c.post_id, Retweet.id > events.c.event_id
+        ).exists()
+        query = (
+            select(
+                events.c.event_id,
+                events.c.retweeter_id,
+                events.c.event_time,
+                superseded.label("superseded"),
+                # Retweets of a deleted post stay until it is purged; they are skipped like superseded events
+                Post.deleted_at.is_not(None).label("deleted"),
+                Post.id,
+                Post.content,
+                Post.timestamp,
+                Post.owner_id,
             )
-            .group_by(Like.post_id)
-            .subquery()
+            .join(Post, Post.id == events.c.post_id)
+            .order_by(events.c.event_id.desc())
+            .limit(window)
         )
+        return query, events
+
+    @staticmethod
+    def _page_timeline(fetch: Callable[[Optional[int], int], List[Row]], limit: int, before: Optional[int]) -> List[Row]:
+        rows, window = [], limit * 2
+        for _ in range(TIMELINE_MAX_ROUNDS):
+            batch = fetch(before, window)
+            rows.extend(row for row in batch if not row.superseded and not row.deleted)
+            if len(rows) >= limit or len(batch) < window:
+                break
+            before, window = batch[-1].event_id, window * 2
+        return rows[:limit]
+
+    @staticmethod
+    def _timeline_entry(row) -> dict:
+        retweeted = row["retweeter_id"] is not None
+        return {
+            "event_id": row["event_id"],
+            "post": {
+                "id": row["id"],
+                "content": row["content"],
+                "timestamp": row["timestamp"],
+                "owner_id": row["owner_id"],
+                "owner_username": row["owner_username"],
+            },
+            "retweeted_by": row["retweeted_by"] if retweeted else None,
+            "retweeted_at": row["event_time"] if retweeted else None,
+        }
+
+    def edit(self, id: int, owner_id: int, content: str, created_after: datetime) -> Optional[Post]:
+        """
+        One conditional UPDATE ... RETURNING: the content changes only if the post is
+        owner_id's, not deleted and created after created_after. The trigger on posts
+        appends the replaced content to post_revisions within the same statement.
+        Returns None when no post matched
+        """
+        db = self._session_for_post(id)
+        post = db.scalars(
+            update(Post)
+            .where(Post.id == id, Post.owner_id == owner_id, Post.timestamp > created_after, *self._not_deleted())
+            .values(content=content)
+            .returning(Post)
+        ).one_or_none()
+        if post is None:
+            db.rollback()
+            return None
+        self._commit_loaded(db, [post])
+        self._invalidate(self._cache_keys([id]))
+        return post
+
+    def get_revisions(self, post_id: int, limit: int = 20, before: Optional[int] = None) -> List[PostRevision]:
+        # Newest first, keyset-paged on the revision id along (post_id, id)
+        query = select(PostRevision).where(PostRevision.post_id == post_id)
+        if before is not None:
+            query = query.where(PostRevision.id < before)
+        return list(self._session_for_post(post_id).scalars(query.order_by(PostRevision.id.desc()).limit(limit)))
+
+    def get_posts_with_counts_by_ids(self, current_user_id: int, ids: List[int]) -> List[Row]:
+        """
+        The rows get_posts_with_counts returns, for the given post ids and in their order
+        Deleted posts are left out
+        """
+        if not ids:
+            return []
+        rows = self.db.execute(
+            self._posts_with_counts_query(current_user_id)
+            .add_columns(User.username.label("owner_username"))
+            .outerjoin(User, Post.owner_id == User.id)
+            .where(Post.id.in_(ids))
+        ).all()
+        by_id = {row.id: row for row in rows}
+        return [by_id[post_id] for post_id in ids if post_id in by_id]
+
+    def _posts_with_counts_by_ids(self, current_user_id: int, ids: List[int]) -> List[Row]:
+        # Without the owner join, for databases that hold posts but not users
+        return self.db.execute(self._posts_with_counts_query(current_user_id).where(Post.id.in_(ids))).all()
+
+    def feed_candidates(self, owner_ids: Collection[int], after: Optional[int] = None, limit: int = 300) -> List[Row]:
+        """
+        Ranking candidates: the newest limit posts of owner_ids after the given post id,
+        with their like and retweet counts, walking the (owner_id, id) index
+        """
+        if not owner_ids:
+            return []
+        query = self._candidates_query().where(Post.owner_id.in_(owner_ids))
+        if after is not None:
+            query = query.where(Post.id > after)
+        return self.db.execute(query.order_by(Post.id.desc()).limit(limit)).all()
 
-        retweets_subq = (
-            self.db.query(
-                Retweet.post_id,
-                func.count(Retweet.user_id).label('retweets_count')
+    def trending_candidates(self, after: int, limit: int = 300) -> List[Row]:
+        """
+        Ranking candidates: the posts after the given post id (a time, since ids are
+        snowflakes) with the most likes and retweets
+        """
+        # Counted once per post in the subquery, then sorted on the sum
+        candidates = self._candidates_query().where(Post.id > after).subquery()
+        engagement = candidates.c.likes_count + candidates.c.retweets_count
+        return self.db.execute(
+            select(candidates).order_by(engagement.desc(), candidates.c.id.desc()).limit(limit)
+        ).all()
+
+    def affinity(self, user_id: int, owner_ids: Collection[int]) -> Dict[int, int]:
+        """
+        How many likes and retweets user_id has given each owner's posts
+        Both walk an index leading with user_id
+        """
+        counts: Dict[int, int] = {}
+        if not owner_ids:
+            return counts
+        for model in (Like, Retweet):
+            query = (
+                select(Post.owner_id, func.count())
+                .join(model, model.post_id == Post.id)
+                .where(model.user_id == user_id, Post.owner_id.in_(owner_ids))
+                .group_by(Post.owner_id)
             )
-            .group_by(Retweet.post_id)
-            .subquery()
+            for owner_id, count in self.db.execute(query).all():
+                counts[owner_id] = counts.get(owner_id, 0) + count
+        return counts
+
+    def likes_count(self, post_id: int) -> int:
+        return self._session_for_post(post_id).scalar(select(func.count()).where(Like.post_id == post_id))
+
+    def post_stats_by_owner(self, owner_ids: Collection[int]) -> Dict[int, Dict[str, int]]:
+        """
+        Post count and likes received per owner, aggregated from the source
+        tables; used to rebuild user_stats, never on the request path
+        """
+        stats = {owner_id: {"posts_count": 0, "likes_received": 0} for owner_id in owner_ids}
+        posts = (
+            select(Post.owner_id, func.count())
+            .where(Post.owner_id.in_(owner_ids), *self._not_deleted())
+            .group_by(Post.owner_id)
+        )
+        likes = (
+            select(Post.owner_id, func.count())
+            .join(Like, Like.post_id == Post.id)
+            .where(Post.owner_id.in_(owner_ids), *self._not_deleted())
+            .group_by(Post.owner_id)
+        )
+        for query, key in ((posts, "posts_count"), (likes, "likes_received")):
+            for owner_id, count in self.db.execute(query).all():
+                stats[owner_id][key] = count
+        return stats
+
+    @staticmethod
+    def _not_deleted() -> list:
+        return [Post.deleted_at.is_(None)]
+
+    @staticmethod
+    def _live(post: Optional[Post]) -> Optional[Post]:
+        return post if post is not None and post.deleted_at is None else None
+
+    @staticmethod
+    def _owned_by(owner_id: Optional[int]) -> list:
+        return [Post.owner_id == owner_id] if owner_id is not None else []
+
+    @staticmethod
+    def _before(before: Optional[int]) -> list:
+        # Keyset pagination: post ids are time-ordered and unique, so "older than the
+        # last id seen" pages stably however many posts arrive in between
+        return [Post.id < before] if before is not None else []
+
+    @staticmethod
+    def _interaction_counts():
+        likes_count = (
+            select(func.count())
+            .where(Like.post_id == Post.id)
+            .correlate(Post)
+            .scalar_subquery()
+        )
+        retweets_count = (
+            select(func.count())
+            .where(Retweet.post_id == Post.id)
+            .correlate(Post)
+            .scalar_subquery()
         )
+        return likes_count, retweets_count
+
+    @staticmethod
+    def _candidates_query() -> Select:
+        likes_count, retweets_count = PostRepository._interaction_counts()
+        return select(
+            Post.id, Post.owner_id, likes_count.label("likes_count"), retweets_count.label("retweets_count")
+        ).where(*PostRepository._not_deleted())
 
+    @staticmethod
+    def _posts_with_counts_query(current_user_id: int, before: Optional[int] = None) -> Select:
+        likes_count, retweets_count = PostRepository._interaction_counts()
         return (
-            self.db.query(Post)
-            .outerjoin(likes_subq, Post.id == likes_subq.c.post_id)
-            .outerjoin(retweets_subq, Post.id == retweets_subq.c.post_id)
-            .order_by(Post.timestamp.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+            select(
+                Post.id,
+                Post.content,
+                Post.timestamp,
+                Post.owner_id,
+                likes_count.label("likes_count"),
+                retweets_count.label("retweets_count"),
+                (Post.owner_id == current_user_id).label("is_owner"),
+            )
+            .where(*PostRepository._before(before), *PostRepository._not_deleted())
+            .order_by(Post.id.desc())
         )
 
+    def _session_for_post(self, post_id: int) -> Session:
+        # The session holding the post and its likes and retweets
+        return self.db
+
+    def _sessions_for_posts(self, post_ids: Collection[int]) -> List[Tuple[Session, List[int]]]:
+        # The post ids grouped by the session holding them
+        return [(self.db, list(post_ids))] if post_ids else []
+
+    def delete(self, id: int) -> bool:
+        return self.delete_many([id]) > 0
+
+    def delete_many(self, ids: Collection[int]) -> int:
+        """
+        Soft delete: one UPDATE sets deleted_at, and a purge job is queued in the same
+        transaction to remove the likes, retweets and rows later, a chunk at a time
+        Commits only when a post was deleted; otherwise the transaction is rolled back
+        with whatever the caller staged in it (counters), so a concurrent delete of the
+        same post doesn't apply them twice
+        Returns the number of posts deleted by this call
+        """
+        sessions = self._sessions_for_posts(ids)
+        deleted: List[int] = []
+        for db, post_ids in sessions:
+            deleted.extend(db.scalars(
+                update(Post)
+                .where(Post.id.in_(post_ids), *self._not_deleted())
+                .values(deleted_at=datetime.now(timezone.utc))
+                .returning(Post.id)
+            ))
+        if deleted:
+            enqueue(self.db, "purge_deleted_posts", {"post_ids": deleted})
+        for db, _ in sessions:
+            if deleted:
+                db.commit()
+            else:
+                db.rollback()
+        self._invalidate(self._cache_keys(list(ids)))
+        return len(deleted)
+
+    def purge_deleted(self, ids: Collection[int], chunk_size: int) -> List[int]:
+        """
+        Remove up to chunk_size likes and chunk_size retweets of soft-deleted posts, then
+        the posts that have none left, with their revisions; each database commits its own chunk
+        Set-based deletes bounded by a LIMIT subquery, instead of the ORM cascade loading
+        every Like and Retweet, so a viral post is purged over several short transactions
+        Returns the ids that still have interactions to purge
+        """
+        remaining: List[int] = []
+        for db, post_ids in self._sessions_for_posts(ids):
+            likes = db.execute(
+                delete(Like).where(
+                    tuple_(Like.user_id, Like.post_id).in_(
+                        select(Like.user_id, Like.post_id).where(Like.post_id.in_(post_ids)).limit(chunk_size)
+                    )
+                )
+            ).rowcount
+            retweets = db.execute(
+                delete(Retweet).where(
+                    Retweet.id.in_(select(Retweet.id).where(Retweet.post_id.in_(post_ids)).limit(chunk_size))
+                )
+            ).rowcount
+            if likes < chunk_size and retweets < chunk_size:
+                db.execute(delete(PostRevision).where(PostRevision.post_id.in_(post_ids)))
+                db.execute(delete(Post).where(Post.id.in_(post_ids), Post.deleted_at.is_not(None)))
+            else:
+                remaining.extend(post_ids)
+            db.commit()
+        return remaining
+
+    def _insert_interaction(self, model, post_id: int, user_id: int) -> bool:
+        # The (user_id, post_id) primary key rejects duplicates, no existence check needed
+        db = self._session_for_post(post_id)
+        db.add(model(post_id=post_id, user_id=user_id))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+
+    def _delete_interaction(self, model, post_id: int, user_id: int) -> bool:
+        db = self._session_for_post(post_id)
+        deleted = db.execute(
+            delete(model).where(model.post_id == post_id, model.user_id == user_id)
+        ).rowcount
+        # Rolling back when nothing was deleted also drops counter updates the caller queued
+        if deleted:
+            db.commit()
+        else:
+            db.rollback()
+        return deleted > 0
+
     def like_post(self, post_id: int, user_id: int) -> bool:
-        if not self.db.query(Like).filter_by(post_id=post_id, user_id=user_id).first():
-            like = Like(post_id=post_id, user_id=user_id)
-            self.db.add(like)
-            self.db.commit()
-            return True
-        return False
+        return self._insert_interaction(Like, post_id, user_id)
 
     def unlike_post(self, post_id: int, user_id: int) -> bool:
-        like = self.db.query(Like).filter_by(post_id=post_id, user_id=user_id).first()
-        if like:
-            self.db.delete(like)
-            self.db.commit()
-            return True
-        return False
+        return self._delete_interaction(Like, post_id, user_id)
 
     def retweet_post(self, post_id: int, user_id: int) -> bool:
-        if not self.db.query(Retweet).filter_by(post_id=post_id, user_id=user_id).first():
-            retweet = Retweet(post_id=post_id, user_id=user_id)
-            self.db.add(retweet)
-            self.db.commit()
-            return True
-        return False
+        return self._insert_interaction(Retweet, post_id, user_id)
 
     def unretweet_post(self, post_id: int, user_id: int) -> bool:
-        retweet = self.db.query(Retweet).filter_by(post_id=post_id, user_id=user_id).first()
-        if retweet:
-            self.db.delete(retweet)
-            self.db.commit()
-            return True
-        return False 
\ No newline at end of file
+        return self._delete_interaction(Retweet, post_id, user_id)
@@ -0,0 +1,101 @@
+from typing import List, Optional
+
+from sqlalchemy import case, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from .base import BaseRepository
+from ..models import ScheduledPost
+
+SCHEDULED = "scheduled"
+PUBLISHED = "published"
+CANCELLED = "cancelled"
+
+
+class ScheduledPostRepository(BaseRepository[ScheduledPost]):
+    def __init__(self, db: Session):
+        super().__init__(ScheduledPost, db)
+
+    def get_pending(self, owner_id: int, limit: int = 100) -> List[ScheduledPost]:
+        # The owner's posts still waiting, next to go out first
+        return list(self.db.scalars(
+            select(ScheduledPost)
+            .where(ScheduledPost.owner_id == owner_id, ScheduledPost.status == SCHEDULED)
+            .order_by(ScheduledPost.publish_at, ScheduledPost.id)
+            .limit(limit)
+        ))
+
+    def cancel(self, id: int, owner_id: int) -> bool:
+        """
+        Cancel a post that hasn't gone out yet; a scheduler holding it finds it cancelled when it fires
+        """
+        cancelled = self.db.execute(
+            update(ScheduledPost)
+            .where(ScheduledPost.id == id, ScheduledPost.owner_id == owner_id, ScheduledPost.status == SCHEDULED)
+            .values(status=CANCELLED, locked_by=None, locked_until=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount > 0
+        self.db.commit()
+        return cancelled
+
+    def lease_due(self, worker_id: str, until: float, lease_seconds: float, now: float, limit: int) -> List[Row]:
+        """
+        Lease up to limit posts due by until that no live lease holds, in one UPDATE ... RETURNING
+        A lease lasts until lease_seconds past the post's publish_at (or past now for a
+        late one), so a worker that dies holding it hands it over soon after it was due.
+        Returns the ids and publish_at of the leased posts
+        """
+        due = (
+            select(ScheduledPost.id)
+            .where(
+                ScheduledPost.status == SCHEDULED,
+                ScheduledPost.publish_at <= until,
+                (ScheduledPost.locked_until.is_(None)) | (ScheduledPost.locked_until < now),
+            )
+            .order_by(ScheduledPost.publish_at)
+            .limit(limit)
+        )
+        fires_at = case((ScheduledPost.publish_at > now, ScheduledPost.publish_at), else_=now)
+        rows = self.db.execute(
+            update(ScheduledPost)
+            .where(ScheduledPost.id.in_(due.scalar_subquery()))
+            .values(locked_by=worker_id, locked_until=fires_at + lease_seconds)
+            .returning(ScheduledPost.id, ScheduledPost.publish_at)
+            .execution_options(synchronize_session=False)
+        ).all()
+        self.db.commit()
+        return rows
+
+    def release(self, worker_id: str) -> int:
+        # Hand back everything a stopping scheduler holds, so another takes it over without waiting out the lease
+        released = self.db.execute(
+            update(ScheduledPost)
+            .where(ScheduledPost.locked_by == worker_id, ScheduledPost.status == SCHEDULED)
+            .values(locked_by=None, locked_until=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.commit()
+        return released
+
+    def mark_published(self, id: int, worker_id: str) -> Optional[Row]:
+        """
+        Take a leased post out of the schedule in the caller's transaction; not committed here
+        Matches nothing once the post was cancelled, published or taken over by another worker
+        Returns its owner_id and content
+        """
+        return self.db.execute(
+            update(ScheduledPost)
+            .where(ScheduledPost.id == id, ScheduledPost.status == SCHEDULED, ScheduledPost.locked_by == worker_id)
+            .values(status=PUBLISHED, locked_by=None, locked_until=None)
+            .returning(ScheduledPost.owner_id, ScheduledPost.content)
+            .execution_options(synchronize_session=False)
+        ).one_or_none()
+
+    def set_post_id(self, id: int, post_id: int) -> None:
+        self.db.execute(
+            update(ScheduledPost)
+            .where(ScheduledPost.id == id)
+            .values(post_id=post_id)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
@@ -0,0 +1,267 @@
+import heapq
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .post_repository import PostRepository
+from ..core.ids import next_id
+from ..core.sharding import ShardRouter
+from ..models import Post, User
+
+T = TypeVar("T")
+
+# Shared by every request; each shard query runs on its own session, so they can run side by side
+_scatter_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="shard-scatter")
+
+
+class ShardedPostRepository(PostRepository):
+    """
+    PostRepository over the shards of a ShardRouter
+    Single-post operations go straight to the shard encoded in the post id.
+    The global feed is a scatter-gather: every shard returns its newest
+    skip + limit posts and the sorted lists are k-way merged on the
+    time-ordered post id. Owners live on the primary session (self.db) and are
+    resolved there in one query per page.
+    """
+
+    def __init__(self, db: Session, router: ShardRouter):
+        super().__init__(db)
+        self.router = router
+        self._sessions: Dict[int, Session] = {}
+
+    def _shard_session(self, shard: int) -> Session:
+        session = self._sessions.get(shard)
+        if session is None:
+            session = self._sessions[shard] = self.router.session(shard)
+        return session
+
+    def _session_for_post(self, post_id: int) -> Session:
+        return self._shard_session(self.router.shard_for_post(post_id))
+
+    def close(self) -> None:
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+    def _scatter(self, query: Callable[[Session], List[T]]) -> List[List[T]]:
+        sessions = [self._shard_session(shard) for shard in range(self.router.shard_count)]
+        if len(sessions) == 1:
+            return [query(sessions[0])]
+        return list(_scatter_pool.map(query, sessions))
+
+    def _usernames(self, owner_ids: Iterable[int]) -> Dict[int, str]:
+        owner_ids = set(owner_ids)
+        if not owner_ids:
+            return {}
+        return dict(self.db.execute(select(User.id, User.username).where(User.id.in_(owner_ids))).all())
+
+    def _attach_owners(self, posts: List[Post]) -> List[Post]:
+        # Post.owner can't lazy load on a shard, so owners are fetched from the primary and set as loaded
+        owners = {user.id: user for user in self.db.query(User).filter(User.id.in_({post.owner_id for post in posts}))}
+        for post in posts:
+            set_committed_value(post, "owner", owners.get(post.owner_id))
+        return posts
+
+    def get(self, id: int) -> Optional[Post]:
+        post = self._live(self._session_for_post(id).get(Post, id))
+        if post is not None:
+            self._attach_owners([post])
+        return post
+
+    def get_all(self, skip: int = 0, limit: int = 100) -> List[Post]:
+        return self.get_posts(skip, limit)
+
+    def get_posts(
+        self, skip: int = 0, limit: int = 100, before: Optional[int] = None, owner_id: Optional[int] = None
+    ) -> List[Post]:
+        window = skip + limit
+
+        def query(db: Session) -> List[Post]:
+            return (
+                db.query(Post)
+                .filter(*self._before(before), *self._owned_by(owner_id), *self._not_deleted())
+                .order_by(Post.id.desc())
+                .limit(window)
+                .all()
+            )
+
+        if owner_id is not None:
+            # A user's posts all live on their shard
+            pages = [query(self._shard_session(self.router.shard_for_user(owner_id)))]
+        else:
+            pages = self._scatter(query)
+        merged = heapq.merge(*pages, key=lambda post: post.id, reverse=True)
+        return self._attach_owners(list(islice(merged, skip, window)))
+
+    def get_posts_with_counts(
+        self, current_user_id: int, skip: int = 0, limit: int = 100, before: Optional[int] = None
+    ) -> List[dict]:
+        window = skip + limit
+        query = self._posts_with_counts_query(current_user_id, before).limit(window)
+        pages = self._scatter(lambda db: db.execute(query).all())
+        merged = heapq.merge(*pages, key=lambda row: row.id, reverse=True)
+        rows = list(islice(merged, skip, window))
+        usernames = self._usernames(row.owner_id for row in rows)
+        return [{**row._mapping, "owner_username": usernames.get(row.owner_id)} for row in rows]
+
+    def get_timeline(
+        self, limit: int = 20, before: Optional[int] = None, user_ids: Optional[Collection[int]] = None
+    ) -> List[dict]:
+        # A retweet lives on its post's shard, so each shard can flag its own superseded events
+        def fetch(before: Optional[int], window: int) -> List[Row]:
+            query = self._timeline_query(window, before, user_ids)[0]
+            pages = self._scatter(lambda db: db.execute(query).all())
+            return list(islice(heapq.merge(*pages, key=lambda row: row.event_id, reverse=True), window))
+
+        rows = self._page_timeline(fetch, limit, before)
+        usernames = self._usernames(
+            {row.owner_id for row in rows} | {row.retweeter_id for row in rows if row.retweeter_id is not None}
+        )
+        return [
+            self._timeline_entry({
+                **row._mapping,
+                "owner_username": usernames.get(row.owner_id),
+                "retweeted_by": usernames.get(row.retweeter_id),
+            })
+            for row in rows
+        ]
+
+    def get_posts_with_counts_by_ids(self, current_user_id: int, ids: List[int]) -> List[dict]:
+        rows = {}
+        for db, post_ids in self._sessions_for_posts(ids):
+            for row in PostRepository(db)._posts_with_counts_by_ids(current_user_id, post_ids):
+                rows[row.id] = row
+        usernames = self._usernames(row.owner_id for row in rows.values())
+        return [
+            {**rows[post_id]._mapping, "owner_username": usernames.get(rows[post_id].owner_id)}
+            for post_id in ids
+            if post_id in rows
+        ]
+
+    def feed_candidates(self, owner_ids: Collection[int], after: Optional[int] = None, limit: int = 300) -> List[Row]:
+        # A user's posts all live on their shard
+        by_shard: Dict[int, List[int]] = {}
+        for owner_id in owner_ids:
+            by_shard.setdefault(self.router.shard_for_user(owner_id), []).append(owner_id)
+        pages = [
+            PostRepository(self._shard_session(shard)).feed_candidates(owned, after, limit)
+            for shard, owned in sorted(by_shard.items())
+        ]
+        return list(islice(heapq.merge(*pages, key=lambda row: row.id, reverse=True), limit))
+
+    def trending_candidates(self, after: int, limit: int = 300) -> List[Row]:
+        pages = self._scatter(lambda db: PostRepository(db).trending_candidates(after, limit))
+        rows = [row for page in pages for row in page]
+        rows.sort(key=lambda row: (row.likes_count + row.retweets_count, row.id), reverse=True)
+        return rows[:limit]
+
+    def affinity(self, user_id: int, owner_ids: Collection[int]) -> Dict[int, int]:
+        # A like or retweet lives on its post's shard, so any shard may hold some
+        counts: Dict[int, int] = {}
+        for page in self._scatter(lambda db: PostRepository(db).affinity(user_id, owner_ids)):
+            for owner_id, count in page.items():
+                counts[owner_id] = counts.get(owner_id, 0) + count
+        return counts
+
+    def post_stats_by_owner(self, owner_ids: Collection[int]) -> Dict[int, Dict[str, int]]:
+        owner_ids = list(owner_ids)
+        stats = {owner_id: {"posts_count": 0, "likes_received": 0} for owner_id in owner_ids}
+        for shard in range(self.router.shard_count):
+            owned = [owner_id for owner_id in owner_ids if self.router.shard_for_user(owner_id) == shard]
+            if owned:
+                stats.update(PostRepository(self._shard_session(shard)).post_stats_by_owner(owned))
+        return stats
+
+    def _finish_primary(self, succeeded: bool) -> bool:
+        # Work the caller queued on the primary (notification jobs, counters) commits only once the shard write has
+        if succeeded:
+            self.db.commit()
+        else:
+            self.db.rollback()
+        return succeeded
+
+    def _insert_interaction(self, model, post_id: int, user_id: int) -> bool:
+        return self._finish_primary(super()._insert_interaction(model, post_id, user_id))
+
+    def _delete_interaction(self, model, post_id: int, user_id: int) -> bool:
+        return self._finish_primary(super()._delete_interaction(model, post_id, user_id))
+
+    def _sessions_for_posts(self, post_ids: Collection[int]) -> List[Tuple[Session, List[int]]]:
+        by_shard: Dict[int, List[int]] = {}
+        for post_id in post_ids:
+            by_shard.setdefault(self.router.shard_for_post(post_id), []).append(post_id)
+        return [(self._shard_session(shard), ids) for shard, ids in sorted(by_shard.items())]
+
+    def delete_many(self, ids: Collection[int]) -> int:
+        deleted = super().delete_many(ids)
+        self._finish_primary(deleted > 0)
+        return deleted
+
+    def update_many(self, rows: Iterable[dict]) -> int:
+        rows = {row["id"]: row for row in rows}
+        updated = 0
+        for db, post_ids in self._sessions_for_posts(list(rows)):
+            updated += self._update_many(db, [rows[post_id] for post_id in post_ids])
+            db.commit()
+        self._invalidate(self._cache_keys(list(rows)))
+        return updated
+
+    def create_many(self, rows: Iterable[dict], returning: bool = True) -> List[Post]:
+        by_shard: Dict[int, List[dict]] = {}
+        for row in rows:
+            shard = self.router.shard_for_user(row["owner_id"])
+            by_shard.setdefault(shard, []).append({"id": next_id(shard), **row})
+        posts = []
+        for shard, shard_rows in sorted(by_shard.items()):
+            db = self._shard_session(shard)
+            inserted = self._insert_many(db, shard_rows, returning)
+            self._commit_loaded(db, inserted)
+            posts.extend(inserted)
+        self._finish_primary(True)
+        # Snowflake ids follow the order the rows came in
+        return self._attach_owners(sorted(posts, key=lambda post: post.id))
+
+    def create(self, **kwargs) -> Post:
+        shard = self.router.shard_for_user(kwargs["owner_id"])
+        db = self._shard_session(shard)
+        post = self._insert_returning(db, [{"id": next_id(shard), **kwargs}])[0]
+        self._commit_loaded(db, [post])
+        self._finish_primary(True)
+        return self._attach_owners([post])[0]
+
+    def edit(self, id: int, owner_id: int, content: str, created_after: datetime) -> Optional[Post]:
+        post = super().edit(id, owner_id, content, created_after)
+        return self._attach_owners([post])[0] if post is not None else None
+
+    def update(self, id: int, **kwargs) -> Optional[Post]:
+        db = self._session_for_post(id)
+        post = self._update_returning(db, id, kwargs)
+        if post is None:
+            db.rollback()
+            return None
+        self._commit_loaded(db, [post])
+        self._invalidate(self._cache_keys([id]))
+        return self._attach_owners([post])[0]
+
+
+@contextmanager
+def open_post_repository(db: Session, router: ShardRouter) -> Iterator[PostRepository]:
+    """
+    The post repository for a primary session: posts stay on that session
+    unless the router has shards, whose sessions are closed on exit
+    """
+    if not router.shards:
+        yield PostRepository(db)
+        return
+    repo = ShardedPostRepository(db, router)
+    try:
+        yield repo
+    finally:
+        repo.close()
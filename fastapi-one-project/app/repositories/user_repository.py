@@ -0,0 +1,97 @@
+import re
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Iterable, List, Optional
+from .base import BaseRepository
+from ..core.cache import user_cache
+from ..models import Follow, User
+
+# Unique columns by the names databases report a violation of them under:
+# SQLite names the column ("UNIQUE constraint failed: users.email"), PostgreSQL the index
+UNIQUE_CONSTRAINTS = {
+    "users.username": "username",
+    "ix_users_username": "username",
+    "users.email": "email",
+    "ix_users_email": "email",
+}
+# "UNIQUE constraint failed: users.email" or '... violates unique constraint "ix_users_email"'
+_CONSTRAINT_NAMES = re.compile(r'UNIQUE constraint failed: ([\w., ]+)|unique constraint "([^"]+)"')
+
+class UserRepository(BaseRepository[User]):
+    cache = user_cache
+    # Password hashes stay out of the cache, and so out of the shared tier
+    cache_exclude = ("hashed_password",)
+
+    def __init__(self, db: Session):
+        super().__init__(User, db)
+
+    def get_by_username(self, username: str) -> Optional[User]:
+        return self.db.query(User).filter(User.username == username).first()
+
+    def get_by_username_cached(self, username: str) -> Optional[User]:
+        # Same detached copy as get_cached, looked up by the name tokens carry
+        values = self.cache.get_or_load(f"username:{username}", lambda: self._snapshot(self.get_by_username(username)))
+        return self._restore(values) if values is not None else None
+
+    def _cache_keys(self, ids: List[int]) -> List:
+        # Users are cached by username too; read it before a write can change it
+        if not ids:
+            return []
+        usernames = self.db.scalars(select(User.username).where(User.id.in_(ids))).all()
+        return [*ids, *(f"username:{username}" for username in usernames)]
+
+    def insert_many(self, rows: Iterable[dict]) -> int:
+        """
+        Insert user rows with a single executemany and commit
+        Rows must already carry hashed_password
+        """
+        rows = list(rows)
+        if rows:
+            self.db.execute(insert(User), rows)
+            self.db.commit()
+        return len(rows)
+
+    def follow(self, follower_id: int, followee_id: int) -> bool:
+        """
+        Add a follow in the caller's transaction; not committed here
+        Returns False, after rolling back, if the follow already exists
+        """
+        try:
+            self.db.execute(insert(Follow).values(follower_id=follower_id, followee_id=followee_id))
+        except IntegrityError:
+            self.db.rollback()
+            return False
+        return True
+
+    def unfollow(self, follower_id: int, followee_id: int) -> bool:
+        """
+        Remove a follow in the caller's transaction; not committed here
+        """
+        return self.db.execute(
+            delete(Follow).where(Follow.c.follower_id == follower_id, Follow.c.followee_id == followee_id)
+        ).rowcount > 0
+
+    def followee_ids(self, follower_id: int) -> List[int]:
+        """
+        The ids of the users follower_id follows, read from the follows primary key
+        """
+        return list(self.db.scalars(select(Follow.c.followee_id).where(Follow.c.follower_id == follower_id)))
+
+    @staticmethod
+    def conflicting_field(exc: IntegrityError) -> Optional[str]:
+        """
+        Name the unique column an IntegrityError was raised for
+        Matches the constraint or index name the database reported against
+        UNIQUE_CONSTRAINTS exactly, so a column that merely contains "email"
+        in its name isn't mistaken for it
+        """
+        diag = getattr(exc.orig, "diag", None)
+        names = [diag.constraint_name] if getattr(diag, "constraint_name", None) else []
+        for match in _CONSTRAINT_NAMES.finditer(str(exc.orig)):
+            names.extend(name.strip() for name in (match.group(1) or match.group(2)).split(","))
+        for name in names:
+            if name in UNIQUE_CONSTRAINTS:
+                return UNIQUE_CONSTRAINTS[name]
+        return None
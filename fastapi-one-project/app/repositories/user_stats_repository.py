@@ -0,0 +1,67 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from .base import BaseRepository
+from ..core.database import upsert
+from ..models import Follow, User, UserStats
+
+STAT_COLUMNS = ("posts_count", "followers_count", "following_count", "likes_received")
+
+stats = UserStats.__table__
+
+
+class UserStatsRepository(BaseRepository[UserStats]):
+    def __init__(self, db: Session):
+        super().__init__(UserStats, db)
+
+    def get_profile(self, username: str) -> Optional[Tuple[User, Optional[UserStats]]]:
+        # One indexed lookup: the username index, then user_stats by primary key
+        return self.db.execute(
+            select(User, UserStats)
+            .outerjoin(UserStats, UserStats.user_id == User.id)
+            .where(User.username == username)
+        ).first()
+
+    def increment(self, user_id: int, **deltas: int) -> None:
+        """
+        Add deltas to a user's counters in the caller's transaction; not committed here
+        One upsert, so the row is created on the user's first counted write
+        """
+        deltas = {column: delta for column, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        statement = upsert(self.db, stats).values(user_id=user_id, **deltas)
+        statement = statement.on_conflict_do_update(
+            index_elements=[stats.c.user_id],
+            set_={column: stats.c[column] + statement.excluded[column] for column in deltas},
+        )
+        self.db.execute(statement)
+
+    def follow_counts(self, user_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        user_ids = list(user_ids)
+        counts = {user_id: {"followers_count": 0, "following_count": 0} for user_id in user_ids}
+        for column, key in ((Follow.c.followee_id, "followers_count"), (Follow.c.follower_id, "following_count")):
+            rows = self.db.execute(
+                select(column, func.count()).where(column.in_(user_ids)).group_by(column)
+            ).all()
+            for user_id, count in rows:
+                counts[user_id][key] = count
+        return counts
+
+    def replace(self, rows: List[dict]) -> None:
+        """
+        Overwrite the counters of the given users with freshly computed values; not committed here
+        """
+        if not rows:
+            return
+        statement = upsert(self.db, stats)
+        statement = statement.on_conflict_do_update(
+            index_elements=[stats.c.user_id],
+            set_={column: statement.excluded[column] for column in STAT_COLUMNS},
+        )
+        self.db.execute(statement, rows)
+
+    def user_ids(self, after: int, limit: int) -> List[int]:
+        return list(self.db.scalars(select(User.id).where(User.id > after).order_by(User.id).limit(limit)))
@@ -7,34 +7,48 @@ This package contains all the Pydantic models used for:
 - OpenAPI schema generation
 
 The schemas are organized by domain:
-- user.py: User-related schemas
+- user.py: User and profile schemas
 - auth.py: Authentication-related schemas
-- post.py: Post, Like, and Retweet schemas
+- post.py: Post, PostRevision, ScheduledPost, Timeline, Like, and Retweet schemas
+- notification.py: Notification inbox schemas
 """
 
-from .user import UserBase, UserCreate, User
-from .auth import Token, TokenData
+from .user import UserBase, UserCreate, User, UserProfile
+from .auth import Token, TokenData, TokenRefresh
 from .post import (
     PostBase,
     PostCreate,
     Post,
     PostWithCounts,
     PostUpdate,
+    PostRevision,
+    ScheduledPostCreate,
+    ScheduledPost,
+    TimelineEntry,
     Like,
     Retweet,
 )
+from .notification import Notification, UnreadCount
 
 __all__ = [
     "UserBase",
     "UserCreate",
     "User",
+    "UserProfile",
     "Token",
     "TokenData",
+    "TokenRefresh",
     "PostBase",
     "PostCreate",
     "Post",
     "PostWithCounts",
     "PostUpdate",
+    "PostRevision",
+    "ScheduledPostCreate",
+    "ScheduledPost",
+    "TimelineEntry",
     "Like",
     "Retweet",
+    "Notification",
+    "UnreadCount",
 ] 
\ No newline at end of file
@@ -3,14 +3,19 @@ from typing import Optional
 
 # Token Schemas
 # Token is used to authenticate users and access protected routes.
-# It contains an access token and a token type.
-#                     BaseModel
-#                 |                  |
-#      Token : BaseModel     TokenData : BaseModel       
+# It contains an access token, a token type and a refresh token.
+# TokenRefresh carries a refresh token to exchange for a new token pair.
+#                               BaseModel
+#                 |                  |                      |
+#      Token : BaseModel     TokenData : BaseModel     TokenRefresh : BaseModel
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
 class TokenData(BaseModel):
-    username: Optional[str] = None 
\ No newline at end of file
+    username: Optional[str] = None
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
\ No newline at end of file
@@ -0,0 +1,42 @@
+from pydantic import BaseModel, ConfigDict, computed_field
+from datetime import datetime
+from typing import Optional
+
+# Notification Schemas
+# Notification is one inbox row; grouped rows carry the latest actor and how many acted.
+#                   BaseModel
+#                 |           |
+#   Notification : BaseModel   UnreadCount : BaseModel
+
+VERBS = {
+    "like": "liked your post",
+    "retweet": "retweeted your post",
+    "follow": "followed you",
+    "mention": "mentioned you in a post",
+}
+
+class Notification(BaseModel):
+    id: int
+    kind: str
+    post_id: Optional[int] = None
+    sort_key: int
+    actor_username: Optional[str] = None
+    actor_count: int
+    read_at: Optional[datetime] = None
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @computed_field
+    @property
+    def message(self) -> str:
+        actor = self.actor_username or "Someone"
+        others = self.actor_count - 1
+        if others == 1:
+            actor = f"{actor} and 1 other"
+        elif others > 1:
+            actor = f"{actor} and {others} others"
+        return f"{actor} {VERBS.get(self.kind, self.kind)}"
+
+class UnreadCount(BaseModel):
+    unread: int
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from datetime import datetime
 from pydantic import ConfigDict
+from typing import Optional
 
 # Post Schemas 
 # Post is used to represent a post in the microblog.
@@ -13,6 +14,23 @@ from pydantic import ConfigDict
 #              |
 #      PostWithCounts : Post
 
+# PostRevision is the content an edit replaced, and when.
+#                 BaseModel
+#                    |
+#         PostRevision : BaseModel
+
+# Scheduled Post Schemas
+# ScheduledPostCreate is a post to publish at publish_at; ScheduledPost is one waiting (or sent).
+#                 PostBase                          BaseModel
+#                    |                                  |
+#     ScheduledPostCreate : PostBase        ScheduledPost : BaseModel
+
+# Timeline Schemas
+# TimelineEntry is one event of a timeline: a post, or a retweet of it.
+#                 BaseModel
+#                    |
+#       TimelineEntry : BaseModel
+
 # Like Schemas
 # Like is used to represent a like in the microblog.
 # It contains a user_id and post_id.
@@ -51,6 +69,32 @@ class PostWithCounts(Post):
 class PostUpdate(PostBase):
     pass
 
+class PostRevision(BaseModel):
+    id: int
+    post_id: int
+    content: str
+    replaced_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ScheduledPostCreate(PostBase):
+    publish_at: datetime  # Read as UTC when it carries no timezone
+
+class ScheduledPost(BaseModel):
+    id: int
+    content: str
+    publish_at: datetime
+    status: str
+    post_id: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class TimelineEntry(BaseModel):
+    event_id: int
+    post: Post
+    retweeted_by: Optional[str] = None
+    retweeted_at: Optional[datetime] = None
+
 class Like(BaseModel):
     user_id: int
     post_id: int
@@ -8,7 +8,7 @@ from datetime import datetime
 #                     |
 #            UserBase : BaseModel
 #             |                  |
-#      UserCreate : UserBase   User : UserBase     
+#      UserCreate : UserBase   User : UserBase     UserProfile : BaseModel
 
 class UserBase(BaseModel):
     username: str
@@ -21,4 +21,14 @@ class User(UserBase):
     id: int
     created_at: datetime
     
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class UserProfile(BaseModel):
+    # Public profile; counts come from user_stats, email is never shown
+    id: int
+    username: str
+    created_at: datetime
+    posts_count: int = 0
+    followers_count: int = 0
+    following_count: int = 0
+    likes_received: int = 0
@@ -0,0 +1,235 @@
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import DateTime, Table, insert, inspect
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from ..core.ids import TimestampIds
+from ..core.sharding import SHARDED_TABLES, ShardRouter
+from ..models import Follow, Like, Post, Retweet, User
+from ..repositories.sharded_post_repository import open_post_repository
+from ..repositories.user_repository import UserRepository
+from .profile_service import ProfileService
+from .user_service import PasswordHashPipeline
+
+# Load order: a chunk of a later table is only written once every earlier table's pending rows are
+LOAD_TABLES: Dict[str, Table] = {
+    "users": User.__table__,
+    "posts": Post.__table__,
+    "follows": Follow,
+    "likes": Like.__table__,
+    "retweets": Retweet.__table__,
+}
+RECORD_TABLES = {"user": "users", "post": "posts", "follow": "follows", "like": "likes", "retweet": "retweets"}
+
+# Per-connection settings for the duration of a SQLite load: no fsync per
+# transaction, a 256 MB page cache and in-memory temp storage for index builds.
+# A crash mid-load can lose the chunks since the last checkpoint, never corrupt committed ones.
+SQLITE_LOAD_PRAGMAS = {"synchronous": "OFF", "cache_size": "-262144", "temp_store": "MEMORY"}
+
+ProgressCallback = Callable[[str, int, float], None]
+
+
+@dataclass
+class LoadReport:
+    rows: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(LOAD_TABLES, 0))
+    seconds: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return sum(self.rows.values())
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.seconds if self.seconds else 0.0
+
+
+class BulkLoader:
+    """
+    Loads users, posts, follows, likes and retweets for staging and migrations
+    Rows are written chunk_size at a time, each chunk one executemany in its own
+    transaction, bypassing the ORM. Plain-text passwords are hashed across a
+    process pool while the previous chunk of users is inserted. With
+    defer_indexes the secondary (non-unique) indexes are dropped for the load
+    and rebuilt once at the end, which beats maintaining them row by row when
+    the load is a sizeable share of the table; unique indexes stay, so
+    duplicates are still rejected. On SQLite the connections run with
+    SQLITE_LOAD_PRAGMAS until the load finishes.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        router: ShardRouter,
+        chunk_size: int = 5000,
+        hash_workers: Optional[int] = None,
+        defer_indexes: bool = True,
+        share_password_hashes: bool = False,
+        rebuild_stats: bool = True,
+        progress: Optional[ProgressCallback] = None,
+    ):
+        self.engine = engine
+        self.router = router
+        self.chunk_size = chunk_size
+        self.hash_workers = hash_workers
+        self.defer_indexes = defer_indexes
+        # Hash each distinct password once: only for fixture data, as equal hashes reveal equal passwords
+        self.share_password_hashes = share_password_hashes
+        self.rebuild_stats = rebuild_stats
+        self.progress = progress
+        self._date_columns = {
+            name: [column.name for column in table.columns if isinstance(column.type, DateTime)]
+            for name, table in LOAD_TABLES.items()
+        }
+
+    def load(self, records: Iterable[dict]) -> LoadReport:
+        """
+        Takes type-tagged records ({"type": "post", ...}), as written by the export
+        Users carry either a plain-text password or a hashed_password
+        Returns the rows loaded per table and the elapsed time
+        """
+        report = LoadReport()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            connections = {
+                index: stack.enter_context(self._load_connection(index, engine))
+                for index, engine in enumerate(self._engines())
+            }
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=self.hash_workers))
+            state = _LoadState(self, connections, executor, report, started)
+            for record in records:
+                table = RECORD_TABLES.get(record.get("type"))
+                if table is not None:
+                    state.add(table, record)
+            state.finish()
+        if self.rebuild_stats and report.total:
+            self._rebuild_stats()
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def _engines(self) -> List[Engine]:
+        # The primary first, then the shards; connections are keyed by this position
+        return [self.engine, *self.router.shards]
+
+    def _target(self, table: str, row: dict) -> int:
+        if table not in SHARDED_TABLES or not self.router.shards:
+            return 0
+        if table == "posts":
+            return 1 + self.router.shard_for_user(row["owner_id"])
+        return 1 + self.router.shard_for_post(row["post_id"])
+
+    def _tables_on(self, engine_index: int) -> List[Table]:
+        sharded = bool(self.router.shards)
+        return [
+            table for name, table in LOAD_TABLES.items()
+            if (name in SHARDED_TABLES and sharded) == (engine_index > 0)
+        ]
+
+    @contextmanager
+    def _load_connection(self, engine_index: int, engine: Engine) -> Iterator[Connection]:
+        connection = engine.connect()
+        pragmas, dropped = {}, []
+        try:
+            if engine.dialect.name == "sqlite":
+                for pragma, value in SQLITE_LOAD_PRAGMAS.items():
+                    pragmas[pragma] = connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+                    connection.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+                connection.commit()
+            if self.defer_indexes:
+                inspector = inspect(connection)
+                with connection.begin():
+                    for table in self._tables_on(engine_index):
+                        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+                        for index in table.indexes:
+                            if not index.unique and index.name in existing:
+                                index.drop(connection)
+                                dropped.append(index)
+            yield connection
+        finally:
+            # Rebuilt even when the load failed, so the database is never left without its indexes
+            if dropped:
+                with connection.begin():
+                    for index in dropped:
+                        index.create(connection)
+            for pragma, value in pragmas.items():
+                connection.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+            connection.close()
+
+    def _prepare(self, table: str, record: dict) -> dict:
+        columns = LOAD_TABLES[table].columns
+        row = {key: value for key, value in record.items() if key in columns or (table == "users" and key == "password")}
+        for name in self._date_columns[table]:
+            if isinstance(row.get(name), str):
+                row[name] = datetime.fromisoformat(row[name])
+        return row
+
+    def _rebuild_stats(self) -> None:
+        with Session(self.engine) as db, open_post_repository(db, self.router) as posts:
+            ProfileService(UserRepository(db), posts).rebuild_all_stats()
+
+
+class _LoadState:
+    """
+    Per-load buffers: one pending chunk per table, users held back while their passwords hash
+    """
+
+    def __init__(self, loader: BulkLoader, connections: Dict[int, Connection], executor: Executor, report: LoadReport, started: float):
+        self.loader = loader
+        self.connections = connections
+        self.report = report
+        self.started = started
+        self.buffers: Dict[str, List[dict]] = {name: [] for name in LOAD_TABLES}
+        self.hasher = PasswordHashPipeline(executor, share_hashes=loader.share_password_hashes)
+        self.ids = TimestampIds()
+
+    def add(self, table: str, record: dict) -> None:
+        buffer = self.buffers[table]
+        buffer.append(self.loader._prepare(table, record))
+        if len(buffer) >= self.loader.chunk_size:
+            self.flush(table)
+
+    def finish(self) -> None:
+        self.flush(list(LOAD_TABLES)[-1])
+
+    def flush(self, table: str) -> None:
+        """
+        Write the table's pending rows, after every earlier table's in LOAD_TABLES order,
+        so no row is written before the rows it references
+        A chunk of users is written while the next one hashes, unless a later table needs them now
+        """
+        for name in LOAD_TABLES:
+            rows, self.buffers[name] = self.buffers[name], []
+            if name == "users":
+                self._write(name, self.hasher.submit(rows))
+                if name != table:
+                    self._write(name, self.hasher.drain())
+            else:
+                self._write(name, rows)
+            if name == table:
+                return
+
+    def _write(self, table: str, rows: List[dict]) -> None:
+        if not rows:
+            return
+        if table == "posts":
+            for row in rows:
+                if "id" not in row and row.get("timestamp") is not None:
+                    row["id"] = self.ids.id_for(row["timestamp"], self.loader.router.shard_for_user(row["owner_id"]))
+        # executemany needs the same keys in every row, and each row goes to the database that holds it
+        groups: Dict[Tuple[int, Tuple[str, ...]], List[dict]] = {}
+        for row in rows:
+            groups.setdefault((self.loader._target(table, row), tuple(sorted(row))), []).append(row)
+        for target in sorted({target for target, _ in groups}):
+            connection = self.connections[target]
+            with connection.begin():
+                for (group_target, _), group in groups.items():
+                    if group_target == target:
+                        connection.execute(insert(LOAD_TABLES[table]), group)
+        self.report.rows[table] += len(rows)
+        if self.loader.progress is not None:
+            self.loader.progress(table, self.report.rows[table], time.perf_counter() - self.started)
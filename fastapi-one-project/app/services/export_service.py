@@ -0,0 +1,190 @@
+import base64
+import binascii
+import json
+import os
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Sequence, Union
+
+from sqlalchemy.orm import Session
+
+from ..core.exceptions import raise_bad_request_exception
+from ..core.metrics import metrics
+from ..core.sharding import SHARDED_TABLES, ShardRouter
+from ..repositories.export_repository import EXPORT_TABLES, ExportRepository
+
+EXPORT_ENTITIES = tuple(EXPORT_TABLES)
+RECORD_TYPES = {"posts": "post", "likes": "like", "retweets": "retweet", "follows": "follow"}
+# Uncompressed bytes buffered before a chunk is handed to the response
+FLUSH_BYTES = 64 * 1024
+
+
+@dataclass
+class Checkpoint:
+    """
+    Marks the end of a checkpoint in the byte stream: everything yielded so far
+    is covered by cursor, and nothing after it is
+    """
+    cursor: str
+
+
+@dataclass
+class ExportPosition:
+    entity: int
+    source: int
+    after: Optional[List]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+
+def _line(record: dict) -> bytes:
+    return json.dumps(record, separators=(",", ":"), default=_json_default).encode() + b"\n"
+
+
+class ExportService:
+    """
+    Streams posts, likes, retweets and follows as NDJSON
+    Entities are exported in the requested order, each from every database that
+    holds it (one per shard for sharded tables). Every checkpoint_rows rows, and
+    at the end of each database, a checkpoint line carries an opaque cursor;
+    passing it back resumes the export right after that line. With compress
+    each checkpoint closes a gzip member, so a file truncated at a checkpoint is
+    still valid gzip and the resumed output can be appended to it.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        router: ShardRouter,
+        batch_size: int = 1000,
+        checkpoint_rows: int = 10_000,
+    ):
+        self.session_factory = session_factory
+        self.router = router
+        self.batch_size = batch_size
+        self.checkpoint_rows = checkpoint_rows
+
+    def export(
+        self, entities: Sequence[str], cursor: Optional[str] = None, compress: bool = False
+    ) -> Iterator[Union[bytes, Checkpoint]]:
+        """
+        Takes the entities to export and an optional cursor to resume from
+        Validates both before anything is streamed
+        Returns an iterator of output bytes interleaved with Checkpoint markers
+        """
+        entities = list(entities)
+        unknown = [entity for entity in entities if entity not in EXPORT_TABLES]
+        if unknown or not entities:
+            raise_bad_request_exception(f"Entities must be among: {', '.join(EXPORT_ENTITIES)}")
+        start = self._decode_cursor(cursor, entities) if cursor else ExportPosition(0, 0, None)
+        return self._encode(self._records(entities, start), compress)
+
+    def _sources(self, entity: str) -> int:
+        return self.router.shard_count if entity in SHARDED_TABLES and self.router.shards else 1
+
+    def _session(self, entity: str, source: int) -> Session:
+        if entity in SHARDED_TABLES and self.router.shards:
+            return self.router.session(source)
+        return self.session_factory()
+
+    def _records(self, entities: List[str], start: ExportPosition) -> Iterator[Union[dict, Checkpoint]]:
+        for entity_index in range(start.entity, len(entities)):
+            entity = entities[entity_index]
+            first_source = start.source if entity_index == start.entity else 0
+            for source in range(first_source, self._sources(entity)):
+                after = start.after if (entity_index, source) == (start.entity, start.source) else None
+                since_checkpoint = 0
+                with self._session(entity, source) as db:
+                    for batch in ExportRepository(db).stream(entity, after, self.batch_size):
+                        for row in batch:
+                            yield {"type": RECORD_TYPES[entity], **row}
+                        metrics.increment("export_rows_total", len(batch), entity=entity)
+                        since_checkpoint += len(batch)
+                        if since_checkpoint >= self.checkpoint_rows:
+                            since_checkpoint = 0
+                            key = ExportRepository.key_of(entity, batch[-1])
+                            yield Checkpoint(self._encode_cursor(entities, entity_index, source, key))
+                yield Checkpoint(self._encode_cursor(entities, entity_index, source + 1, None))
+
+    def _encode(self, records: Iterator[Union[dict, Checkpoint]], compress: bool) -> Iterator[Union[bytes, Checkpoint]]:
+        # wbits=31 writes gzip framing; each member is finished at a checkpoint
+        compressor = zlib.compressobj(wbits=31) if compress else None
+        buffer, buffered = [], 0
+        exported = 0
+        for record in records:
+            checkpoint = isinstance(record, Checkpoint)
+            line = _line({"type": "checkpoint", "cursor": record.cursor} if checkpoint else record)
+            buffer.append(line)
+            buffered += len(line)
+            exported += not checkpoint
+            if not checkpoint and buffered < FLUSH_BYTES:
+                continue
+            data = b"".join(buffer)
+            buffer, buffered = [], 0
+            if compressor is not None:
+                data = compressor.compress(data)
+                if checkpoint:
+                    data += compressor.flush()
+                    compressor = zlib.compressobj(wbits=31)
+            if data:
+                yield data
+            if checkpoint:
+                yield record
+        done = _line({"type": "done", "rows": exported})
+        yield compressor.compress(done) + compressor.flush() if compressor is not None else done
+
+    @staticmethod
+    def _encode_cursor(entities: List[str], entity: int, source: int, after: Optional[List]) -> str:
+        state = {"entities": entities, "entity": entity, "source": source, "after": after}
+        return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str, entities: List[str]) -> ExportPosition:
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            position = ExportPosition(int(state["entity"]), int(state["source"]), state["after"])
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            raise_bad_request_exception("Invalid export cursor")
+        if state["entities"] != entities:
+            raise_bad_request_exception("The cursor belongs to an export of different entities")
+        return position
+
+
+def export_to_file(
+    service: ExportService,
+    path: str,
+    entities: Sequence[str],
+    compress: bool = False,
+    resume: bool = False,
+) -> None:
+    """
+    Write an export to a file, recording every checkpoint in path + ".checkpoint"
+    With resume the file is cut back to the last checkpoint and the export
+    continues from its cursor. The checkpoint file is removed once the export completes.
+    """
+    checkpoint_path = f"{path}.checkpoint"
+    cursor, offset = None, 0
+    if resume:
+        with open(checkpoint_path) as checkpoint_file:
+            state = json.load(checkpoint_file)
+        cursor, offset = state["cursor"], state["offset"]
+    chunks = service.export(entities, cursor, compress)
+    with open(path, "r+b" if resume else "wb") as output:
+        output.truncate(offset)
+        output.seek(offset)
+        for chunk in chunks:
+            if not isinstance(chunk, Checkpoint):
+                output.write(chunk)
+                continue
+            output.flush()
+            os.fsync(output.fileno())
+            temporary = f"{checkpoint_path}.tmp"
+            with open(temporary, "w") as checkpoint_file:
+                json.dump({"cursor": chunk.cursor, "offset": output.tell()}, checkpoint_file)
+            os.replace(temporary, checkpoint_path)
+    os.remove(checkpoint_path)
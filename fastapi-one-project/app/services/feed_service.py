@@ -0,0 +1,227 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..core.cache import LRUCache
+from ..core.config import get_settings
+from ..core.ids import EPOCH_MS, TIMESTAMP_SHIFT, id_at
+from ..core.metrics import metrics
+from ..repositories.post_repository import PostRepository
+from ..repositories.user_repository import UserRepository
+
+settings = get_settings()
+
+# Ranked lists per user ("user:{id}") and the shared trending candidates ("trending"), per worker
+ranked_feed_cache = LRUCache(settings.FEED_RANKED_CACHE_MAX_ENTRIES)
+
+CANDIDATE_COLUMNS = ("ids", "owners", "likes", "retweets", "followed", "affinity")
+
+
+@dataclass(frozen=True)
+class FeedWeights:
+    recency: float
+    velocity: float
+    affinity: float
+    followed: float
+    half_life_hours: float
+
+    @classmethod
+    def from_settings(cls) -> "FeedWeights":
+        return cls(
+            recency=settings.FEED_WEIGHT_RECENCY,
+            velocity=settings.FEED_WEIGHT_VELOCITY,
+            affinity=settings.FEED_WEIGHT_AFFINITY,
+            followed=settings.FEED_WEIGHT_FOLLOWED,
+            half_life_hours=settings.FEED_RECENCY_HALF_LIFE_HOURS,
+        )
+
+
+def score_candidates(
+    ids: np.ndarray,
+    likes: np.ndarray,
+    retweets: np.ndarray,
+    followed: np.ndarray,
+    affinity: np.ndarray,
+    now_ms: int,
+    weights: FeedWeights,
+) -> np.ndarray:
+    """
+    Scores every candidate at once; takes one array per signal, aligned on the post
+    Recency halves every half_life_hours of the post's age, read from its snowflake id.
+    Velocity is engagement per hour, a retweet counting twice a like; the two hours
+    added to the age keep a minute-old post with one like from topping the feed.
+    Velocity and affinity are log-damped so one viral post or favourite author
+    can't drown out the rest.
+    """
+    created_ms = (ids >> TIMESTAMP_SHIFT) + EPOCH_MS
+    age_hours = np.maximum(now_ms - created_ms, 0) / 3_600_000
+    recency = np.exp2(-age_hours / weights.half_life_hours)
+    velocity = (likes + 2 * retweets) / (age_hours + 2)
+    return (
+        weights.recency * recency
+        + weights.velocity * np.log1p(velocity)
+        + weights.affinity * np.log1p(affinity)
+        + weights.followed * followed
+    )
+
+
+def rank(candidates: Dict[str, np.ndarray], now_ms: int, weights: FeedWeights) -> List[int]:
+    """
+    The candidate post ids, best first; equal scores go newest first
+    """
+    scores = score_candidates(
+        candidates["ids"], candidates["likes"], candidates["retweets"],
+        candidates["followed"], candidates["affinity"], now_ms, weights,
+    )
+    order = np.lexsort((-candidates["ids"], -scores))
+    return candidates["ids"][order].tolist()
+
+
+class FeedService:
+    """
+    The ranked "For You" feed
+    Candidates are the newest posts of followed users plus the most engaged posts of
+    the last day, scored together in NumPy. Each user's candidates and ranking are
+    kept in ranked_feed_cache: a page is served from it while fresh, a stale list
+    only fetches posts newer than the ones it has and is scored again, and after
+    FEED_REBUILD_SECONDS (or when the user's follows change) it is built from scratch.
+    Building stays within a latency budget: once it is spent, the optional stages
+    (trending candidates, author affinity) are skipped and the list is rebuilt on the
+    next request instead of being refreshed.
+    """
+
+    def __init__(
+        self,
+        posts: PostRepository,
+        users: UserRepository,
+        cache: LRUCache = ranked_feed_cache,
+        clock=time.time,
+        latency_budget_ms: Optional[float] = None,
+        weights: Optional[FeedWeights] = None,
+    ):
+        self.posts = posts
+        self.users = users
+        self.cache = cache
+        self._clock = clock
+        self.latency_budget_ms = settings.FEED_LATENCY_BUDGET_MS if latency_budget_ms is None else latency_budget_ms
+        self.weights = weights or FeedWeights.from_settings()
+
+    def get_for_you(self, user_id: int, skip: int = 0, limit: int = 20) -> List[dict]:
+        """
+        Takes the reader and the skip and limit of the page
+        Ranks the reader's candidates, or reuses the cached ranking
+        Returns the page of posts with counts, in ranked order; the chronological
+        feed when there is nothing to rank
+        """
+        entry = self.get_ranking(user_id)
+        if not entry["ranked"]:
+            metrics.increment("feed_ranking_requests_total", path="fallback")
+            return self.posts.get_posts_with_counts(user_id, skip, limit)
+        return self.posts.get_posts_with_counts_by_ids(user_id, entry["ranked"][skip:skip + limit])
+
+    def get_ranking(self, user_id: int) -> dict:
+        key = f"user:{user_id}"
+        now = self._clock()
+        entry = self.cache.get(key)
+        if entry is not None and now - entry["refreshed_at"] < settings.FEED_REFRESH_SECONDS:
+            metrics.increment("feed_ranking_requests_total", path="hit")
+            return entry
+
+        deadline = time.perf_counter() + self.latency_budget_ms / 1000
+        followees = self.users.followee_ids(user_id)
+        if entry is not None and entry["complete"] and entry["followees"] == set(followees):
+            metrics.increment("feed_ranking_requests_total", path="refresh")
+            entry = self._refresh(entry, now)
+            ttl = settings.FEED_REBUILD_SECONDS - (now - entry["built_at"])
+        else:
+            metrics.increment("feed_ranking_requests_total", path="rebuild")
+            entry = self._build(user_id, followees, now, deadline)
+            ttl = settings.FEED_REBUILD_SECONDS
+        self.cache.set(key, entry, ttl)
+        return entry
+
+    def _build(self, user_id: int, followees: Sequence[int], now: float, deadline: float) -> dict:
+        limit = settings.FEED_CANDIDATES_PER_SOURCE
+        followed_rows = self.posts.feed_candidates(followees, limit=limit)
+        complete = True
+
+        trending_rows = self._trending(now, deadline)
+        if trending_rows is None:
+            metrics.increment("feed_ranking_degraded_total", stage="trending")
+            trending_rows, complete = [], False
+
+        # Trending posts already among the followed ones, and the reader's own, are left out
+        seen = {row.id for row in followed_rows}
+        trending_rows = [row for row in trending_rows if row.id not in seen and row.owner_id != user_id]
+        owners = {row.owner_id for row in followed_rows} | {row.owner_id for row in trending_rows}
+
+        if time.perf_counter() < deadline:
+            affinity = self.posts.affinity(user_id, owners)
+        else:
+            metrics.increment("feed_ranking_degraded_total", stage="affinity")
+            affinity, complete = {}, False
+
+        candidates = _concat(
+            _candidates(followed_rows, True, affinity),
+            _candidates(trending_rows, False, affinity),
+        )
+        return {
+            "followees": set(followees),
+            "affinity": affinity,
+            "candidates": candidates,
+            # Newest followed post ranked; the next refresh fetches only posts after it
+            "watermark": max(seen, default=None),
+            "ranked": rank(candidates, int(now * 1000), self.weights),
+            "complete": complete,
+            "built_at": now,
+            "refreshed_at": now,
+        }
+
+    def _refresh(self, entry: dict, now: float) -> dict:
+        limit = settings.FEED_CANDIDATES_PER_SOURCE
+        rows = self.posts.feed_candidates(entry["followees"], after=entry["watermark"], limit=limit)
+        candidates = entry["candidates"]
+        if rows:
+            candidates = _concat(_candidates(rows, True, entry["affinity"]), candidates)
+        ranked = rank(candidates, int(now * 1000), self.weights)
+        # Keep the list bounded: the lowest ranked fall off as new posts come in
+        if len(ranked) > 2 * limit:
+            ranked = ranked[:2 * limit]
+            keep = np.isin(candidates["ids"], ranked)
+            candidates = {column: values[keep] for column, values in candidates.items()}
+        return {
+            **entry,
+            "candidates": candidates,
+            "watermark": max((row.id for row in rows), default=entry["watermark"]),
+            "ranked": ranked,
+            "refreshed_at": now,
+        }
+
+    def _trending(self, now: float, deadline: float) -> Optional[list]:
+        # Shared by every reader, so it is fetched at most once per refresh interval
+        entry = self.cache.get("trending")
+        if entry is not None:
+            return entry["rows"]
+        if time.perf_counter() >= deadline:
+            return None
+        after = id_at(int((now - settings.FEED_TRENDING_WINDOW_HOURS * 3600) * 1000))
+        rows = self.posts.trending_candidates(after, settings.FEED_CANDIDATES_PER_SOURCE)
+        self.cache.set("trending", {"rows": rows}, settings.FEED_REFRESH_SECONDS)
+        return rows
+
+
+def _candidates(rows: list, followed: bool, affinity: Dict[int, int]) -> Dict[str, np.ndarray]:
+    return {
+        "ids": np.fromiter((row.id for row in rows), dtype=np.int64, count=len(rows)),
+        "owners": np.fromiter((row.owner_id for row in rows), dtype=np.int64, count=len(rows)),
+        "likes": np.fromiter((row.likes_count for row in rows), dtype=np.float64, count=len(rows)),
+        "retweets": np.fromiter((row.retweets_count for row in rows), dtype=np.float64, count=len(rows)),
+        "followed": np.full(len(rows), float(followed)),
+        "affinity": np.fromiter((affinity.get(row.owner_id, 0) for row in rows), dtype=np.float64, count=len(rows)),
+    }
+
+
+def _concat(*parts: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {column: np.concatenate([part[column] for part in parts]) for column in CANDIDATE_COLUMNS}
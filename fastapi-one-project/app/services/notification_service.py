@@ -0,0 +1,75 @@
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..jobs import enqueue, job
+from ..models import Notification, User
+from ..repositories.notification_repository import GroupKey, NotificationRepository
+
+NOTIFICATION_KINDS = ("like", "retweet", "follow", "mention")
+MENTION_PATTERN = re.compile(r"(?<!\w)@(\w{1,50})")
+
+
+def queue_notification(db: Session, kind: str, recipient_id: int, actor_id: int, post_id: Optional[int] = None) -> None:
+    """
+    Queue a notification in the caller's transaction; users aren't notified of their own actions
+    """
+    if recipient_id is None or recipient_id == actor_id:
+        return
+    enqueue(db, "notify", {"kind": kind, "recipient_id": recipient_id, "actor_id": actor_id, "post_id": post_id})
+
+
+def queue_mentions(db: Session, actor_id: int, post_id: int, content: str) -> bool:
+    """
+    Queue a mention notification for every @username in a post
+    Usernames are resolved by the job, not on the request path
+    Returns whether anything was queued
+    """
+    usernames = sorted(set(MENTION_PATTERN.findall(content)))
+    if not usernames:
+        return False
+    enqueue(db, "notify", {"kind": "mention", "usernames": usernames, "actor_id": actor_id, "post_id": post_id})
+    return True
+
+
+@job("notify", batch=True)
+def generate_notifications(db: Session, payloads: List[dict]) -> None:
+    """
+    Turn a batch of queued events into inbox rows
+    Events are grouped per recipient, kind and post first, so a burst of likes
+    on one post becomes a single row update
+    """
+    mentioned = {name for payload in payloads for name in payload.get("usernames", ())}
+    user_ids = dict(db.execute(select(User.username, User.id).where(User.username.in_(mentioned))).all()) if mentioned else {}
+
+    groups: Dict[GroupKey, List[int]] = OrderedDict()
+    for payload in payloads:
+        if payload["kind"] == "mention":
+            recipients = [user_ids.get(name) for name in payload["usernames"]]
+        else:
+            recipients = [payload["recipient_id"]]
+        for recipient_id in recipients:
+            if recipient_id is None or recipient_id == payload["actor_id"]:
+                continue
+            actors = groups.setdefault((recipient_id, payload["kind"], payload.get("post_id")), [])
+            if payload["actor_id"] in actors:
+                actors.remove(payload["actor_id"])
+            actors.append(payload["actor_id"])
+    NotificationRepository(db).add_events(groups)
+
+
+class NotificationService:
+    def __init__(self, repository: NotificationRepository):
+        self.repository = repository
+
+    def get_inbox(self, user_id: int, limit: int = 20, before: Optional[int] = None) -> List[Notification]:
+        return self.repository.get_inbox(user_id, limit, before)
+
+    def unread_count(self, user_id: int) -> int:
+        return self.repository.unread_count(user_id)
+
+    def mark_read(self, user_id: int, up_to: Optional[int] = None) -> int:
+        return self.repository.mark_read(user_id, up_to)
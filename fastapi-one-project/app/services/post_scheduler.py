@@ -0,0 +1,200 @@
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from sqlalchemy.orm import sessionmaker
+
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from ..core.metrics import metrics
+from ..core.sharding import shard_router
+from ..repositories.scheduled_post_repository import ScheduledPostRepository
+from ..repositories.sharded_post_repository import open_post_repository
+from ..schemas import PostCreate
+from .post_service import PostService
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class PostScheduler:
+    """
+    Publishes scheduled posts at their publish_at from an in-memory timer heap
+    Instead of polling the table every second, each worker leases the posts due within
+    lookahead_seconds into its heap and sleeps until the earliest one. A recovery scan
+    every scan_seconds leases posts entering the window and posts whose lease ran out
+    on a worker that died; the lease keeps every post on exactly one worker's heap.
+    Posts scheduled on this worker for inside the window are handed over directly.
+    Publishing goes through PostService.create_post, so counters and mention
+    notifications are written just as for a post created by hand.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker,
+        lookahead_seconds: float = 300.0,
+        scan_seconds: float = 60.0,
+        lease_seconds: float = 60.0,
+        batch_size: int = 1000,
+        worker_id: Optional[str] = None,
+        clock=time.time,
+    ):
+        self.session_factory = session_factory
+        self.lookahead_seconds = lookahead_seconds
+        self.scan_seconds = scan_seconds
+        self.lease_seconds = lease_seconds
+        self.batch_size = batch_size
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, int]] = []  # (publish_at, scheduled post id)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def lease_for(self, publish_at: float) -> Optional[float]:
+        """
+        The locked_until to give a post scheduled on this worker, or None when
+        it is due after the lookahead window (or the scheduler isn't running)
+        and the recovery scan will pick it up instead
+        """
+        now = self._clock()
+        if not self.running or publish_at > now + self.lookahead_seconds:
+            return None
+        return max(publish_at, now) + self.lease_seconds
+
+    def add(self, scheduled_id: int, publish_at: float) -> None:
+        """
+        Put a post this worker leased on the heap; safe to call from any thread
+        """
+        with self._lock:
+            heapq.heappush(self._heap, (publish_at, scheduled_id))
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._wakeup.set)
+
+    def scan(self) -> int:
+        """
+        Lease the posts due within the lookahead window that no live lease holds
+        Returns how many were added to the heap
+        """
+        now = self._clock()
+        with self.session_factory() as db:
+            rows = ScheduledPostRepository(db).lease_due(
+                self.worker_id, now + self.lookahead_seconds, self.lease_seconds, now, self.batch_size
+            )
+        for row in rows:
+            self.add(row.id, row.publish_at)
+        metrics.increment("scheduled_posts_leased_total", len(rows))
+        metrics.set_gauge("scheduled_posts_in_heap", len(self._heap))
+        return len(rows)
+
+    def pop_due(self) -> List[Tuple[float, int]]:
+        now = self._clock()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+        return due
+
+    def publish(self, scheduled_id: int) -> Optional[int]:
+        """
+        Publish one leased post through the normal create path
+        The post leaves the schedule in the same transaction that creates it
+        Returns the new post id, or None when it was cancelled or another worker has it
+        """
+        with self.session_factory() as db:
+            scheduled = ScheduledPostRepository(db)
+            try:
+                row = scheduled.mark_published(scheduled_id, self.worker_id)
+                if row is None:
+                    db.rollback()
+                    metrics.increment("scheduled_posts_skipped_total")
+                    return None
+                with open_post_repository(db, shard_router) as repo:
+                    post_id = PostService(repo).create_post(row.owner_id, PostCreate(content=row.content)).id
+                scheduled.set_post_id(scheduled_id, post_id)
+            except Exception:
+                # The lease runs out and a recovery scan tries again
+                db.rollback()
+                logger.exception("Publishing scheduled post %s failed", scheduled_id)
+                metrics.increment("scheduled_posts_failed_total")
+                return None
+        metrics.increment("scheduled_posts_published_total")
+        return post_id
+
+    def publish_due(self) -> int:
+        due = self.pop_due()
+        for publish_at, scheduled_id in due:
+            metrics.set_gauge("scheduled_posts_publish_lag_seconds", self._clock() - publish_at)
+            self.publish(scheduled_id)
+        return len(due)
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self._loop = None
+        with self._lock:
+            self._heap.clear()
+        # Other workers take over what was on the heap at their next scan, not after the lease
+        try:
+            await asyncio.to_thread(self._release)
+        except Exception:
+            logger.exception("Releasing scheduled posts failed")
+
+    def _release(self) -> None:
+        with self.session_factory() as db:
+            ScheduledPostRepository(db).release(self.worker_id)
+
+    async def _run(self) -> None:
+        next_scan = 0.0
+        while True:
+            if self._clock() >= next_scan:
+                try:
+                    await asyncio.to_thread(self.scan)
+                except Exception:
+                    logger.exception("Scanning scheduled posts failed")
+                next_scan = self._clock() + self.scan_seconds
+            await asyncio.to_thread(self.publish_due)
+
+            # Cleared before reading the heap, so a post added meanwhile still wakes us
+            self._wakeup.clear()
+            wake_at = next_scan
+            with self._lock:
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.0, wake_at - self._clock()))
+            except asyncio.TimeoutError:
+                pass
+
+
+post_scheduler = PostScheduler(
+    SessionLocal,
+    lookahead_seconds=settings.SCHEDULED_POSTS_LOOKAHEAD_SECONDS,
+    scan_seconds=settings.SCHEDULED_POSTS_SCAN_SECONDS,
+    lease_seconds=settings.SCHEDULED_POSTS_LEASE_SECONDS,
+    batch_size=settings.SCHEDULED_POSTS_BATCH_SIZE,
+)
@@ -1,75 +1,128 @@
-from typing import List, Optional
+from typing import Collection, List, Optional
 from datetime import datetime, timedelta, timezone
-from fastapi import HTTPException, status
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+from ..core.config import get_settings
+from ..core.exceptions import raise_not_found_exception, raise_forbidden_exception
+from ..core.sharding import shard_router
+from ..jobs import enqueue, job
 from ..repositories.post_repository import PostRepository
-from ..models import Post
+from ..repositories.sharded_post_repository import open_post_repository
+from ..repositories.user_stats_repository import UserStatsRepository
+from .notification_service import queue_mentions, queue_notification
+from ..models import Post, PostRevision
 from ..schemas import PostCreate, PostUpdate
 
+settings = get_settings()
+
+EDIT_WINDOW = timedelta(minutes=10)
+
 class PostService:
     def __init__(self, repository: PostRepository):
         self.repository = repository
+        # Profile counters change in the same transaction as the write they count
+        self.stats = UserStatsRepository(repository.db)
 
     def get_post(self, post_id: int) -> Optional[Post]:
-        post = self.repository.get(post_id)
+        # Served from the post cache: callers only need the post's own columns
+        post = self.repository.get_cached(post_id)
         if not post:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Post not found"
-            )
+            raise_not_found_exception("Post not found")
         return post
 
-    def get_posts_with_counts(self, current_user_id: int, skip: int = 0, limit: int = 100) -> List[Post]:
-        return self.repository.get_posts_with_counts(current_user_id, skip, limit)
+    def get_posts(self, skip: int = 0, limit: int = 100, before: Optional[int] = None) -> List[Post]:
+        return self.repository.get_posts(skip, limit, before)
+
+    def get_posts_with_counts(
+        self, current_user_id: int, skip: int = 0, limit: int = 100, before: Optional[int] = None
+    ) -> List[Row]:
+        return self.repository.get_posts_with_counts(current_user_id, skip, limit, before)
+
+    def get_timeline(
+        self, limit: int = 20, before: Optional[int] = None, user_ids: Optional[Collection[int]] = None
+    ) -> List[dict]:
+        return self.repository.get_timeline(limit, before, user_ids)
 
     def create_post(self, user_id: int, post_create: PostCreate) -> Post:
-        return self.repository.create(
+        self.stats.increment(user_id, posts_count=1)
+        post = self.repository.create(
             content=post_create.content,
             owner_id=user_id
         )
+        # Mentions need the new post id, so they are queued once the post exists
+        if queue_mentions(self.repository.db, user_id, post.id, post.content):
+            self.repository.db.commit()
+        return post
+
+    def get_revisions(self, post_id: int, limit: int = 20, before: Optional[int] = None) -> List[PostRevision]:
+        self.get_post(post_id)
+        return self.repository.get_revisions(post_id, limit, before)
 
     def update_post(self, post_id: int, user_id: int, post_update: PostUpdate) -> Post:
+        # Ownership and the 10-minute edit window are checked by the UPDATE itself;
+        # timestamps are stored as naive UTC
+        created_after = datetime.now(timezone.utc).replace(tzinfo=None) - EDIT_WINDOW
+        post = self.repository.edit(post_id, user_id, post_update.content, created_after)
+        if post is not None:
+            return post
+
+        # Nothing matched: one read tells the caller why
         post = self.get_post(post_id)
-        
         if post.owner_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to edit this post"
-            )
-
-        # Check if the post is within the 10-minute edit window
-        post_timestamp_aware = post.timestamp.replace(tzinfo=timezone.utc)
-        time_since_creation = datetime.now(timezone.utc) - post_timestamp_aware
-        if time_since_creation > timedelta(minutes=10):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="You can only edit a post within 10 minutes of its creation"
-            )
-
-        return self.repository.update(post_id, content=post_update.content)
+            raise_forbidden_exception("Not authorized to edit this post")
+        raise_forbidden_exception("You can only edit a post within 10 minutes of its creation")
 
     def delete_post(self, post_id: int, user_id: int) -> bool:
         post = self.get_post(post_id)
         
         if post.owner_id != user_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not authorized to delete this post"
-            )
+            raise_forbidden_exception("Not authorized to delete this post")
 
-        return self.repository.delete(post_id)
+        # Staged in the delete's transaction and rolled back by the repository when the
+        # UPDATE matched nothing, e.g. because a concurrent request deleted the post first
+        self.stats.increment(post.owner_id, posts_count=-1, likes_received=-self.repository.likes_count(post_id))
+        if not self.repository.delete(post_id):
+            raise_not_found_exception("Post not found")
+        return True
 
     def like_post(self, post_id: int, user_id: int) -> bool:
         post = self.get_post(post_id)
-        return self.repository.like_post(post_id, user_id)
+        # Queued in the like's transaction: a duplicate like rolls the notification back too
+        queue_notification(self.repository.db, "like", post.owner_id, user_id, post_id)
+        self.stats.increment(post.owner_id, likes_received=1)
+        if not self.repository.like_post(post_id, user_id):
+            raise_not_found_exception("Already liked")
+        return True
 
     def unlike_post(self, post_id: int, user_id: int) -> bool:
         post = self.get_post(post_id)
-        return self.repository.unlike_post(post_id, user_id)
+        # Rolled back by the repository if there was no like to remove
+        self.stats.increment(post.owner_id, likes_received=-1)
+        if not self.repository.unlike_post(post_id, user_id):
+            raise_not_found_exception("Not liked yet")
+        return True
 
     def retweet_post(self, post_id: int, user_id: int) -> bool:
         post = self.get_post(post_id)
-        return self.repository.retweet_post(post_id, user_id)
+        queue_notification(self.repository.db, "retweet", post.owner_id, user_id, post_id)
+        if not self.repository.retweet_post(post_id, user_id):
+            raise_not_found_exception("Already retweeted")
+        return True
 
     def unretweet_post(self, post_id: int, user_id: int) -> bool:
-        post = self.get_post(post_id)
-        return self.repository.unretweet_post(post_id, user_id) 
\ No newline at end of file
+        if not self.repository.unretweet_post(post_id, user_id):
+            raise_not_found_exception("Not retweeted yet")
+        return True
+
+
+@job("purge_deleted_posts")
+def purge_deleted_posts(db: Session, payload: dict) -> None:
+    """
+    Purge soft-deleted posts in payload["post_ids"] with their likes and retweets
+    Each job removes at most one chunk and queues the rest, so a post with
+    millions of likes never holds the write lock in one long transaction
+    """
+    with open_post_repository(db, shard_router) as posts:
+        remaining = posts.purge_deleted(payload["post_ids"], payload.get("chunk_size", settings.POST_PURGE_CHUNK_SIZE))
+    if remaining:
+        enqueue(db, "purge_deleted_posts", {**payload, "post_ids": remaining})
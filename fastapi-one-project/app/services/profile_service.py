@@ -0,0 +1,123 @@
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..core.exceptions import raise_bad_request_exception, raise_conflict_exception, raise_not_found_exception
+from ..core.sharding import shard_router
+from ..jobs import enqueue, job
+from ..models import Post, User
+from ..repositories.post_repository import PostRepository
+from ..repositories.sharded_post_repository import open_post_repository
+from ..repositories.user_repository import UserRepository
+from ..repositories.user_stats_repository import STAT_COLUMNS, UserStatsRepository
+from .notification_service import queue_notification
+
+REBUILD_CHUNK_SIZE = 500
+
+
+class ProfileService:
+    def __init__(self, users: UserRepository, posts: PostRepository):
+        self.users = users
+        self.posts = posts
+        self.stats = UserStatsRepository(users.db)
+
+    def _get_user(self, username: str) -> User:
+        user = self.users.get_by_username(username)
+        if not user:
+            raise_not_found_exception("User not found")
+        return user
+
+    def get_profile(self, username: str) -> dict:
+        """
+        Takes a username
+        Reads the user and their user_stats row in one query; nothing is counted
+        Returns the profile, with zero counts for users who never had a counted write
+        """
+        row = self.stats.get_profile(username)
+        if row is None:
+            raise_not_found_exception("User not found")
+        user, stats = row
+        return {
+            "id": user.id,
+            "username": user.username,
+            "created_at": user.created_at,
+            **{column: getattr(stats, column) if stats else 0 for column in STAT_COLUMNS},
+        }
+
+    def get_user_posts(self, username: str, limit: int = 20, before: Optional[int] = None) -> List[Post]:
+        user = self._get_user(username)
+        return self.posts.get_posts(0, limit, before, owner_id=user.id)
+
+    def follow(self, follower_id: int, username: str) -> bool:
+        followee = self._get_user(username)
+        if followee.id == follower_id:
+            raise_bad_request_exception("You cannot follow yourself")
+        if not self.users.follow(follower_id, followee.id):
+            raise_conflict_exception("Already following")
+        # Counters and the notification commit with the follow
+        self.stats.increment(follower_id, following_count=1)
+        self.stats.increment(followee.id, followers_count=1)
+        queue_notification(self.users.db, "follow", followee.id, follower_id)
+        self.users.db.commit()
+        return True
+
+    def unfollow(self, follower_id: int, username: str) -> bool:
+        followee = self._get_user(username)
+        if not self.users.unfollow(follower_id, followee.id):
+            raise_not_found_exception("Not following")
+        self.stats.increment(follower_id, following_count=-1)
+        self.stats.increment(followee.id, followers_count=-1)
+        self.users.db.commit()
+        return True
+
+    def rebuild_stats(self, user_ids: List[int]) -> int:
+        """
+        Recompute the counters of the given users from posts, likes and follows
+        Overwrites whatever drifted and commits
+        Returns the number of users rebuilt
+        """
+        self._replace_stats(user_ids)
+        self.users.db.commit()
+        return len(user_ids)
+
+    def _replace_stats(self, user_ids: List[int]) -> None:
+        if not user_ids:
+            return
+        post_stats = self.posts.post_stats_by_owner(user_ids)
+        follow_counts = self.stats.follow_counts(user_ids)
+        self.stats.replace([
+            {"user_id": user_id, **post_stats[user_id], **follow_counts[user_id]}
+            for user_id in user_ids
+        ])
+
+    def rebuild_all_stats(self, chunk_size: int = REBUILD_CHUNK_SIZE) -> int:
+        """
+        Rebuild every user's counters, one committed chunk of user ids at a time
+        Returns the number of users rebuilt
+        """
+        rebuilt, after = 0, 0
+        while True:
+            user_ids = self.stats.user_ids(after, chunk_size)
+            if not user_ids:
+                return rebuilt
+            rebuilt += self.rebuild_stats(user_ids)
+            after = user_ids[-1]
+
+
+@job("rebuild_user_stats")
+def rebuild_user_stats(db: Session, payload: dict) -> None:
+    """
+    Rebuild user_stats for payload["user_ids"], or for every user when absent
+    Commits with the job. A full rebuild handles one chunk per job and queues
+    the next chunk, so no single job holds a transaction across the whole users table
+    """
+    with open_post_repository(db, shard_router) as posts:
+        service = ProfileService(UserRepository(db), posts)
+        if "user_ids" in payload:
+            service._replace_stats(payload["user_ids"])
+            return
+        chunk_size = payload.get("chunk_size", REBUILD_CHUNK_SIZE)
+        user_ids = service.stats.user_ids(payload.get("after", 0), chunk_size)
+        if user_ids:
+            service._replace_stats(user_ids)
+            enqueue(db, "rebuild_user_stats", {"after": user_ids[-1], "chunk_size": chunk_size})
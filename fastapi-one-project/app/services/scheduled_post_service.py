@@ -0,0 +1,51 @@
+import time
+from datetime import timezone
+from typing import List
+
+from ..core.config import get_settings
+from ..core.exceptions import raise_bad_request_exception, raise_not_found_exception
+from ..models import ScheduledPost
+from ..repositories.scheduled_post_repository import SCHEDULED, ScheduledPostRepository
+from ..schemas import ScheduledPostCreate
+from .post_scheduler import PostScheduler, post_scheduler
+
+settings = get_settings()
+
+class ScheduledPostService:
+    def __init__(self, repository: ScheduledPostRepository, scheduler: PostScheduler = post_scheduler):
+        self.repository = repository
+        self.scheduler = scheduler
+
+    def schedule_post(self, user_id: int, scheduled_create: ScheduledPostCreate) -> ScheduledPost:
+        publish_at = scheduled_create.publish_at
+        if publish_at.tzinfo is None:
+            publish_at = publish_at.replace(tzinfo=timezone.utc)
+        publish_at = publish_at.timestamp()
+        now = time.time()
+        if publish_at <= now:
+            raise_bad_request_exception("publish_at must be in the future")
+        if publish_at > now + settings.SCHEDULED_POSTS_MAX_DAYS * 86400:
+            raise_bad_request_exception(f"Posts can be scheduled at most {settings.SCHEDULED_POSTS_MAX_DAYS} days ahead")
+
+        # Due soon: this worker leases it as it is written and puts it on its timer heap
+        locked_until = self.scheduler.lease_for(publish_at)
+        scheduled = self.repository.create(
+            owner_id=user_id,
+            content=scheduled_create.content,
+            status=SCHEDULED,
+            publish_at=publish_at,
+            locked_by=self.scheduler.worker_id if locked_until is not None else None,
+            locked_until=locked_until,
+            created_at=now,
+        )
+        if locked_until is not None:
+            self.scheduler.add(scheduled.id, publish_at)
+        return scheduled
+
+    def get_scheduled_posts(self, user_id: int, limit: int = 100) -> List[ScheduledPost]:
+        return self.repository.get_pending(user_id, limit)
+
+    def cancel_scheduled_post(self, scheduled_id: int, user_id: int) -> bool:
+        if not self.repository.cancel(scheduled_id, user_id):
+            raise_not_found_exception("Scheduled post not found")
+        return True
@@ -0,0 +1,96 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from ..core.security import get_password_hash
+from ..repositories.user_repository import UserRepository
+
+class UserService:
+    def __init__(self, repository: UserRepository):
+        self.repository = repository
+
+    def import_users(
+        self,
+        users: Iterable[dict],
+        chunk_size: int = 500,
+        max_workers: Optional[int] = None,
+    ) -> int:
+        """
+        Bulk import users for migrations
+        Takes dicts with username, email and plain-text password
+        Hashes each chunk across a process pool while the previous chunk is inserted
+        Inserts every chunk with one executemany and commits it
+        Returns the number of users imported
+        """
+        imported = 0
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            hasher = PasswordHashPipeline(executor)
+            for chunk in _chunks(users, chunk_size):
+                imported += self._insert_chunk(hasher.submit(chunk))
+            imported += self._insert_chunk(hasher.drain())
+        return imported
+
+    def _insert_chunk(self, users: List[dict]) -> int:
+        return self.repository.insert_many(
+            {"username": user["username"], "email": user["email"], "hashed_password": user["hashed_password"]}
+            for user in users
+        )
+
+class PasswordHashPipeline:
+    """
+    Hashes chunks of users' plain-text passwords across a process pool, one chunk ahead
+    submit starts hashing a chunk and returns the chunk submitted before it, hashed,
+    so the caller inserts one chunk while the next one hashes
+    Users that already carry a hashed_password are passed through; with share_hashes
+    each distinct password is hashed once (fixture data only, as equal hashes reveal
+    equal passwords)
+    """
+
+    def __init__(self, executor: Executor, share_hashes: bool = False):
+        self.executor = executor
+        self.share_hashes = share_hashes
+        self._pending: Optional[Tuple[List[dict], Iterable[Tuple[str, str]]]] = None
+        self._hashes: Dict[str, str] = {}
+
+    def submit(self, users: List[dict]) -> List[dict]:
+        # The previous chunk's hashes must be known to skip its passwords here
+        ready = self.drain() if self.share_hashes else []
+        passwords = [user["password"] for user in users if "hashed_password" not in user]
+        if self.share_hashes:
+            passwords = sorted(set(passwords) - self._hashes.keys())
+        hashing = zip(passwords, self.executor.map(get_password_hash, passwords, chunksize=16))
+        if not self.share_hashes:
+            ready = self.drain()
+        self._pending = (users, hashing)
+        return ready
+
+    def drain(self) -> List[dict]:
+        """
+        Waits for the chunk being hashed
+        Returns its users with hashed_password in place of password
+        """
+        if self._pending is None:
+            return []
+        users, hashed = self._pending
+        self._pending = None
+        if self.share_hashes:
+            self._hashes.update(hashed)
+            hashes = iter([self._hashes[user["password"]] for user in users if "hashed_password" not in user])
+        else:
+            # One hash per user, in order, even when two users have the same password
+            hashes = (password_hash for _, password_hash in hashed)
+        return [
+            user if "hashed_password" in user else {
+                **{key: value for key, value in user.items() if key != "password"},
+                "hashed_password": next(hashes),
+            }
+            for user in users
+        ]
+
+def _chunks(items: Iterable[dict], size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -11,8 +11,41 @@ const navButtons = document.getElementById('navButtons');
 
 // State
 let token = localStorage.getItem('token');
+let refreshToken = localStorage.getItem('refreshToken');
 let currentUser = null;
 
+function storeTokens(data) {
+    token = data.access_token;
+    refreshToken = data.refresh_token;
+    localStorage.setItem('token', token);
+    localStorage.setItem('refreshToken', refreshToken);
+}
+
+function clearTokens() {
+    token = null;
+    refreshToken = null;
+    localStorage.removeItem('token');
+    localStorage.removeItem('refreshToken');
+}
+
+// Access tokens are short-lived: on a 401, swap the refresh token for a new pair and retry once
+async function authFetch(url, options = {}) {
+    const withToken = () => ({ ...options, headers: { ...options.headers, 'Authorization': `Bearer ${token}` } });
+    let response = await fetch(url, withToken());
+    if (response.status === 401 && refreshToken) {
+        const refreshed = await fetch('/api/v1/auth/refresh', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: refreshToken })
+        });
+        if (refreshed.ok) {
+            storeTokens(await refreshed.json());
+            response = await fetch(url, withToken());
+        }
+    }
+    return response;
+}
+
 // Show/Hide UI based on auth state
 function updateUI() {
     if (token) {
@@ -64,8 +97,7 @@ async function login(username, password) {
             throw new Error(data.detail || 'Login failed');
         }
 
-        token = data.access_token;
-        localStorage.setItem('token', token);
+        storeTokens(data);
         await getCurrentUser();
         if (currentUser) {
             console.log('Login successful:', currentUser);
@@ -120,7 +152,7 @@ async function register(username, email, password) {
 
 async function getCurrentUser() {
     try {
-        const response = await fetch('/api/v1/auth/me', {
+        const response = await authFetch('/api/v1/auth/me', {
             headers: {
                 'Authorization': `Bearer ${token}`
             }
@@ -135,15 +167,14 @@ async function getCurrentUser() {
         console.log('Current user:', currentUser);
     } catch (error) {
         console.error('Error getting user info:', error);
-        token = null;
-        localStorage.removeItem('token');
+        clearTokens();
         updateUI();
     }
 }
 
 async function createPost(content) {
     try {
-        const response = await fetch('/api/v1/posts/', {
+        const response = await authFetch('/api/v1/posts/', {
             method: 'POST',
             headers: {
                 'Authorization': `Bearer ${token}`,
@@ -167,7 +198,7 @@ async function createPost(content) {
 
 async function loadPosts() {
     try {
-        const response = await fetch('/api/v1/posts/with_counts/', {
+        const response = await authFetch('/api/v1/posts/with_counts/', {
             headers: {
                 'Authorization': `Bearer ${token}`
             }
@@ -225,7 +256,7 @@ async function deletePost(postId) {
             post.classList.add('loading');
         }
 
-        const response = await fetch(`/api/v1/posts/${postId}`, {
+        const response = await authFetch(`/api/v1/posts/${postId}`, {
             method: 'DELETE',
             headers: {
                 'Authorization': `Bearer ${token}`,
@@ -284,7 +315,7 @@ function showMessage(type, message) {
 
 async function toggleLike(postId) {
     try {
-        const response = await fetch(`/api/v1/posts/${postId}/like`, {
+        const response = await authFetch(`/api/v1/posts/${postId}/like`, {
             method: 'POST',
             headers: {
                 'Authorization': `Bearer ${token}`
@@ -301,7 +332,7 @@ async function toggleLike(postId) {
 
 async function toggleRetweet(postId) {
     try {
-        const response = await fetch(`/api/v1/posts/${postId}/retweet`, {
+        const response = await authFetch(`/api/v1/posts/${postId}/retweet`, {
             method: 'POST',
             headers: {
                 'Authorization': `Bearer ${token}`
@@ -317,9 +348,18 @@ async function toggleRetweet(postId) {
 }
 
 function logout() {
-    token = null;
+    if (token) {
+        fetch('/api/v1/auth/logout', {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ refresh_token: refreshToken })
+        }).catch((error) => console.error('Logout error:', error));
+    }
+    clearTokens();
     currentUser = null;
-    localStorage.removeItem('token');
     updateUI();
 }
 
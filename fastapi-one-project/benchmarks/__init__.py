@@ -0,0 +1,10 @@
+"""
+Benchmark suite for the API hot paths
+
+- datagen.py: Synthetic users, posts, follows, likes and retweets
+- micro.py: Micro-benchmarks for repository, auth and serialization paths
+- load.py: In-process ASGI load driver
+- report.py: Timing statistics and JSON result files
+
+Run with ``python -m benchmarks --help`` from the project root.
+"""
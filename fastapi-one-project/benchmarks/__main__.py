@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+
+from .bulk import run_bulk_benchmark
+from .compression import run_compression_benchmark
+from .datagen import generate_dataset
+from .environment import create_benchmark_engine, create_session_factory, use_database
+from .load import run_load
+from .micro import run_micro_benchmarks
+from .overload import run_overload_benchmark
+from .queries import run_query_counts
+from .ranking import run_ranking_benchmark
+from .report import build_report, write_report
+from .startup import run_startup_benchmark
+
+
+def _populate(args):
+    engine = create_benchmark_engine(args.database_url)
+    dataset = generate_dataset(
+        engine,
+        users=args.users,
+        posts=args.posts,
+        follows=args.follows,
+        likes=args.likes,
+        retweets=args.retweets,
+        seed=args.seed,
+    )
+    return engine, dataset
+
+
+def run_micro(args) -> dict:
+    engine, dataset = _populate(args)
+    return run_micro_benchmarks(create_session_factory(engine), dataset["usernames"][0], args.iterations)
+
+
+def run_load_suite(args) -> dict:
+    from app.core.config import get_settings
+    from app.main import app
+
+    # Keep the per-user write limits from turning the run into a 429 benchmark
+    get_settings().RATE_LIMIT_ENABLED = args.rate_limits
+    engine, dataset = _populate(args)
+    with use_database(app, create_session_factory(engine)):
+        return asyncio.run(run_load(
+            app,
+            dataset["usernames"][:args.login_users],
+            concurrency=args.concurrency,
+            total_requests=args.requests,
+        ))
+
+
+def run_bulk(args) -> dict:
+    return run_bulk_benchmark(
+        create_benchmark_engine(args.database_url),
+        users=args.users,
+        posts=args.posts,
+        follows=args.follows,
+        likes=args.likes,
+        retweets=args.retweets,
+        seed=args.seed,
+    )
+
+
+def run_queries(args) -> dict:
+    return run_query_counts(create_benchmark_engine(args.database_url), rows=args.iterations)
+
+
+def run_compression(args) -> dict:
+    engine, _ = _populate(args)
+    return run_compression_benchmark(create_session_factory(engine), args.iterations)
+
+
+def run_startup(args) -> dict:
+    return run_startup_benchmark(runs=args.runs, database_url=args.database_url)
+
+
+def run_overload(args) -> dict:
+    return run_overload_benchmark(clients=args.clients)
+
+
+def run_ranking(args) -> dict:
+    engine, dataset = _populate(args)
+    readers = list(range(1, min(args.login_users, dataset["users"]) + 1))
+    return run_ranking_benchmark(create_session_factory(engine), readers, requests=args.requests, iterations=args.iterations)
+
+
+SUITES = {
+    "micro": run_micro,
+    "load": run_load_suite,
+    "bulk": run_bulk,
+    "queries": run_queries,
+    "startup": run_startup,
+    "compression": run_compression,
+    "overload": run_overload,
+    "ranking": run_ranking,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Run the API benchmark suites")
+    parser.add_argument("suite", choices=sorted(SUITES))
+    parser.add_argument("--output", help="JSON result path (default: benchmarks/results/<suite>.json)")
+    parser.add_argument("--database-url", help="Database to populate (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--follows", type=int, default=500)
+    parser.add_argument("--likes", type=int, default=5000)
+    parser.add_argument("--retweets", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=50, help="Iterations per micro-benchmark (rows per bulk call for queries)")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh processes started by the startup suite")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent load clients")
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent clients the overload suite offers writes from")
+    parser.add_argument("--requests", type=int, default=1000, help="Total load requests (For You reads replayed by the ranking suite)")
+    parser.add_argument("--login-users", type=int, default=5, help="Distinct users the load driver logs in as (readers replayed by the ranking suite)")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep rate limiting enabled during the load run")
+    args = parser.parse_args(argv)
+
+    from app.core.config import get_settings
+
+    # The benchmark is the only process writing to its database, so it needs no worker id lease
+    settings = get_settings()
+    if settings.SNOWFLAKE_WORKER_ID is None:
+        settings.SNOWFLAKE_WORKER_ID = 0
+
+    params = {key: value for key, value in vars(args).items() if key not in ("suite", "output")}
+    report = build_report(args.suite, params, SUITES[args.suite](args))
+    path = write_report(args.output or f"benchmarks/results/{args.suite}.json", report)
+    print(f"Wrote {args.suite} results to {path}")
+
+
+if __name__ == "__main__":
+    main()
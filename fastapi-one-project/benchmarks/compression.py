@@ -0,0 +1,51 @@
+import gzip
+from typing import Dict, List
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+
+from app.core.compression import available_encodings, compress, load_brotli
+from app.models import User
+from app.repositories.post_repository import PostRepository
+from app.schemas import PostWithCounts
+from app.services.post_service import PostService
+
+from .report import time_call
+
+LEVELS = {"gzip": range(1, 10), "br": range(0, 12)}
+
+
+def feed_payload(session_factory: sessionmaker, limit: int = 100) -> bytes:
+    """
+    The body read_posts_with_counts sends for one page of the feed
+    """
+    with session_factory() as db:
+        current_user = db.get(User, 1)
+        rows = PostService(PostRepository(db)).get_posts_with_counts(current_user.id, 0, limit)
+        adapter = TypeAdapter(List[PostWithCounts])
+        return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def _decompress(data: bytes, encoding: str) -> bytes:
+    return load_brotli().decompress(data) if encoding == "br" else gzip.decompress(data)
+
+
+def run_compression_benchmark(session_factory: sessionmaker, iterations: int, limit: int = 100) -> dict:
+    """
+    CPU against bandwidth for every gzip level and brotli quality (when installed)
+    Each level reports the compressed size, the ratio, and the time to compress
+    and decompress one feed page; a cache hit pays neither, a cache miss pays
+    compression once per entry instead of once per response
+    """
+    payload = feed_payload(session_factory, limit)
+    results: Dict[str, dict] = {"payload_bytes": len(payload), "levels": {}}
+    for encoding in available_encodings():
+        for level in LEVELS[encoding]:
+            compressed = compress(payload, encoding, level)
+            results["levels"][f"{encoding}-{level}"] = {
+                "bytes": len(compressed),
+                "ratio": round(len(payload) / len(compressed), 2),
+                "compress": time_call(lambda: compress(payload, encoding, level), iterations),
+                "decompress": time_call(lambda: _decompress(compressed, encoding), iterations),
+            }
+    return results
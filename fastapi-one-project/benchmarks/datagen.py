@@ -0,0 +1,138 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.core.database import Base
+from app.core.ids import id_at
+from app.core.security import get_password_hash
+from app.models import User, UserStats, Follow, Post, Like, Retweet
+
+BENCHMARK_PASSWORD = "benchmark-password"
+CHUNK_SIZE = 1000
+
+
+def _insert_chunked(conn, table, rows: List[dict]) -> None:
+    for start in range(0, len(rows), CHUNK_SIZE):
+        conn.execute(insert(table), rows[start:start + CHUNK_SIZE])
+
+
+def _snowflake_ids(timestamps: List[datetime]) -> List[int]:
+    # Ids in the order of the (sorted) timestamps, as the live generator would have issued them
+    ids = []
+    for timestamp in timestamps:
+        snowflake_id = id_at(int(timestamp.timestamp() * 1000))
+        ids.append(max(snowflake_id, ids[-1] + 1) if ids else snowflake_id)
+    return ids
+
+
+def _unique_pairs(rng: random.Random, count: int, left: List[int], right: List[int], allow_equal: bool = True) -> List[tuple]:
+    limit = len(left) * len(right) - (0 if allow_equal else min(len(left), len(right)))
+    count = min(count, limit)
+    pairs = set()
+    while len(pairs) < count:
+        pair = (rng.choice(left), rng.choice(right))
+        if allow_equal or pair[0] != pair[1]:
+            pairs.add(pair)
+    return sorted(pairs)
+
+
+def generate_dataset(
+    engine: Engine,
+    users: int = 100,
+    posts: int = 1000,
+    follows: int = 500,
+    likes: int = 5000,
+    retweets: int = 1000,
+    seed: int = 42,
+) -> Dict[str, object]:
+    """
+    Populate a database with a reproducible synthetic social graph
+    Takes the engine and the number of rows to create per table
+    Creates the tables if needed and inserts the rows in chunked executemany batches
+    Every user shares BENCHMARK_PASSWORD, hashed once
+    Returns the row counts and the generated usernames
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    hashed_password = get_password_hash(BENCHMARK_PASSWORD)
+
+    Base.metadata.create_all(bind=engine)
+
+    user_rows = [
+        {
+            "id": user_id,
+            "username": f"user{user_id}",
+            "email": f"user{user_id}@example.com",
+            "hashed_password": hashed_password,
+            "created_at": now - timedelta(days=30),
+        }
+        for user_id in range(1, users + 1)
+    ]
+    user_ids = [row["id"] for row in user_rows]
+
+    post_times = sorted(now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600)) for _ in range(posts))
+    post_rows = [
+        {
+            "id": post_id,
+            "content": f"Benchmark post {index} " + "lorem ipsum " * rng.randint(1, 20),
+            "timestamp": timestamp,
+            "owner_id": rng.choice(user_ids),
+        }
+        for index, (post_id, timestamp) in enumerate(zip(_snowflake_ids(post_times), post_times), start=1)
+    ]
+    post_ids = [row["id"] for row in post_rows]
+
+    follow_rows = [
+        {"follower_id": follower_id, "followee_id": followee_id}
+        for follower_id, followee_id in _unique_pairs(rng, follows, user_ids, user_ids, allow_equal=False)
+    ]
+    like_rows = [
+        {"user_id": user_id, "post_id": post_id}
+        for user_id, post_id in _unique_pairs(rng, likes, user_ids, post_ids)
+    ]
+    retweet_rows = [
+        {
+            "user_id": user_id,
+            "post_id": post_id,
+            "timestamp": now - timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+        }
+        for user_id, post_id in _unique_pairs(rng, retweets, user_ids, post_ids)
+    ]
+
+    # Profile counters as the write path would have left them
+    post_owner = {row["id"]: row["owner_id"] for row in post_rows}
+    posts_count = Counter(row["owner_id"] for row in post_rows)
+    followers_count = Counter(row["followee_id"] for row in follow_rows)
+    following_count = Counter(row["follower_id"] for row in follow_rows)
+    likes_received = Counter(post_owner[row["post_id"]] for row in like_rows)
+    stats_rows = [
+        {
+            "user_id": user_id,
+            "posts_count": posts_count[user_id],
+            "followers_count": followers_count[user_id],
+            "following_count": following_count[user_id],
+            "likes_received": likes_received[user_id],
+        }
+        for user_id in user_ids
+    ]
+
+    with engine.begin() as conn:
+        _insert_chunked(conn, User.__table__, user_rows)
+        _insert_chunked(conn, Post.__table__, post_rows)
+        _insert_chunked(conn, Follow, follow_rows)
+        _insert_chunked(conn, Like.__table__, like_rows)
+        _insert_chunked(conn, Retweet.__table__, retweet_rows)
+        _insert_chunked(conn, UserStats.__table__, stats_rows)
+
+    return {
+        "users": len(user_rows),
+        "posts": len(post_rows),
+        "follows": len(follow_rows),
+        "likes": len(like_rows),
+        "retweets": len(retweet_rows),
+        "usernames": [row["username"] for row in user_rows],
+    }
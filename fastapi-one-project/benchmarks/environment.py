@@ -0,0 +1,45 @@
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.dependencies import get_db
+
+
+def create_benchmark_engine(database_url: Optional[str] = None) -> Engine:
+    """
+    Create the engine benchmarks run against
+    Defaults to a fresh SQLite file in a temporary directory so runs never touch app.db
+    """
+    if database_url is None:
+        directory = tempfile.mkdtemp(prefix="fastapi-bench-")
+        database_url = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    return create_engine(database_url, connect_args=connect_args)
+
+
+def create_session_factory(engine: Engine) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@contextmanager
+def use_database(app, session_factory: sessionmaker) -> Iterator[None]:
+    """
+    Point the app's session dependency at the benchmark database
+    """
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield
+    finally:
+        app.dependency_overrides.pop(get_db, None)
@@ -0,0 +1,94 @@
+import asyncio
+import itertools
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+
+from .datagen import BENCHMARK_PASSWORD
+from .report import summarize
+
+API_PREFIX = "/api/v1"
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    path: str
+    authenticated: bool = False
+    json: Optional[dict] = None
+
+
+DEFAULT_SCENARIOS = [
+    Scenario("read_posts", "GET", f"{API_PREFIX}/posts/?limit=20"),
+    Scenario("read_posts_with_counts", "GET", f"{API_PREFIX}/posts/with_counts/", authenticated=True),
+    Scenario("read_users_me", "GET", f"{API_PREFIX}/auth/me", authenticated=True),
+    Scenario("create_post", "POST", f"{API_PREFIX}/posts/", authenticated=True, json={"content": "load test post"}),
+]
+
+
+async def _login(client: httpx.AsyncClient, usernames: List[str]) -> List[Dict[str, str]]:
+    headers = []
+    for username in usernames:
+        response = await client.post(
+            f"{API_PREFIX}/auth/token",
+            data={"username": username, "password": BENCHMARK_PASSWORD},
+        )
+        response.raise_for_status()
+        headers.append({"Authorization": f"Bearer {response.json()['access_token']}"})
+    return headers
+
+
+async def run_load(
+    app,
+    usernames: List[str],
+    scenarios: List[Scenario] = DEFAULT_SCENARIOS,
+    concurrency: int = 10,
+    total_requests: int = 1000,
+) -> dict:
+    """
+    Drive the ASGI app in-process with concurrent clients
+    Takes the app, the users to log in as, the request mix and the load shape
+    Issues total_requests requests round-robin over the scenarios from `concurrency` workers
+    Returns overall and per-scenario throughput, latency percentiles and status codes
+    """
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        auth_headers = itertools.cycle(await _login(client, usernames))
+        schedule = iter(itertools.islice(itertools.cycle(scenarios), total_requests))
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        statuses: Dict[str, Counter] = defaultdict(Counter)
+
+        async def worker():
+            for scenario in schedule:
+                headers = next(auth_headers) if scenario.authenticated else None
+                start = time.perf_counter()
+                try:
+                    response = await client.request(scenario.method, scenario.path, json=scenario.json, headers=headers)
+                    status = str(response.status_code)
+                except httpx.HTTPError as exc:
+                    status = type(exc).__name__
+                latencies[scenario.name].append(time.perf_counter() - start)
+                statuses[scenario.name][status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [sample for samples in latencies.values() for sample in samples]
+    return {
+        "concurrency": concurrency,
+        "requests": len(all_latencies),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(all_latencies) / elapsed if elapsed else 0.0,
+        "latency": summarize(all_latencies),
+        "scenarios": {
+            name: {
+                "requests": len(samples),
+                "latency": summarize(samples),
+                "statuses": dict(statuses[name]),
+            }
+            for name, samples in latencies.items()
+        },
+    }
@@ -0,0 +1,75 @@
+import asyncio
+import json
+from typing import Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.posts import read_posts_with_counts
+from app.core.auth import get_current_user, get_token_payload
+from app.core.security import create_access_token
+from app.models import User
+from app.repositories.post_repository import PostRepository
+from app.schemas import PostWithCounts
+from app.services.post_service import PostService
+
+from .report import time_call
+
+
+def bench_get_posts_with_counts(session_factory: sessionmaker, iterations: int, limit: int = 100) -> Dict[str, float]:
+    def run():
+        with session_factory() as db:
+            PostRepository(db).get_posts_with_counts(current_user_id=1, skip=0, limit=limit)
+
+    return time_call(run, iterations)
+
+
+def bench_read_posts_with_counts(session_factory: sessionmaker, iterations: int) -> Dict[str, float]:
+    def run():
+        with session_factory() as db:
+            current_user = db.get(User, 1)
+            read_posts_with_counts(service=PostService(PostRepository(db)), current_user=current_user)
+
+    return time_call(run, iterations)
+
+
+def bench_get_current_user(session_factory: sessionmaker, username: str, iterations: int) -> Dict[str, float]:
+    token = create_access_token(data={"sub": username})
+    loop = asyncio.new_event_loop()
+
+    def run():
+        with session_factory() as db:
+            loop.run_until_complete(get_current_user(payload=get_token_payload(token=token, db=db), db=db))
+
+    try:
+        return time_call(run, iterations)
+    finally:
+        loop.close()
+
+
+def bench_serialization(session_factory: sessionmaker, iterations: int) -> Dict[str, Dict[str, float]]:
+    with session_factory() as db:
+        current_user = db.get(User, 1)
+        rows = read_posts_with_counts(service=PostService(PostRepository(db)), current_user=current_user)
+    adapter = TypeAdapter(List[PostWithCounts])
+    posts = adapter.validate_python(rows, from_attributes=True)
+
+    return {
+        "posts": len(posts),
+        "validate_rows": time_call(lambda: adapter.validate_python(rows, from_attributes=True), iterations),
+        "jsonable_encoder": time_call(lambda: json.dumps(jsonable_encoder(posts)), iterations),
+        "pydantic_dump_json": time_call(lambda: adapter.dump_json(posts), iterations),
+    }
+
+
+def run_micro_benchmarks(session_factory: sessionmaker, username: str, iterations: int) -> dict:
+    """
+    Run every micro-benchmark against an already populated database
+    """
+    return {
+        "post_repository.get_posts_with_counts": bench_get_posts_with_counts(session_factory, iterations),
+        "posts.read_posts_with_counts": bench_read_posts_with_counts(session_factory, iterations),
+        "auth.get_current_user": bench_get_current_user(session_factory, username, iterations),
+        "serialization.posts_with_counts": bench_serialization(session_factory, iterations),
+    }
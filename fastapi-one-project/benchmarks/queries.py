@@ -0,0 +1,79 @@
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.database import Base
+from app.models import User
+from app.repositories.post_repository import PostRepository
+
+
+@contextmanager
+def count_statements(engine: Engine) -> Iterator[List[str]]:
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def run_query_counts(engine: Engine, rows: int = 100) -> Dict[str, Dict[str, int]]:
+    """
+    Count the statements each BaseRepository write issues, single-row and in bulk
+    Each entry reports the statements for one call and, for bulk calls, the
+    statements the same work takes one row at a time
+    """
+    Base.metadata.create_all(bind=engine)
+    results: Dict[str, Dict[str, int]] = {}
+    with Session(engine) as db:
+        if db.get(User, 1) is None:
+            db.add(User(id=1, username="query-counts", email="query-counts@example.com", hashed_password="x"))
+            db.commit()
+        repository = PostRepository(db)
+
+        def measure(name: str, operation, per_row=None) -> None:
+            with count_statements(engine) as statements:
+                operation()
+            results[name] = {"statements": len(statements)}
+            if per_row is not None:
+                with count_statements(engine) as statements:
+                    per_row()
+                results[name]["statements_one_row_at_a_time"] = len(statements)
+
+        created = []
+        measure("create", lambda: created.append(repository.create(content="single", owner_id=1)))
+        # Reading what create returned must not reload it
+        measure("read_created", lambda: (created[0].id, created[0].content, created[0].timestamp))
+        # Later commits and rollbacks expire the instances, so work from the ids
+        post_id = created[0].id
+        measure("update", lambda: repository.update(post_id, content="edited"))
+        measure("update_missing", lambda: repository.update(-1, content="edited"))
+        measure("delete", lambda: repository.delete(post_id))
+
+        batch_ids: List[int] = []
+        measure(
+            "create_many",
+            lambda: batch_ids.extend(
+                post.id for post in repository.create_many([{"content": f"bulk {i}", "owner_id": 1} for i in range(rows)])
+            ),
+            lambda: [repository.create(content=f"loop {i}", owner_id=1) for i in range(rows)],
+        )
+        loop_ids = [post.id for post in repository.get_posts(limit=rows) if post.content.startswith("loop")]
+        measure(
+            "update_many",
+            lambda: repository.update_many([{"id": batch_id, "content": "bulk edit"} for batch_id in batch_ids]),
+            lambda: [repository.update(loop_id, content="loop edit") for loop_id in loop_ids],
+        )
+        measure(
+            "delete_many",
+            lambda: repository.delete_many(batch_ids),
+            lambda: [repository.delete(loop_id) for loop_id in loop_ids],
+        )
+    return results
@@ -0,0 +1,90 @@
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import sqlalchemy
+
+
+def percentile(sorted_samples: Sequence[float], pct: float) -> float:
+    """
+    Linear-interpolated percentile of an already sorted sequence
+    """
+    if not sorted_samples:
+        return 0.0
+    rank = (len(sorted_samples) - 1) * pct / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_samples) - 1)
+    fraction = rank - lower
+    return sorted_samples[lower] + (sorted_samples[upper] - sorted_samples[lower]) * fraction
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Summarize timing samples (in seconds) as milliseconds
+    """
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "count": count,
+        "min_ms": ordered[0] * 1000 if ordered else 0.0,
+        "mean_ms": sum(ordered) / count * 1000 if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50) * 1000,
+        "p95_ms": percentile(ordered, 95) * 1000,
+        "p99_ms": percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+def time_call(func: Callable[[], object], iterations: int, warmup: int = 3) -> Dict[str, float]:
+    """
+    Call func repeatedly and summarize the per-call wall time
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_report(suite: str, params: dict, results: dict) -> dict:
+    return {
+        "suite": suite,
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+        },
+        "params": params,
+        "results": results,
+    }
+
+
+def write_report(path: str, report: dict) -> Path:
+    """
+    Write a report as JSON so runs can be diffed between commits
+    """
+    output = Path(path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, sort_keys=True))
+    return output
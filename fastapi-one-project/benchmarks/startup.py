@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from .report import summarize
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Runs in a fresh interpreter, so nothing is imported or cached beforehand
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    ready = time.perf_counter()
+    client.get("/")
+    first_page = time.perf_counter()
+    # Unknown user: the first database query, answered with a 404
+    client.get("/api/v1/users/startup-probe")
+    first_query = time.perf_counter()
+    client.get("/api/v1/users/startup-probe")
+    second_query = time.perf_counter()
+json.dump({
+    "import": imported - started,
+    "lifespan_startup": ready - imported,
+    "first_page": first_page - ready,
+    "first_query": first_query - first_page,
+    "second_query": second_query - first_query,
+}, sys.stdout)
+"""
+
+
+def probe_startup(database_url: str) -> Dict[str, float]:
+    """
+    Import the app in a new process, start it and send its first requests
+    Returns each phase's wall time in seconds, plus the whole process
+    """
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URL": database_url, "JOBS_ENABLED": "false"}
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    timings = json.loads(completed.stdout)
+    timings["process"] = time.perf_counter() - started
+    return timings
+
+
+def run_startup_benchmark(runs: int = 10, database_url: str = None) -> Dict[str, Dict[str, float]]:
+    """
+    Cold start of a worker: import time, lifespan startup and first-request latency
+    Each run is a separate interpreter against the same database, so the
+    tables exist after the first run just as they do for a restarted worker
+    """
+    if database_url is None:
+        database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='fastapi-bench-'), 'startup.db')}"
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        for phase, seconds in probe_startup(database_url).items():
+            samples.setdefault(phase, []).append(seconds)
+    return {phase: summarize(values) for phase, values in samples.items()}
@@ -0,0 +1,47 @@
+import gzip
+import json
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.core.dependencies import get_export_service
+from app.core.sharding import ShardRouter
+from app.main import app
+from app.services.export_service import ExportService
+
+@pytest.fixture
+def admin(client, db_session, monkeypatch, login):
+    monkeypatch.setattr(get_settings(), "ADMIN_USERNAMES", ["admin"])
+    app.dependency_overrides[get_export_service] = lambda: ExportService(
+        sessionmaker(bind=db_session.get_bind()), ShardRouter(), batch_size=2, checkpoint_rows=2,
+    )
+    headers = login("admin")
+    for index in range(3):
+        client.post("/api/v1/posts/", json={"content": f"post {index}"}, headers=headers)
+    return headers
+
+def test_export_requires_an_admin(client, admin, login):
+    response = client.get("/api/v1/admin/export", headers=login("someone"))
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Admin privileges required"
+
+def test_export_streams_ndjson(client, admin):
+    response = client.get("/api/v1/admin/export?entities=posts", headers=admin)
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["content"] for record in records if record["type"] == "post"] == ["post 0", "post 1", "post 2"]
+    cursor = next(record["cursor"] for record in records if record["type"] == "checkpoint")
+
+    resumed = client.get(f"/api/v1/admin/export?entities=posts&cursor={cursor}", headers=admin)
+    assert [json.loads(line).get("content") for line in resumed.text.splitlines()][0] == "post 2"
+
+def test_export_gzip(client, admin):
+    response = client.get("/api/v1/admin/export?entities=posts&entities=follows&gzip=true", headers=admin)
+
+    assert response.headers["content-type"] == "application/gzip"
+    records = [json.loads(line) for line in gzip.decompress(response.content).splitlines()]
+    assert records[-1] == {"type": "done", "rows": 3}
+    assert client.get("/api/v1/admin/export?entities=users", headers=admin).status_code == 400
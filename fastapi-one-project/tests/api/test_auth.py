@@ -1,6 +1,9 @@
 import pytest
 from fastapi import status
 
+from app.core.security import REFRESH_TOKEN_TYPE, decode_token
+from app.models import RevokedToken
+
 def test_create_user(client, test_user):
     response = client.post("/api/v1/users/", json=test_user)
     assert response.status_code == status.HTTP_200_OK
@@ -42,4 +45,85 @@ def test_login_wrong_password(client, test_user):
         "password": "wrongpassword"
     }
     response = client.post("/api/v1/auth/token", data=login_data)
-    assert response.status_code == status.HTTP_401_UNAUTHORIZED 
\ No newline at end of file
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED 
+def test_register_user(client, test_user):
+    response = client.post("/api/v1/auth/register", json=test_user)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["username"] == test_user["username"]
+
+def test_register_duplicate_username_conflict(client, test_user):
+    client.post("/api/v1/auth/register", json=test_user)
+
+    response = client.post("/api/v1/auth/register", json={**test_user, "email": "other@example.com"})
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["detail"] == "Username already registered"
+
+def test_register_duplicate_email_conflict(client, test_user):
+    client.post("/api/v1/auth/register", json=test_user)
+
+    response = client.post("/api/v1/auth/register", json={**test_user, "username": "otheruser"})
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["detail"] == "Email already registered"
+
+    # The session is still usable after the rolled back insert
+    response = client.post("/api/v1/auth/register", json={**test_user, "username": "thirduser", "email": "third@example.com"})
+    assert response.status_code == status.HTTP_200_OK
+
+def test_refresh_issues_new_tokens(client, issue_tokens):
+    tokens = issue_tokens("alice")
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
+    refreshed = response.json()
+    me = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {refreshed['access_token']}"})
+    assert me.json()["username"] == "alice"
+
+    # Refresh tokens are single use
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_refresh_token_revoked_by_another_worker_is_refused(client, db_session, issue_tokens):
+    tokens = issue_tokens("alice")
+    # This worker syncs its revocation list now, and not again for a few seconds
+    refreshed = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+
+    # Another worker uses the new refresh token meanwhile
+    payload = decode_token(refreshed["refresh_token"], REFRESH_TOKEN_TYPE)
+    db_session.add(RevokedToken(jti=payload["jti"], expires_at=payload["exp"]))
+    db_session.commit()
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": refreshed["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json()["detail"] == "Refresh token has already been used"
+
+def test_token_types_are_not_interchangeable(client, issue_tokens):
+    tokens = issue_tokens("alice")
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["access_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_logout_revokes_tokens(client, issue_tokens):
+    tokens = issue_tokens("alice")
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = client.post("/api/v1/auth/logout", json={"refresh_token": tokens["refresh_token"]}, headers=headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+def test_rejected_logout_revokes_nothing(client, issue_tokens):
+    tokens, other = issue_tokens("alice"), issue_tokens("bob")
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    response = client.post("/api/v1/auth/logout", json={"refresh_token": "not-a-token"}, headers=headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post("/api/v1/auth/logout", json={"refresh_token": other["refresh_token"]}, headers=headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    assert client.get("/api/v1/auth/me", headers=headers).status_code == status.HTTP_200_OK
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": other["refresh_token"]})
+    assert response.status_code == status.HTTP_200_OK
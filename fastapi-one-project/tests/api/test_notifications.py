@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.jobs import run_pending
+
+@pytest.fixture
+def run_jobs(db_session):
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+    return lambda: run_pending(session_factory)
+
+def test_likes_retweets_and_mentions_reach_the_inbox(client, run_jobs, login):
+    author = login("author")
+    post_id = client.post("/api/v1/posts/", json={"content": "My post"}, headers=author).json()["id"]
+    fans = [login(f"fan{index}") for index in range(3)]
+
+    for fan in fans:
+        client.post(f"/api/v1/posts/{post_id}/like", headers=fan)
+    # Duplicate likes are rejected and queue nothing
+    client.post(f"/api/v1/posts/{post_id}/like", headers=fans[0])
+    client.post(f"/api/v1/posts/{post_id}/retweet", headers=fans[0])
+    client.post("/api/v1/posts/", json={"content": "Hello @author"}, headers=fans[1])
+    # Nothing is written on the request path
+    assert client.get("/api/v1/notifications/unread_count", headers=author).json() == {"unread": 0}
+
+    run_jobs()
+
+    inbox = client.get("/api/v1/notifications/", headers=author).json()
+    assert [item["message"] for item in inbox] == [
+        "fan1 mentioned you in a post",
+        "fan0 retweeted your post",
+        "fan2 and 2 others liked your post",
+    ]
+    assert client.get("/api/v1/notifications/unread_count", headers=author).json() == {"unread": 3}
+
+def test_inbox_pages_by_cursor_and_marks_read(client, run_jobs, login):
+    author = login("author")
+    fan = login("fan")
+    for index in range(5):
+        post_id = client.post("/api/v1/posts/", json={"content": f"post {index}"}, headers=author).json()["id"]
+        client.post(f"/api/v1/posts/{post_id}/like", headers=fan)
+    run_jobs()
+
+    first = client.get("/api/v1/notifications/?limit=2", headers=author).json()
+    rest = client.get(f"/api/v1/notifications/?before={first[-1]['sort_key']}", headers=author).json()
+    assert len(first) == 2 and len(rest) == 3
+    assert first[-1]["sort_key"] > rest[0]["sort_key"]
+
+    # Marks the older page only
+    response = client.post(f"/api/v1/notifications/read?up_to={rest[0]['sort_key']}", headers=author)
+    assert response.json() == {"unread": 2}
+    assert client.post("/api/v1/notifications/read", headers=author).json() == {"unread": 0}
+    assert all(item["read_at"] for item in client.get("/api/v1/notifications/", headers=author).json())
+
+def test_inbox_reads_are_cheap(client, run_jobs, count_queries, login):
+    author = login("author")
+    client.get("/api/v1/auth/me", headers=author)
+
+    # The user lookup is served from the user cache after the warm-up request
+    with count_queries() as statements:
+        client.get("/api/v1/notifications/unread_count", headers=author)
+    assert len(statements) == 1
+    assert not any("count(" in statement.lower() for statement in statements)
+    with count_queries() as statements:
+        client.get("/api/v1/notifications/", headers=author)
+    assert len(statements) == 1
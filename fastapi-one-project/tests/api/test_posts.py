@@ -1,4 +1,5 @@
 import pytest
+from datetime import datetime, timedelta, timezone
 from fastapi import status
 
 def get_auth_headers(client, test_user):
@@ -69,4 +70,60 @@ def test_like_post(client, test_user, test_post):
     response = client.get("/api/v1/posts/with_counts/", headers=headers)
     posts = response.json()
     post = next(p for p in posts if p["id"] == post_id)
-    assert post["likes_count"] == 1
\ No newline at end of file
+    assert post["likes_count"] == 1
+
+def test_edits_are_kept_as_revisions(client, count_queries, login):
+    alice, bob = login("alice"), login("bob")
+    post_id = client.post("/api/v1/posts/", json={"content": "draft"}, headers=alice).json()["id"]
+
+    with count_queries() as statements:
+        response = client.put(f"/api/v1/posts/{post_id}", json={"content": "edited"}, headers=alice)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["content"] == "edited"
+    assert response.json()["owner_username"] == "alice"
+    assert sum(statement.startswith("UPDATE posts") for statement in statements) == 1
+    assert not any(statement.startswith("SELECT posts") for statement in statements)
+
+    assert client.put(f"/api/v1/posts/{post_id}", json={"content": "stolen"}, headers=bob).status_code == status.HTTP_403_FORBIDDEN
+    assert client.put("/api/v1/posts/999", json={"content": "nothing"}, headers=alice).status_code == status.HTTP_404_NOT_FOUND
+    revisions = client.get(f"/api/v1/posts/{post_id}/revisions").json()
+    assert [revision["content"] for revision in revisions] == ["draft"]
+    assert client.get("/api/v1/posts/999/revisions").status_code == status.HTTP_404_NOT_FOUND
+
+def test_for_you_ranks_followed_and_popular_posts(client, login):
+    alice, bob, carol = login("alice"), login("bob"), login("carol")
+    own = client.post("/api/v1/posts/", json={"content": "mine"}, headers=alice).json()["id"]
+    followed = client.post("/api/v1/posts/", json={"content": "from bob"}, headers=bob).json()["id"]
+    popular = client.post("/api/v1/posts/", json={"content": "from carol"}, headers=carol).json()["id"]
+    client.post("/api/v1/users/bob/follow", headers=alice)
+    for headers in (alice, bob):
+        client.post(f"/api/v1/posts/{popular}/like", headers=headers)
+
+    response = client.get("/api/v1/posts/for_you/", headers=alice)
+
+    assert response.status_code == status.HTTP_200_OK
+    ids = [post["id"] for post in response.json()]
+    assert set(ids) == {followed, popular} and own not in ids
+    assert response.json()[ids.index(popular)]["likes_count"] == 2
+    assert client.get("/api/v1/posts/for_you/").status_code == status.HTTP_401_UNAUTHORIZED
+    assert client.get("/api/v1/posts/for_you/?limit=0", headers=alice).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+def test_schedule_list_and_cancel_posts(client, login):
+    alice, bob = login("alice"), login("bob")
+    soon = (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
+
+    response = client.post("/api/v1/posts/scheduled/", json={"content": "later", "publish_at": soon}, headers=alice)
+    assert response.status_code == status.HTTP_201_CREATED
+    scheduled = response.json()
+    assert (scheduled["status"], scheduled["post_id"]) == ("scheduled", None)
+    past = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    assert client.post("/api/v1/posts/scheduled/", json={"content": "x", "publish_at": past}, headers=alice).status_code == 400
+
+    assert [post["id"] for post in client.get("/api/v1/posts/scheduled/", headers=alice).json()] == [scheduled["id"]]
+    assert client.get("/api/v1/posts/scheduled/", headers=bob).json() == []
+    # Nothing is published until publish_at
+    assert client.get("/api/v1/posts/").json() == []
+
+    assert client.delete(f"/api/v1/posts/scheduled/{scheduled['id']}", headers=bob).status_code == status.HTTP_404_NOT_FOUND
+    assert client.delete(f"/api/v1/posts/scheduled/{scheduled['id']}", headers=alice).status_code == status.HTTP_204_NO_CONTENT
+    assert client.get("/api/v1/posts/scheduled/", headers=alice).json() == []
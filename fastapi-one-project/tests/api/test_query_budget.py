@@ -0,0 +1,92 @@
+import pytest
+from fastapi import status
+
+# Statements each route may issue, including the user lookup of get_current_user
+# Writes that change a counter also pay for one user_stats upsert per affected user
+QUERY_BUDGETS = {
+    "read_posts": 1,
+    "read_posts_with_counts": 2,
+    "create_post": 4,
+    "update_post": 4,
+    "delete_post": 7,
+    "like_post": 4,
+    "unlike_post": 4,
+    "retweet_post": 3,
+    "unretweet_post": 2,
+    "read_profile": 1,
+    "read_user_posts": 2,
+    "follow_user": 6,
+    "unfollow_user": 5,
+}
+
+@pytest.fixture
+def auth_headers(client, test_user):
+    client.post("/api/v1/auth/register", json=test_user)
+    response = client.post(
+        "/api/v1/auth/token",
+        data={"username": test_user["username"], "password": test_user["password"]},
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    # Warm up: the first authenticated request also syncs the revocation list
+    client.get("/api/v1/auth/me", headers=headers)
+    return headers
+
+@pytest.fixture
+def post_id(client, auth_headers, test_post):
+    return client.post("/api/v1/posts/", json=test_post, headers=auth_headers).json()["id"]
+
+def assert_budget(count_queries, name, request):
+    with count_queries() as statements:
+        response = request()
+    assert response.status_code < 400, response.text
+    assert len(statements) <= QUERY_BUDGETS[name], statements
+    return response
+
+def test_read_routes_budget(client, auth_headers, post_id, count_queries):
+    assert_budget(count_queries, "read_posts", lambda: client.get("/api/v1/posts/"))
+    response = assert_budget(
+        count_queries, "read_posts_with_counts",
+        lambda: client.get("/api/v1/posts/with_counts/", headers=auth_headers),
+    )
+    assert response.json()[0]["owner_username"] == "testuser"
+
+def test_write_routes_budget(client, auth_headers, test_post, count_queries):
+    response = assert_budget(
+        count_queries, "create_post",
+        lambda: client.post("/api/v1/posts/", json=test_post, headers=auth_headers),
+    )
+    post_id = response.json()["id"]
+    assert_budget(
+        count_queries, "update_post",
+        lambda: client.put(f"/api/v1/posts/{post_id}", json={"content": "edited"}, headers=auth_headers),
+    )
+    for action in ("like", "unlike", "retweet", "unretweet"):
+        assert_budget(
+            count_queries, f"{action}_post",
+            lambda: client.post(f"/api/v1/posts/{post_id}/{action}", headers=auth_headers),
+        )
+    assert_budget(
+        count_queries, "delete_post",
+        lambda: client.delete(f"/api/v1/posts/{post_id}", headers=auth_headers),
+    )
+
+def test_user_routes_budget(client, auth_headers, post_id, count_queries):
+    client.post("/api/v1/auth/register", json={
+        "username": "followed", "email": "followed@example.com", "password": "password123",
+    })
+    assert_budget(count_queries, "read_profile", lambda: client.get("/api/v1/users/testuser"))
+    assert_budget(count_queries, "read_user_posts", lambda: client.get("/api/v1/users/testuser/posts"))
+    for action in ("follow", "unfollow"):
+        assert_budget(
+            count_queries, f"{action}_user",
+            lambda: client.post(f"/api/v1/users/followed/{action}", headers=auth_headers),
+        )
+
+def test_interaction_errors_are_preserved(client, auth_headers, post_id):
+    client.post(f"/api/v1/posts/{post_id}/like", headers=auth_headers)
+
+    response = client.post(f"/api/v1/posts/{post_id}/like", headers=auth_headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()["detail"] == "Already liked"
+    response = client.post("/api/v1/posts/999/retweet", headers=auth_headers)
+    assert response.json()["detail"] == "Post not found"
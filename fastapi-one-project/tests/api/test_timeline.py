@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.jobs import run_pending
+from app.models import Post, Retweet
+
+@pytest.fixture
+def timeline(client, login):
+    """
+    alice posts a, b, c; bob retweets a; carol retweets a, then b
+    """
+    alice, bob, carol = login("alice"), login("bob"), login("carol")
+    posts = {
+        name: client.post("/api/v1/posts/", json={"content": name}, headers=alice).json()["id"]
+        for name in ("a", "b", "c")
+    }
+    client.post(f"/api/v1/posts/{posts['a']}/retweet", headers=bob)
+    client.post(f"/api/v1/posts/{posts['a']}/retweet", headers=carol)
+    client.post(f"/api/v1/posts/{posts['b']}/retweet", headers=carol)
+    return posts
+
+def entries(response):
+    return [(entry["post"]["content"], entry["retweeted_by"]) for entry in response.json()]
+
+def test_timeline_interleaves_retweets_and_shows_each_post_once(client, timeline):
+    response = client.get("/api/v1/posts/timeline/")
+
+    assert entries(response) == [("b", "carol"), ("a", "carol"), ("c", None)]
+    assert response.json()[0]["post"]["owner_username"] == "alice"
+    assert response.json()[0]["retweeted_at"] is not None
+
+def test_timeline_pages_by_event_cursor(client, timeline):
+    first = client.get("/api/v1/posts/timeline/?limit=1")
+    second = client.get(f"/api/v1/posts/timeline/?limit=1&before={first.json()[-1]['event_id']}")
+    third = client.get(f"/api/v1/posts/timeline/?limit=5&before={second.json()[-1]['event_id']}")
+
+    # The older retweet of a and the originals of a and b never reappear
+    assert entries(first) + entries(second) + entries(third) == [("b", "carol"), ("a", "carol"), ("c", None)]
+
+def test_timeline_page_is_one_query(client, timeline, count_queries):
+    with count_queries() as statements:
+        client.get("/api/v1/posts/timeline/?limit=2")
+    assert len(statements) == 1
+
+def test_timeline_refills_when_retweets_of_one_post_crowd_the_window(client, monkeypatch, login):
+    # More sign-ups than the per-IP registration limit allows
+    monkeypatch.setattr(get_settings(), "RATE_LIMIT_ENABLED", False)
+    author = login("author")
+    post_id = client.post("/api/v1/posts/", json={"content": "popular"}, headers=author).json()["id"]
+    client.post("/api/v1/posts/", json={"content": "older"}, headers=author)
+    for index in range(6):
+        client.post(f"/api/v1/posts/{post_id}/retweet", headers=login(f"fan{index}"))
+
+    assert entries(client.get("/api/v1/posts/timeline/?limit=2")) == [("popular", "fan5"), ("older", None)]
+
+def test_deleted_posts_leave_every_feed_and_are_purged(client, timeline, db_session, login):
+    alice = login("alice")
+
+    assert client.delete(f"/api/v1/posts/{timeline['a']}", headers=alice).status_code == 200
+
+    # Its retweets are still stored, but neither they nor the post are read any more
+    assert entries(client.get("/api/v1/posts/timeline/")) == [("b", "carol"), ("c", None)]
+    assert [post["content"] for post in client.get("/api/v1/posts/").json()] == ["c", "b"]
+    assert client.post(f"/api/v1/posts/{timeline['a']}/like", headers=alice).status_code == 404
+    assert db_session.scalar(select(func.count()).select_from(Retweet)) == 3
+
+    run_pending(sessionmaker(bind=db_session.get_bind()))
+
+    assert db_session.scalar(select(func.count()).select_from(Retweet)) == 1
+    assert db_session.scalar(select(func.count()).select_from(Post)) == 2
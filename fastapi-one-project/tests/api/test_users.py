@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from app.jobs import enqueue, run_pending
+from app.models import UserStats
+
+def profile(client, username):
+    return client.get(f"/api/v1/users/{username}").json()
+
+def counts(body):
+    return {key: body[key] for key in ("posts_count", "followers_count", "following_count", "likes_received")}
+
+@pytest.fixture
+def users(client, login):
+    return {name: login(name) for name in ("alice", "bob", "carol")}
+
+def test_profile_counts_follow_every_write(client, users):
+    alice, bob, carol = users["alice"], users["bob"], users["carol"]
+    first = client.post("/api/v1/posts/", json={"content": "first"}, headers=alice).json()["id"]
+    second = client.post("/api/v1/posts/", json={"content": "second"}, headers=alice).json()["id"]
+    client.post(f"/api/v1/posts/{first}/like", headers=bob)
+    client.post(f"/api/v1/posts/{first}/like", headers=carol)
+    client.post(f"/api/v1/posts/{second}/like", headers=bob)
+    client.post("/api/v1/users/alice/follow", headers=bob)
+    client.post("/api/v1/users/alice/follow", headers=carol)
+
+    body = profile(client, "alice")
+    assert counts(body) == {"posts_count": 2, "followers_count": 2, "following_count": 0, "likes_received": 3}
+    assert "email" not in body
+    assert counts(profile(client, "bob"))["following_count"] == 1
+
+    client.post(f"/api/v1/posts/{second}/unlike", headers=bob)
+    client.post("/api/v1/users/alice/unfollow", headers=carol)
+    client.delete(f"/api/v1/posts/{first}", headers=alice)
+
+    assert counts(profile(client, "alice")) == {
+        "posts_count": 1, "followers_count": 1, "following_count": 0, "likes_received": 0,
+    }
+    assert counts(profile(client, "carol"))["following_count"] == 0
+
+def test_rejected_writes_leave_counts_alone(client, users):
+    alice, bob = users["alice"], users["bob"]
+    post_id = client.post("/api/v1/posts/", json={"content": "hello"}, headers=alice).json()["id"]
+    client.post(f"/api/v1/posts/{post_id}/like", headers=bob)
+    client.post("/api/v1/users/alice/follow", headers=bob)
+
+    assert client.post(f"/api/v1/posts/{post_id}/like", headers=bob).status_code == 404
+    assert client.post(f"/api/v1/posts/{post_id}/unlike", headers=alice).status_code == 404
+    response = client.post("/api/v1/users/alice/follow", headers=bob)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Already following"
+    assert client.post("/api/v1/users/bob/unfollow", headers=alice).json()["detail"] == "Not following"
+    assert client.post("/api/v1/users/alice/follow", headers=alice).json()["detail"] == "You cannot follow yourself"
+
+    assert counts(profile(client, "alice")) == {
+        "posts_count": 1, "followers_count": 1, "following_count": 0, "likes_received": 1,
+    }
+    assert counts(profile(client, "bob"))["following_count"] == 1
+
+def test_profile_read_is_one_query_however_big_the_account(client, users, count_queries):
+    alice, bob = users["alice"], users["bob"]
+    with count_queries() as statements:
+        profile(client, "alice")
+    assert len(statements) == 1
+
+    for index in range(5):
+        post_id = client.post("/api/v1/posts/", json={"content": f"post {index}"}, headers=alice).json()["id"]
+        client.post(f"/api/v1/posts/{post_id}/like", headers=bob)
+    with count_queries() as statements:
+        assert profile(client, "alice")["likes_received"] == 5
+    assert len(statements) == 1
+
+def test_user_posts_page_by_id(client, users):
+    alice, bob = users["alice"], users["bob"]
+    for index in range(3):
+        client.post("/api/v1/posts/", json={"content": f"alice {index}"}, headers=alice)
+    client.post("/api/v1/posts/", json={"content": "bob"}, headers=bob)
+
+    first = client.get("/api/v1/users/alice/posts?limit=2").json()
+    second = client.get(f"/api/v1/users/alice/posts?limit=2&before={first[-1]['id']}").json()
+
+    assert [post["content"] for post in first + second] == ["alice 2", "alice 1", "alice 0"]
+    assert client.get("/api/v1/users/nobody/posts").status_code == 404
+    assert client.get("/api/v1/users/nobody").json()["detail"] == "User not found"
+
+def test_rebuild_job_repairs_drifted_counts(client, db_session, users):
+    alice, bob = users["alice"], users["bob"]
+    session_factory = sessionmaker(bind=db_session.get_bind())
+    post_id = client.post("/api/v1/posts/", json={"content": "hello"}, headers=alice).json()["id"]
+    client.post(f"/api/v1/posts/{post_id}/like", headers=bob)
+    client.post("/api/v1/users/alice/follow", headers=bob)
+    run_pending(session_factory)
+    db_session.execute(update(UserStats).values(posts_count=40, followers_count=0, likes_received=7))
+    db_session.commit()
+
+    enqueue(db_session, "rebuild_user_stats", {"chunk_size": 2})
+    db_session.commit()
+    # Three users in chunks of two: two chunks, then one job that finds nothing left
+    assert run_pending(session_factory) == 3
+
+    db_session.expire_all()
+    assert counts(profile(client, "alice")) == {
+        "posts_count": 1, "followers_count": 1, "following_count": 0, "likes_received": 1,
+    }
+    assert counts(profile(client, "bob"))["following_count"] == 1
+    assert set(counts(profile(client, "carol")).values()) == {0}
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+from sqlalchemy import func, select
+
+from app.main import app
+from app.models import Post, Like
+from benchmarks.bulk import run_bulk_benchmark
+from benchmarks.compression import run_compression_benchmark
+from benchmarks.datagen import generate_dataset
+from benchmarks.environment import create_benchmark_engine, create_session_factory, use_database
+from benchmarks.load import Scenario, run_load
+from benchmarks.overload import run_overload_benchmark
+from benchmarks.queries import run_query_counts
+from benchmarks.ranking import run_ranking_benchmark
+from benchmarks.report import percentile, summarize
+from benchmarks.startup import run_startup_benchmark
+
+@pytest.fixture
+def bench_engine(tmp_path):
+    engine = create_benchmark_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    yield engine
+    engine.dispose()
+
+def test_percentile_interpolates():
+    samples = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(samples, 0) == 1.0
+    assert percentile(samples, 50) == 2.5
+    assert percentile(samples, 100) == 4.0
+    assert summarize([0.001, 0.002])["p50_ms"] == pytest.approx(1.5)
+
+def test_generate_dataset_is_reproducible(bench_engine):
+    dataset = generate_dataset(bench_engine, users=10, posts=50, follows=20, likes=100, retweets=30)
+
+    assert dataset["users"] == 10
+    assert dataset["likes"] == 100
+    with bench_engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Post)) == 50
+        assert conn.scalar(select(func.count()).select_from(Like)) == 100
+
+def test_run_load_reports_percentiles(bench_engine):
+    dataset = generate_dataset(bench_engine, users=3, posts=10, follows=2, likes=5, retweets=2)
+    scenarios = [Scenario("read_users_me", "GET", "/api/v1/auth/me", authenticated=True)]
+
+    with use_database(app, create_session_factory(bench_engine)):
+        result = asyncio.run(run_load(app, dataset["usernames"][:1], scenarios, concurrency=2, total_requests=6))
+
+    assert result["requests"] == 6
+    assert result["scenarios"]["read_users_me"]["statuses"] == {"200": 6}
+    assert result["latency"]["p99_ms"] >= result["latency"]["p50_ms"]
+
+def test_bulk_benchmark_reports_rows_per_minute(bench_engine):
+    result = run_bulk_benchmark(bench_engine, users=5, posts=40, follows=10, likes=30, retweets=5, chunk_size=16, baseline_rows=5)
+
+    assert result["rows"] == {"users": 5, "posts": 40, "follows": 10, "likes": 30, "retweets": 5}
+    assert result["rows_per_minute"] > 0
+    with bench_engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(Post)) == 45
+
+def test_query_counts_compare_bulk_with_per_row(bench_engine):
+    result = run_query_counts(bench_engine, rows=10)
+
+    assert result["create"]["statements"] == 1
+    assert result["read_created"]["statements"] == 0
+    assert result["update"]["statements"] == 1
+    assert result["create_many"] == {"statements": 1, "statements_one_row_at_a_time": 10}
+    assert result["update_many"] == {"statements": 1, "statements_one_row_at_a_time": 10}
+    assert result["delete_many"]["statements"] < result["delete_many"]["statements_one_row_at_a_time"]
+
+def test_startup_benchmark_times_each_phase(tmp_path):
+    result = run_startup_benchmark(runs=1, database_url=f"sqlite:///{tmp_path / 'startup.db'}")
+
+    assert set(result) == {"import", "lifespan_startup", "first_page", "first_query", "second_query", "process"}
+    assert result["import"]["count"] == 1
+
+def test_compression_benchmark_covers_each_gzip_level(bench_engine):
+    generate_dataset(bench_engine, users=3, posts=30, follows=2, likes=10, retweets=2)
+
+    result = run_compression_benchmark(create_session_factory(bench_engine), iterations=2)
+
+    assert {f"gzip-{level}" for level in range(1, 10)} <= set(result["levels"])
+    assert result["levels"]["gzip-9"]["bytes"] < result["payload_bytes"]
+    assert result["levels"]["gzip-1"]["compress"]["count"] == 2
+
+def test_overload_benchmark_compares_shedding_with_queueing():
+    result = run_overload_benchmark(clients=20, duration=0.3, service_seconds=0.002, timeout=0.2)
+
+    assert set(result) == {"unlimited", "admission_control"}
+    assert result["unlimited"]["shed"] == 0
+    assert result["admission_control"]["timed_out"] == 0
+
+def test_ranking_benchmark_replays_each_path(bench_engine):
+    generate_dataset(bench_engine, users=5, posts=60, follows=10, likes=40, retweets=10)
+
+    result = run_ranking_benchmark(
+        create_session_factory(bench_engine), readers=[1, 2], requests=40, step_seconds=10, candidates=50, iterations=2
+    )
+
+    assert {"hit", "refresh", "rebuild"} <= set(result["replay"])
+    assert sum(summary["count"] for summary in result["replay"].values()) == 40
+    assert set(result["scoring"]) == {"numpy", "python"}
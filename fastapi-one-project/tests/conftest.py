@@ -1,15 +1,32 @@
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
+from app.core.cache import post_cache, user_cache
 from app.core.config import get_settings
 from app.core.database import Base
 from app.main import app
 from app.core.dependencies import get_db
+from app.core.idempotency import get_idempotency_store
+from app.core.rate_limit import get_rate_limit_backend
+from app.core.response_cache import response_cache
+from app.core.revocation import revocation_list
+from app.services.feed_service import ranked_feed_cache
 
 settings = get_settings()
+# Jobs queued in tests are run explicitly with run_pending against the test session
+settings.JOBS_ENABLED = False
+# Tests create their tables on the in-memory engine; startup must not touch app.db
+settings.DB_CREATE_TABLES = False
+# Reads in tests must see every write; the microcache is enabled by its own tests
+response_cache.ttl_seconds = 0
+# Idempotency keys are kept in memory; the table-backed store has its own tests
+settings.IDEMPOTENCY_STORE = "memory"
+# Tests run in one process; the worker id lease has its own tests
+settings.SNOWFLAKE_WORKER_ID = 0
 
 # Create test database
 SQLALCHEMY_DATABASE_URL = "sqlite://"  # In-memory SQLite database
@@ -24,6 +41,9 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 @pytest.fixture(scope="function")
 def db_session():
     Base.metadata.create_all(bind=engine)
+    # Ids restart with every test database, so nothing cached may carry over
+    post_cache.clear()
+    user_cache.clear()
     session = TestingSessionLocal()
     try:
         yield session
@@ -40,10 +60,59 @@ def client(db_session):
             db_session.close()
     
     app.dependency_overrides[get_db] = override_get_db
+    get_rate_limit_backend().clear()
+    revocation_list.clear()
+    response_cache.clear()
+    get_idempotency_store().clear()
+    ranked_feed_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
 
+@pytest.fixture
+def issue_tokens(client):
+    """
+    Registers a user with the password "password123" and logs them in
+    Returns a function taking the username and returning the access and refresh tokens
+    """
+    def issue_tokens(username):
+        client.post("/api/v1/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": "password123",
+        })
+        return client.post("/api/v1/auth/token", data={"username": username, "password": "password123"}).json()
+
+    return issue_tokens
+
+@pytest.fixture
+def login(issue_tokens):
+    """
+    Returns a function taking a username and returning Authorization headers for a new user of that name
+    """
+    def login(username):
+        return {"Authorization": f"Bearer {issue_tokens(username)['access_token']}"}
+
+    return login
+
+@pytest.fixture
+def count_queries():
+    """
+    Context manager collecting every SQL statement run against the test engine
+    """
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
+
 @pytest.fixture
 def test_user():
     return {
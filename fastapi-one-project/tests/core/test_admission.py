@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.admission import AdmissionControlMiddleware, ConcurrencyLimiter, Overloaded
+from app.core.metrics import metrics
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_waiters_are_admitted_in_order_as_slots_free():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=2, max_wait_seconds=1)
+        started = await limiter.acquire()
+        order = []
+
+        async def wait(name):
+            await limiter.acquire()
+            order.append(name)
+
+        tasks = [asyncio.create_task(wait("first")), asyncio.create_task(wait("second"))]
+        await asyncio.sleep(0)
+        assert (limiter.in_flight, limiter.queue_depth) == (1, 2)
+        with pytest.raises(Overloaded) as shed:
+            await limiter.acquire()
+        assert shed.value.reason == "queue_full"
+
+        limiter.release(started)
+        await asyncio.sleep(0)
+        limiter.release(started)
+        await asyncio.gather(*tasks)
+        return order, limiter
+
+    order, limiter = asyncio.run(scenario())
+
+    assert order == ["first", "second"]
+    assert (limiter.in_flight, limiter.queue_depth) == (1, 0)
+
+def test_queued_requests_time_out():
+    async def scenario():
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=5, max_wait_seconds=0.01)
+        await limiter.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await limiter.acquire()
+        return shed.value, limiter
+
+    shed, limiter = asyncio.run(scenario())
+
+    assert shed.reason == "timeout"
+    assert limiter.queue_depth == 0
+
+def test_requests_expected_to_miss_the_deadline_are_shed_at_once():
+    async def scenario():
+        clock = FakeClock()
+        limiter = ConcurrencyLimiter("test", limit=1, max_queue=5, max_wait_seconds=1, clock=clock)
+        started = await limiter.acquire()
+        clock.now = 3.0
+        limiter.release(started)
+        await limiter.acquire()
+        with pytest.raises(Overloaded) as shed:
+            await limiter.acquire()
+        return shed.value
+
+    shed = asyncio.run(scenario())
+
+    assert shed.reason == "deadline"
+    assert shed.retry_after == 3.0
+
+def test_full_pools_answer_503_and_leave_other_routes_alone():
+    read = ConcurrencyLimiter("read", limit=4, max_queue=0, max_wait_seconds=1)
+    write = ConcurrencyLimiter("write", limit=0, max_queue=0, max_wait_seconds=1)
+    app = Starlette(routes=[
+        Route("/api/items", lambda request: PlainTextResponse("ok"), methods=["GET", "POST"]),
+        Route("/api/metrics", lambda request: PlainTextResponse("ok"), methods=["POST"]),
+    ])
+    app.add_middleware(AdmissionControlMiddleware, read=read, write=write, paths=["/api/"], exclude_paths=["/api/metrics"])
+    client = TestClient(app)
+    shed_before = metrics.counter("admission_shed_total", pool="write", reason="queue_full")
+
+    assert client.get("/api/items").status_code == 200
+    response = client.post("/api/items")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.post("/api/metrics").status_code == 200
+    assert metrics.counter("admission_shed_total", pool="write", reason="queue_full") == shed_before + 1
+    assert read.in_flight == 0
+
+def test_auth_routes_have_their_own_pool():
+    read = ConcurrencyLimiter("read", limit=4, max_queue=0, max_wait_seconds=1)
+    write = ConcurrencyLimiter("write", limit=0, max_queue=0, max_wait_seconds=1)
+    auth = ConcurrencyLimiter("auth", limit=4, max_queue=0, max_wait_seconds=1)
+    app = Starlette(routes=[
+        Route("/api/items", lambda request: PlainTextResponse("ok"), methods=["POST"]),
+        Route("/api/auth/token", lambda request: PlainTextResponse("ok"), methods=["POST"]),
+    ])
+    app.add_middleware(
+        AdmissionControlMiddleware, read=read, write=write, paths=["/api/"], auth=auth, auth_paths=["/api/auth/token"]
+    )
+    client = TestClient(app)
+    admitted_before = metrics.counter("admission_requests_total", pool="auth", result="admitted")
+
+    # The write pool is full, and logins still get through
+    assert client.post("/api/items").status_code == 503
+    assert client.post("/api/auth/token").status_code == 200
+    assert metrics.counter("admission_requests_total", pool="auth", result="admitted") == admitted_before + 1
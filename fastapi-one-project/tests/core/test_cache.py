@@ -0,0 +1,129 @@
+import threading
+import time
+import pytest
+
+from app.core.cache import LRUCache, MemorySharedCache, TieredCache
+from app.core.metrics import metrics
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_evicts_least_recently_used_and_expires_entries():
+    clock = FakeClock()
+    lru = LRUCache(max_entries=2, clock=clock)
+    lru.set("a", {"v": 1}, ttl_seconds=10)
+    lru.set("b", {"v": 2}, ttl_seconds=1)
+    lru.get("a")
+    lru.set("c", {"v": 3}, ttl_seconds=10)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == {"v": 1}
+    clock.now = 10
+    assert lru.get("a") is None
+    assert lru.get("c") is None
+
+def test_shared_tier_fills_the_local_tier():
+    shared = MemorySharedCache()
+    loads = []
+    first = TieredCache("things", LRUCache(10), shared)
+    second = TieredCache("things", LRUCache(10), shared)
+
+    assert first.get_or_load(1, lambda: loads.append(1) or {"id": 1}) == {"id": 1}
+    # Another worker: its local tier is empty, the shared tier answers
+    assert second.get_or_load(1, lambda: loads.append(2) or {"id": 1}) == {"id": 1}
+    assert second.get_or_load(1, lambda: loads.append(3) or {"id": 1}) == {"id": 1}
+    assert loads == [1]
+
+def test_invalidate_clears_local_and_shared_tiers():
+    shared = MemorySharedCache()
+    cache = TieredCache("things", LRUCache(10), shared)
+    cache.get_or_load(1, lambda: {"id": 1, "v": "old"})
+
+    cache.invalidate(1)
+
+    assert shared.get("things:1") is None
+    assert cache.get_or_load(1, lambda: {"id": 1, "v": "new"})["v"] == "new"
+
+def test_missing_values_are_not_cached():
+    cache = TieredCache("things", LRUCache(10))
+    loads = []
+
+    assert cache.get_or_load(1, lambda: loads.append(1)) is None
+    assert cache.get_or_load(1, lambda: loads.append(2)) is None
+    assert loads == [1, 2]
+
+def test_concurrent_misses_load_once():
+    cache = TieredCache("flights", LRUCache(10))
+    loads = []
+    started = threading.Event()
+
+    def slow_loader():
+        loads.append(1)
+        started.set()
+        time.sleep(0.1)
+        return {"id": 1}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_load(1, slow_loader)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_load(1, slow_loader))) for _ in range(8)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert loads == [1]
+    assert results == [{"id": 1}] * 9
+    assert metrics.counter("cache_coalesced_total", cache="flights") >= 8
+
+def test_followers_see_the_leaders_error():
+    cache = TieredCache("failing", LRUCache(10))
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing_loader():
+        started.set()
+        release.wait()
+        raise RuntimeError("database down")
+
+    def call():
+        try:
+            cache.get_or_load(1, failing_loader)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait()
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["database down"] * 2
+
+def test_hits_and_misses_are_counted():
+    cache = TieredCache("counted", LRUCache(10))
+    cache.get_or_load(1, lambda: {"id": 1})
+    cache.get_or_load(1, lambda: {"id": 1})
+
+    assert metrics.counter("cache_requests_total", cache="counted", tier="local", result="miss") == 1
+    assert metrics.counter("cache_requests_total", cache="counted", tier="local", result="hit") == 1
+    assert metrics.counter("cache_loads_total", cache="counted") == 1
+
+def test_disabled_cache_always_loads():
+    cache = TieredCache("disabled", LRUCache(10))
+    cache.enabled = False
+    loads = []
+
+    cache.get_or_load(1, lambda: loads.append(1) or {"id": 1})
+    cache.get_or_load(1, lambda: loads.append(2) or {"id": 1})
+
+    assert loads == [1, 2]
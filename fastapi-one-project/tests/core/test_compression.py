@@ -0,0 +1,82 @@
+import gzip
+import zlib
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.compression import CompressionMiddleware, StreamCompressor, choose_encoding
+
+BODY = "post content, ".join(str(i) for i in range(400))
+
+def stream_lines(request):
+    async def lines():
+        for i in range(50):
+            yield f'{{"id": {i}, "content": "streamed line"}}\n'.encode()
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@pytest.fixture
+def compressing_client():
+    app = Starlette(routes=[
+        Route("/large", lambda request: PlainTextResponse(BODY, headers={"ETag": '"v1"'})),
+        Route("/varied", lambda request: PlainTextResponse(BODY, headers={"Vary": "Accept-Encoding"})),
+        Route("/small", lambda request: PlainTextResponse("tiny")),
+        Route("/encoded", lambda request: Response(gzip.compress(BODY.encode()), headers={"Content-Encoding": "gzip"}, media_type="text/plain")),
+        Route("/binary", lambda request: Response(BODY.encode(), media_type="image/png")),
+        Route("/stream", stream_lines),
+    ])
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+    return TestClient(app)
+
+def test_choose_encoding_honours_quality():
+    available = ("br", "gzip")
+
+    assert choose_encoding(available, "gzip, br") == "br"
+    assert choose_encoding(available, "gzip;q=1.0, br;q=0.5") == "gzip"
+    assert choose_encoding(available, "br;q=0, gzip;q=0") is None
+    assert choose_encoding(available, "*") == "br"
+    assert choose_encoding(("gzip",), "br") is None
+    assert choose_encoding(available, "") is None
+
+def test_large_bodies_are_compressed(compressing_client):
+    response = compressing_client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"v1"'
+    assert int(response.headers["content-length"]) < len(BODY)
+    assert response.text == BODY
+
+def test_vary_lists_accept_encoding_once(compressing_client):
+    response = compressing_client.get("/varied", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+
+def test_small_and_unaccepted_bodies_pass_through(compressing_client):
+    assert "content-encoding" not in compressing_client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in compressing_client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in compressing_client.get("/binary", headers={"Accept-Encoding": "gzip"}).headers
+
+def test_encoded_responses_are_not_recompressed(compressing_client):
+    response = compressing_client.get("/encoded", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == BODY
+
+def test_streamed_bodies_are_compressed_incrementally(compressing_client):
+    response = compressing_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.count("streamed line") == 50
+
+def test_stream_compressor_flushes_each_chunk():
+    compressor = StreamCompressor("gzip", 6)
+    first = compressor.compress(b"first chunk\n")
+
+    # Everything sent so far decodes without waiting for the end of the stream
+    decoder = zlib.decompressobj(31)
+    assert decoder.decompress(first) == b"first chunk\n"
+    assert gzip.decompress(first + compressor.compress(b"second\n") + compressor.finish()) == b"first chunk\nsecond\n"
@@ -0,0 +1,124 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import status
+from sqlalchemy import inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database import Base, ReplicaRouter, create_db_engine, replica_router, upgrade_schema
+from app.core.ids import timestamp_ms_of
+from app.models import Post, User
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def replica_engines(tmp_path):
+    """
+    Two SQLite files standing in for replicas, each holding one post naming it
+    """
+    engines = []
+    for index in range(2):
+        replica = create_db_engine(f"sqlite:///{tmp_path / f'replica{index}.db'}")
+        Base.metadata.create_all(bind=replica)
+        with replica.begin() as conn:
+            conn.execute(User.__table__.insert().values(id=1, username="owner", email="owner@example.com", hashed_password="x"))
+            conn.execute(Post.__table__.insert().values(id=1, content=f"replica-{index}", owner_id=1))
+        engines.append(replica)
+    yield engines
+    for replica in engines:
+        replica.dispose()
+
+def served_by(router, keys=()):
+    session = router.read_session(keys)
+    if session is None:
+        return "primary"
+    try:
+        return session.scalar(select(Post.content))
+    finally:
+        router.release(session)
+
+def test_round_robin_alternates_replicas(replica_engines):
+    router = ReplicaRouter(replica_engines)
+
+    assert [served_by(router) for _ in range(4)] == ["replica-0", "replica-1", "replica-0", "replica-1"]
+    assert router.in_flight() == [0, 0]
+
+def test_least_connections_prefers_idle_replica(replica_engines):
+    router = ReplicaRouter(replica_engines, strategy="least_connections")
+    busy = router.read_session()
+
+    assert busy.scalar(select(Post.content)) == "replica-0"
+    assert served_by(router) == "replica-1"
+    router.release(busy)
+    assert served_by(router) == "replica-0"
+
+def test_reads_stick_to_primary_after_own_write(replica_engines):
+    clock = FakeClock()
+    router = ReplicaRouter(replica_engines, sticky_seconds=5, clock=clock)
+
+    router.mark_write(["user:alice"])
+
+    assert served_by(router, ["user:alice"]) == "primary"
+    assert served_by(router, ["user:bob"]) == "replica-0"
+    clock.now += 6
+    assert served_by(router, ["user:alice"]) == "replica-1"
+
+def test_no_replicas_reads_from_primary():
+    assert served_by(ReplicaRouter()) == "primary"
+
+def test_new_user_reads_primary_until_sticky_window_passes(client, test_user, replica_engines, monkeypatch):
+    monkeypatch.setattr(replica_router, "sticky_seconds", 60)
+    replica_router.configure(replica_engines[:1])
+    try:
+        client.post("/api/v1/auth/register", json=test_user)
+        token = client.post(
+            "/api/v1/auth/token",
+            data={"username": test_user["username"], "password": test_user["password"]},
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # The replica doesn't know the new user yet, but their reads stick to the primary
+        assert client.get("/api/v1/auth/me", headers=headers).status_code == status.HTTP_200_OK
+        assert client.get("/api/v1/posts/", headers=headers).json() == []
+
+        replica_router._sticky.clear()
+        assert client.get("/api/v1/posts/", headers=headers).json()[0]["content"] == "replica-0"
+    finally:
+        replica_router.configure([])
+        replica_router._sticky.clear()
+
+def test_upgrade_schema_backfills_retweet_ids(tmp_path):
+    # A database created before retweets had ids
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE retweets (user_id INTEGER NOT NULL, post_id INTEGER NOT NULL, timestamp DATETIME, "
+            "PRIMARY KEY (user_id, post_id))"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO retweets VALUES (1, 7, '2024-03-01 12:00:00.000000'), (2, 7, '2024-03-01 12:00:00.000000'), "
+            "(1, 8, '2024-02-01 08:00:00.000000')"
+        )
+    tables = [Base.metadata.tables["retweets"]]
+
+    upgrade_schema(engine, tables)
+    upgrade_schema(engine, tables)
+
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT post_id, id FROM retweets ORDER BY id").all()
+    assert [post_id for post_id, _ in rows] == [8, 7, 7]
+    assert len({retweet_id for _, retweet_id in rows}) == 3
+    assert timestamp_ms_of(rows[0][1]) == datetime(2024, 2, 1, 8, tzinfo=timezone.utc).timestamp() * 1000
+    columns = {column["name"]: column for column in inspect(engine).get_columns("retweets")}
+    assert columns["id"]["nullable"] is False
+    indexes = {index["name"] for index in inspect(engine).get_indexes("retweets")}
+    assert {"ix_retweets_post_id_id", "ix_retweets_user_id_id"} <= indexes
+    with pytest.raises(IntegrityError), engine.begin() as conn:
+        conn.exec_driver_sql(f"INSERT INTO retweets (user_id, post_id, id) VALUES (3, 9, {rows[0][1]})")
+    engine.dispose()
+
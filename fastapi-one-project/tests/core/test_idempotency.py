@@ -0,0 +1,158 @@
+import asyncio
+import httpx
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.core.idempotency import (
+    DatabaseIdempotencyStore,
+    IdempotencyMiddleware,
+    IdempotencyRecord,
+    MemoryIdempotencyStore,
+    StoredResponse,
+    prune_idempotency_keys,
+)
+from app.models import IdempotencyKey, Job, Post
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_app(store, delay=0.0):
+    calls = []
+
+    async def create(request):
+        calls.append(await request.json())
+        await asyncio.sleep(delay)
+        status = 500 if request.query_params.get("fail") else 201
+        return JSONResponse({"id": len(calls)}, status_code=status)
+
+    app = Starlette(routes=[Route("/items/", create, methods=["POST"])])
+    app.add_middleware(IdempotencyMiddleware, paths=["/items/"], ttl_seconds=60, lease_seconds=10, store=store)
+    return app, calls
+
+def test_retry_replays_the_stored_response():
+    app, calls = make_app(MemoryIdempotencyStore(100))
+    client = TestClient(app)
+
+    first = client.post("/items/", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+    retry = client.post("/items/", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+
+    assert len(calls) == 1
+    assert (retry.status_code, retry.json()) == (first.status_code, first.json()) == (201, {"id": 1})
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    # No key, another key or another credential runs the handler again
+    client.post("/items/", json={"a": 1})
+    client.post("/items/", json={"a": 1}, headers={"Idempotency-Key": "k2"})
+    client.post("/items/", json={"a": 1}, headers={"Idempotency-Key": "k1", "Authorization": "Bearer other"})
+    assert len(calls) == 4
+
+def test_key_reused_for_another_request_is_refused():
+    app, calls = make_app(MemoryIdempotencyStore(100))
+    client = TestClient(app)
+    client.post("/items/", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+
+    response = client.post("/items/", json={"a": 2}, headers={"Idempotency-Key": "k1"})
+
+    assert response.status_code == 422
+    assert len(calls) == 1
+    assert client.post("/items/", json={"a": 1}, headers={"Idempotency-Key": "x" * 256}).status_code == 400
+
+def test_failed_requests_release_their_key():
+    app, calls = make_app(MemoryIdempotencyStore(100))
+    client = TestClient(app, raise_server_exceptions=False)
+
+    assert client.post("/items/?fail=1", json={}, headers={"Idempotency-Key": "k1"}).status_code == 500
+    assert client.post("/items/?fail=1", json={}, headers={"Idempotency-Key": "k1"}).status_code == 500
+    assert len(calls) == 2
+
+def test_concurrent_duplicates_coalesce():
+    app, calls = make_app(MemoryIdempotencyStore(100), delay=0.05)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            request = lambda: client.post("/items/", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+            return await asyncio.gather(*(request() for _ in range(5)))
+
+    responses = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert {response.json()["id"] for response in responses} == {1}
+    assert sum(response.headers.get("idempotent-replayed") == "true" for response in responses) == 4
+
+def test_claim_held_by_another_worker_answers_409():
+    class BusyStore(MemoryIdempotencyStore):
+        # Another worker claimed every key and hasn't finished
+        def claim(self, key, fingerprint, lease_seconds):
+            return IdempotencyRecord(fingerprint, None)
+
+    app, calls = make_app(BusyStore(100))
+    client = TestClient(app)
+
+    response = client.post("/items/", json={"a": 1}, headers={"Idempotency-Key": "k1"})
+
+    assert response.status_code == 409
+    assert response.headers["retry-after"] == "1"
+    assert calls == []
+
+@pytest.fixture
+def database_store(db_session):
+    clock = FakeClock()
+    return DatabaseIdempotencyStore(sessionmaker(bind=db_session.get_bind()), clock=clock), clock
+
+def test_database_store_claims_completes_and_expires(database_store, db_session):
+    store, clock = database_store
+    response = StoredResponse(201, [("content-type", "application/json")], b'{"id":1}')
+
+    assert store.claim("k", "f", lease_seconds=10) is None
+    assert store.claim("k", "f", lease_seconds=10).response is None
+    store.complete("k", response, ttl_seconds=60)
+    assert store.claim("k", "f", lease_seconds=10).response == response
+
+    clock.now += 61
+    assert store.claim("k", "other", lease_seconds=10) is None
+    store.release("k")
+    assert db_session.scalar(select(func.count()).select_from(IdempotencyKey)) == 0
+
+def test_database_store_queues_pruning_once(database_store, db_session):
+    store, clock = database_store
+    for key in ("a", "b"):
+        store.claim(key, "f", lease_seconds=10)
+        store.complete(key, StoredResponse(204, [], b""), ttl_seconds=0)
+
+    assert db_session.scalar(select(func.count()).select_from(Job).where(Job.kind == "prune_idempotency_keys")) == 1
+    prune_idempotency_keys(db_session, {})
+    db_session.commit()
+    assert db_session.scalar(select(func.count()).select_from(IdempotencyKey)) == 0
+
+def test_retried_post_creates_one_post(client, test_user, db_session):
+    client.post("/api/v1/auth/register", json=test_user)
+    token = client.post("/api/v1/auth/token", data={"username": test_user["username"], "password": test_user["password"]})
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}", "Idempotency-Key": "create-1"}
+
+    first = client.post("/api/v1/posts/", json={"content": "once"}, headers=headers)
+    retry = client.post("/api/v1/posts/", json={"content": "once"}, headers=headers)
+
+    assert first.status_code == 200
+    assert retry.json() == first.json()
+    assert db_session.scalar(select(func.count()).select_from(Post)) == 1
+
+def test_replay_gets_cors_headers_for_its_own_origin(client, login):
+    headers = {**login("alice"), "Idempotency-Key": "create-1", "Cookie": "session=1"}
+
+    first = client.post("/api/v1/posts/", json={"content": "once"}, headers={**headers, "Origin": "https://a.example"})
+    retry = client.post("/api/v1/posts/", json={"content": "once"}, headers={**headers, "Origin": "https://b.example"})
+
+    assert first.headers["access-control-allow-origin"] == "https://a.example"
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.headers["access-control-allow-origin"] == "https://b.example"
+
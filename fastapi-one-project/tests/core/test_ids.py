@@ -0,0 +1,75 @@
+import pytest
+
+from app.core.config import get_settings
+from app.core.ids import (
+    EPOCH_MS, MAX_SEQUENCE, SnowflakeGenerator, default_worker_id, id_at, set_leased_worker_id, shard_of, timestamp_ms_of, worker_of,
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = (EPOCH_MS + 5_000) / 1000
+
+    def __call__(self):
+        return self.now
+
+def test_ids_encode_shard_worker_and_time():
+    clock = FakeClock()
+    snowflake_id = SnowflakeGenerator(shard=3, worker=5, clock=clock).next_id()
+
+    assert shard_of(snowflake_id) == 3
+    assert worker_of(snowflake_id) == 5
+    assert timestamp_ms_of(snowflake_id) == EPOCH_MS + 5_000
+    assert snowflake_id < 2 ** 53
+
+def test_ids_increase_within_a_millisecond_and_when_the_clock_goes_back():
+    clock = FakeClock()
+    generator = SnowflakeGenerator(shard=0, clock=clock)
+
+    ids = [generator.next_id() for _ in range(MAX_SEQUENCE + 10)]
+    clock.now -= 1
+    ids.append(generator.next_id())
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+def test_ids_order_by_time_across_shards():
+    clock = FakeClock()
+    earlier = SnowflakeGenerator(shard=7, clock=clock).next_id()
+    clock.now += 0.001
+
+    assert SnowflakeGenerator(shard=0, clock=clock).next_id() > earlier
+
+def test_workers_never_collide_without_coordination():
+    clock = FakeClock()
+    workers = [SnowflakeGenerator(shard=0, worker=worker, clock=clock) for worker in range(8)]
+
+    ids = [generator.next_id() for _ in range(100) for generator in workers]
+
+    assert len(set(ids)) == len(ids)
+
+def test_id_at_is_a_cursor_for_older_than_a_time():
+    clock = FakeClock()
+    snowflake_id = SnowflakeGenerator(shard=9, worker=7, clock=clock).next_id()
+
+    assert id_at(EPOCH_MS + 5_000) <= snowflake_id < id_at(EPOCH_MS + 5_001)
+
+def test_shard_or_worker_out_of_range_is_rejected():
+    with pytest.raises(ValueError):
+        SnowflakeGenerator(shard=16)
+    with pytest.raises(ValueError):
+        SnowflakeGenerator(shard=0, worker=8)
+
+def test_worker_id_comes_from_settings_or_the_lease(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "SNOWFLAKE_WORKER_ID", 8)
+    with pytest.raises(ValueError):
+        default_worker_id()
+
+    monkeypatch.setattr(settings, "SNOWFLAKE_WORKER_ID", None)
+    with pytest.raises(RuntimeError):
+        default_worker_id()
+    set_leased_worker_id(3)
+    try:
+        assert default_worker_id() == 3
+    finally:
+        set_leased_worker_id(None)
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import status
+
+from app.core.metrics import metrics
+from app.core.rate_limit import MemoryRateLimitBackend
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_bucket_allows_burst_then_limits():
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(shards=4, clock=clock)
+
+    results = [backend.consume("login:1.2.3.4", capacity=3, refill_rate=1) for _ in range(4)]
+
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert results[-1].retry_after == pytest.approx(1.0)
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(clock=clock)
+    for _ in range(2):
+        backend.consume("key", capacity=2, refill_rate=0.5)
+    assert not backend.consume("key", capacity=2, refill_rate=0.5).allowed
+
+    clock.now += 2
+    assert backend.consume("key", capacity=2, refill_rate=0.5).allowed
+
+def test_keys_are_independent():
+    backend = MemoryRateLimitBackend(clock=FakeClock())
+    assert backend.consume("a", capacity=1, refill_rate=1).allowed
+    assert not backend.consume("a", capacity=1, refill_rate=1).allowed
+    assert backend.consume("b", capacity=1, refill_rate=1).allowed
+
+def test_sweep_drops_refilled_buckets():
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(shards=1, sweep_interval=10, clock=clock)
+    backend.consume("a", capacity=5, refill_rate=1)
+    backend.consume("b", capacity=5, refill_rate=1)
+    assert len(backend) == 2
+
+    clock.now += 11
+    backend.consume("c", capacity=5, refill_rate=1)
+
+    assert len(backend) == 1
+
+def test_login_burst_is_rejected(client, test_user):
+    client.post("/api/v1/auth/register", json=test_user)
+    login_data = {"username": test_user["username"], "password": "wrongpassword"}
+    limited_before = metrics.counter("rate_limit_requests_total", scope="login", outcome="limited")
+
+    responses = [client.post("/api/v1/auth/token", data=login_data) for _ in range(11)]
+
+    assert [r.status_code for r in responses[:10]] == [status.HTTP_401_UNAUTHORIZED] * 10
+    assert responses[10].status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(responses[10].headers["Retry-After"]) >= 1
+    assert metrics.counter("rate_limit_requests_total", scope="login", outcome="limited") == limited_before + 1
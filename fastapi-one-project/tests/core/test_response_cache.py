@@ -0,0 +1,96 @@
+import pytest
+
+from app.core.response_cache import ResponseCache, response_cache
+from app.core.static_assets import Asset
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def entry(text):
+    return Asset.from_bytes(text.encode(), "application/json")
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(ttl_seconds=1.0, max_entries=10, clock=clock)
+    cache.set(("user", "/feed", ""), entry("[]"))
+
+    assert cache.get(("user", "/feed", "")).content == b"[]"
+    clock.now = 1.0
+    assert cache.get(("user", "/feed", "")) is None
+    assert len(cache) == 0
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(ttl_seconds=60, max_entries=2)
+    cache.set(("a", "/feed", ""), entry("1"))
+    cache.set(("b", "/feed", ""), entry("2"))
+    cache.get(("a", "/feed", ""))
+    cache.set(("c", "/feed", ""), entry("3"))
+
+    assert cache.get(("b", "/feed", "")) is None
+    assert cache.get(("a", "/feed", "")) is not None
+
+def test_invalidate_drops_only_that_credential():
+    cache = ResponseCache(ttl_seconds=60, max_entries=10)
+    cache.set(("a", "/feed", ""), entry("1"))
+    cache.set(("a", "/feed", "limit=5"), entry("2"))
+    cache.set(("b", "/feed", ""), entry("3"))
+
+    cache.invalidate("a")
+
+    assert len(cache) == 1
+    assert cache.get(("b", "/feed", "")) is not None
+
+@pytest.fixture
+def cached_client(client, monkeypatch):
+    monkeypatch.setattr(response_cache, "ttl_seconds", 60.0)
+    return client
+
+def test_feed_hits_skip_the_database(cached_client, count_queries, login):
+    headers = login("cacheuser")
+    cached_client.post("/api/v1/posts/", json={"content": "cached post"}, headers=headers)
+
+    first = cached_client.get("/api/v1/posts/with_counts/", headers={**headers, "Accept-Encoding": "gzip"})
+    with count_queries() as statements:
+        second = cached_client.get("/api/v1/posts/with_counts/", headers={**headers, "Accept-Encoding": "gzip"})
+
+    assert statements == []
+    assert second.json() == first.json()
+    assert second.headers["content-encoding"] == "gzip"
+    assert second.headers["cache-control"] == "private, no-cache"
+    revalidated = cached_client.get(
+        "/api/v1/posts/with_counts/", headers={**headers, "Accept-Encoding": "gzip", "If-None-Match": second.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+
+def test_hits_and_misses_carry_cors_headers(cached_client, count_queries, login):
+    headers = {**login("corsuser"), "Origin": "https://client.example.com"}
+
+    miss = cached_client.get("/api/v1/posts/with_counts/", headers=headers)
+    with count_queries() as statements:
+        hit = cached_client.get("/api/v1/posts/with_counts/", headers=headers)
+
+    assert statements == []
+    for response in (miss, hit):
+        assert response.headers["access-control-allow-origin"] == "*"
+        assert response.headers["access-control-allow-credentials"] == "true"
+
+def test_own_writes_invalidate_and_credentials_are_isolated(cached_client, login):
+    alice, bob = login("alice"), login("bob")
+    cached_client.post("/api/v1/posts/", json={"content": "first"}, headers=alice)
+    bob_before = cached_client.get("/api/v1/posts/with_counts/", headers=bob).json()
+    assert [post["is_owner"] for post in bob_before] == [False]
+    assert cached_client.get("/api/v1/posts/with_counts/", headers=alice).json()[0]["is_owner"] is True
+
+    cached_client.post("/api/v1/posts/", json={"content": "second"}, headers=alice)
+
+    assert len(cached_client.get("/api/v1/posts/with_counts/", headers=alice).json()) == 2
+    # Bob's entry lives out its TTL
+    assert cached_client.get("/api/v1/posts/with_counts/", headers=bob).json() == bob_before
+
+def test_errors_are_not_cached(cached_client):
+    assert cached_client.get("/api/v1/posts/with_counts/").status_code == 401
+    assert len(response_cache) == 0
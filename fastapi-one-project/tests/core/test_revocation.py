@@ -0,0 +1,70 @@
+import pytest
+from app.core.revocation import BloomFilter, RevocationList
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+def test_revoked_token_is_detected():
+    clock = FakeClock()
+    revoked = RevocationList(partition_seconds=60, clock=clock)
+    expires_at = int(clock.now) + 120
+
+    revoked.add("abc", expires_at)
+
+    assert revoked.is_revoked("abc", expires_at)
+    assert not revoked.is_revoked("def", expires_at)
+
+def test_partitions_are_dropped_after_expiry():
+    clock = FakeClock()
+    revoked = RevocationList(partition_seconds=60, clock=clock)
+    revoked.add("old", int(clock.now) + 30)
+    assert len(revoked) == 1
+
+    clock.now += 200
+    revoked.add("new", int(clock.now) + 30)
+
+    assert len(revoked) == 1
+    assert revoked.is_revoked("new", int(clock.now) + 30)
+
+def test_partition_falls_back_to_bloom_when_full():
+    clock = FakeClock()
+    revoked = RevocationList(partition_seconds=60, capacity=10, clock=clock)
+    expires_at = int(clock.now) + 30
+    for i in range(11):
+        revoked.add(f"jti-{i}", expires_at)
+
+    assert all(revoked.is_revoked(f"jti-{i}", expires_at) for i in range(11))
+    assert len(revoked) == 10
+
+def test_sync_loads_revocations_from_other_workers(db_session):
+    writer = RevocationList()
+    reader = RevocationList()
+    expires_at = int(writer._clock()) + 600
+
+    writer.revoke(db_session, "shared", expires_at)
+    reader.sync(db_session)
+
+    assert reader.is_revoked("shared", expires_at)
+
+def test_only_the_first_revocation_of_a_token_succeeds(db_session):
+    first, second = RevocationList(), RevocationList()
+    expires_at = int(first._clock()) + 600
+
+    assert first.revoke(db_session, "once", expires_at) is True
+    # second hasn't synced, so only the unique jti column stops it
+    assert second.revoke(db_session, "once", expires_at) is False
+    assert second.is_revoked("once", expires_at)
@@ -0,0 +1,51 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+
+def run_python(code, tmp_path):
+    env = {"SQLALCHEMY_DATABASE_URL": f"sqlite:///{tmp_path / 'startup.db'}", "JOBS_ENABLED": "false", "PATH": ""}
+    return subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True).stdout
+
+def test_import_has_no_side_effects(tmp_path):
+    output = run_python(
+        "import sys, app.main, app.core.database as database, app.core.security as security; "
+        "print(database._engine is None, security.get_pwd_context.cache_info().currsize, 'jinja2' in sys.modules)",
+        tmp_path,
+    )
+
+    assert output.split() == ["True", "0", "False"]
+    assert not (tmp_path / "startup.db").exists()
+
+def test_lifespan_creates_tables(tmp_path):
+    run_python(
+        "from fastapi.testclient import TestClient; from app.main import app\n"
+        "with TestClient(app): pass",
+        tmp_path,
+    )
+
+    tables = inspect(create_engine(f"sqlite:///{tmp_path / 'startup.db'}")).get_table_names()
+    assert {"users", "posts", "likes"} <= set(tables)
+
+def test_lifespan_upgrades_existing_tables(tmp_path):
+    # A database created before posts had deleted_at
+    engine = create_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE posts (id INTEGER PRIMARY KEY, content VARCHAR(280) NOT NULL, timestamp DATETIME, owner_id INTEGER)"
+        )
+    engine.dispose()
+
+    output = run_python(
+        "from fastapi.testclient import TestClient; from app.main import app\n"
+        "with TestClient(app) as client: print(client.get('/api/v1/posts/').status_code)",
+        tmp_path,
+    )
+
+    assert output.split() == ["200"]
+    posts = inspect(create_engine(f"sqlite:///{tmp_path / 'startup.db'}"))
+    assert "deleted_at" in {column["name"] for column in posts.get_columns("posts")}
+    assert "ix_posts_owner_id_id" in {index["name"] for index in posts.get_indexes("posts")}
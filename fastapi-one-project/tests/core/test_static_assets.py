@@ -0,0 +1,98 @@
+import gzip
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.core.static_assets import IMMUTABLE_CACHE_CONTROL, Asset, StaticAssets
+
+CSS = b"body { color: black; }\n" * 200
+
+@pytest.fixture
+def assets(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_bytes(CSS)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + bytes(range(256)))
+    return StaticAssets(tmp_path, prefix="/static")
+
+@pytest.fixture
+def static_client(assets):
+    return TestClient(Starlette(routes=[Mount("/static", assets, name="static")]))
+
+def test_hashed_url_is_immutable(assets, static_client):
+    url = assets.url("css/site.css")
+    assert url.startswith("/static/css/site.") and url.endswith(".css")
+
+    response = static_client.get(url, headers={"Accept-Encoding": "identity"})
+
+    assert response.status_code == 200
+    assert response.content == CSS
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["accept-ranges"] == "bytes"
+
+def test_plain_url_revalidates_with_etag(static_client):
+    response = static_client.get("/static/css/site.css", headers={"Accept-Encoding": "identity"})
+    assert response.headers["cache-control"] == "no-cache"
+
+    cached = static_client.get(
+        "/static/css/site.css", headers={"Accept-Encoding": "identity", "If-None-Match": response.headers["etag"]}
+    )
+
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+def test_precompressed_variant_follows_accept_encoding(assets, static_client):
+    response = static_client.get(assets.url("css/site.css"), headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"].endswith('-gzip"')
+    # httpx decodes the body; the wire size is the precompressed one
+    assert response.content == CSS
+    assert int(response.headers["content-length"]) < len(CSS)
+
+def test_binary_files_are_not_compressed(assets, static_client):
+    response = static_client.get(assets.url("logo.png"), headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-type"] == "image/png"
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+
+def test_range_requests(assets, static_client):
+    url = assets.url("css/site.css")
+
+    partial = static_client.get(url, headers={"Range": "bytes=0-3", "Accept-Encoding": "gzip"})
+    assert partial.status_code == 206
+    assert partial.content == CSS[:4]
+    assert partial.headers["content-range"] == f"bytes 0-3/{len(CSS)}"
+    assert "content-encoding" not in partial.headers
+
+    suffix = static_client.get(url, headers={"Range": "bytes=-5"})
+    assert suffix.content == CSS[-5:]
+
+    unsatisfiable = static_client.get(url, headers={"Range": f"bytes={len(CSS)}-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"bytes */{len(CSS)}"
+
+def test_stale_if_range_sends_whole_file(assets, static_client):
+    response = static_client.get(
+        assets.url("css/site.css"), headers={"Range": "bytes=0-3", "If-Range": '"old"', "Accept-Encoding": "identity"}
+    )
+
+    assert response.status_code == 200
+    assert response.content == CSS
+
+def test_head_and_missing_files(assets, static_client):
+    head = static_client.head(assets.url("css/site.css"), headers={"Accept-Encoding": "identity"})
+    assert head.status_code == 200
+    assert head.headers["content-length"] == str(len(CSS))
+    assert head.content == b""
+
+    assert static_client.get("/static/css/missing.css").status_code == 404
+    assert static_client.post(assets.url("css/site.css")).status_code == 405
+
+def test_gzip_variant_is_deterministic():
+    first, second = Asset.from_bytes(CSS, "text/css"), Asset.from_bytes(CSS, "text/css")
+
+    assert first.encodings["gzip"] == second.encodings["gzip"]
+    assert gzip.decompress(first.encodings["gzip"]) == CSS
@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.ids import MAX_WORKERS, set_leased_worker_id
+from app.core.worker_lease import WorkerIdLease
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_800_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def make_lease(db_session):
+    clock = FakeClock()
+    session_factory = sessionmaker(bind=db_session.get_bind())
+
+    def make(holder):
+        return WorkerIdLease(session_factory, ttl_seconds=30.0, holder=holder, clock=clock)
+
+    yield make, clock
+    set_leased_worker_id(None)
+
+def test_live_processes_get_distinct_ids(make_lease):
+    make, clock = make_lease
+    leases = [make(f"host:{pid}") for pid in range(MAX_WORKERS)]
+
+    assert sorted(lease.claim() for lease in leases) == list(range(MAX_WORKERS))
+    # A ninth process refuses to start instead of sharing an id
+    with pytest.raises(RuntimeError):
+        make("host:extra").claim()
+
+def test_expired_lease_is_taken_over_and_the_old_holder_stops(make_lease):
+    make, clock = make_lease
+    first, second = make("host:1"), make("host:2")
+    assert first.claim() == 0
+
+    clock.now += 10
+    assert first.renew() is True
+    assert second.claim() == 1
+
+    # first stalls past its lease and a new process claims the id
+    clock.now += 31
+    assert make("host:3").claim() == 0
+    assert first.renew() is False
+    assert first.worker_id is None
+
+def test_unrenewed_lease_is_dropped_once_it_runs_out(make_lease):
+    make, clock = make_lease
+    lease = make("host:1")
+    lease.claim()
+
+    clock.now += 29
+    lease.expire()
+    assert lease.worker_id == 0
+    clock.now += 1
+    lease.expire()
+    assert lease.worker_id is None
+
+def test_released_id_is_claimed_again_at_once(make_lease):
+    make, clock = make_lease
+    lease = make("host:1")
+    lease.claim()
+    lease.release()
+
+    assert make("host:2").claim() == 0
+
+def test_hold_keeps_the_id_for_the_block(make_lease):
+    make, clock = make_lease
+    lease = make("cli:1")
+
+    with lease.hold() as worker_id:
+        assert worker_id == 0
+        assert make("host:2").claim() == 1
+    assert lease.worker_id is None
+    assert make("host:3").claim() == 0
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import create_access_token
+from app.jobs import JobWorker, enqueue, job, run_pending
+from app.jobs.queue import claim
+from app.models import Job, RevokedToken
+
+calls = []
+
+@job("test_record", max_attempts=3)
+def record(db, payload):
+    calls.append(payload["value"])
+
+@job("test_explode", max_attempts=2)
+def explode(db, payload):
+    db.add(RevokedToken(jti="written-by-failing-job", expires_at=0))
+    raise RuntimeError("boom")
+
+@pytest.fixture
+def session_factory(db_session):
+    calls.clear()
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_session.get_bind())
+
+def test_job_is_queued_only_if_the_write_commits(db_session, session_factory):
+    enqueue(db_session, "test_record", {"value": "rolled back"})
+    db_session.rollback()
+    enqueue(db_session, "test_record", {"value": "committed"})
+    db_session.commit()
+
+    assert run_pending(session_factory) == 1
+    assert calls == ["committed"]
+    assert db_session.scalar(select(Job.status)) == "done"
+
+def test_idempotency_key_drops_duplicates(db_session, session_factory):
+    for _ in range(3):
+        enqueue(db_session, "test_record", {"value": "once"}, idempotency_key="record:once")
+        db_session.commit()
+    run_pending(session_factory)
+    # A finished job still holds its key
+    enqueue(db_session, "test_record", {"value": "once"}, idempotency_key="record:once")
+    db_session.commit()
+    run_pending(session_factory)
+
+    assert calls == ["once"]
+
+def test_failed_job_is_retried_with_backoff_then_marked_failed(db_session, session_factory):
+    enqueue(db_session, "test_explode")
+    db_session.commit()
+
+    assert run_pending(session_factory) == 1
+    failed = db_session.scalar(select(Job))
+    assert failed.status == "pending"
+    assert failed.attempts == 1
+    assert failed.run_at > time.time()
+    assert "boom" in failed.last_error
+    # The handler's own writes were rolled back with it
+    assert db_session.scalar(select(RevokedToken)) is None
+
+    # Not due yet, so nothing runs until the backoff passes
+    assert run_pending(session_factory) == 0
+    db_session.refresh(failed)
+    failed.run_at = 0
+    db_session.commit()
+    assert run_pending(session_factory) == 1
+    db_session.refresh(failed)
+    assert failed.status == "failed"
+    assert failed.attempts == 2
+
+def test_expired_lease_is_claimed_again(db_session):
+    enqueue(db_session, "test_record", {"value": "crashed"})
+    db_session.commit()
+    now = time.time()
+
+    assert len(claim(db_session, 10, lease_seconds=30, now=now)) == 1
+    assert claim(db_session, 10, lease_seconds=30, now=now + 10) == []
+    reclaimed = claim(db_session, 10, lease_seconds=30, now=now + 31)
+    assert [row.attempts for row in reclaimed] == [2]
+
+def test_worker_runs_jobs_in_the_background_and_drains_on_stop(db_session, session_factory):
+    worker = JobWorker(session_factory, concurrency=1, poll_interval=30)
+
+    async def scenario():
+        await worker.start()
+        enqueue(db_session, "test_record", {"value": "woken"})
+        db_session.commit()
+        worker.wake()
+        for _ in range(100):
+            if calls:
+                break
+            await asyncio.sleep(0.01)
+        enqueue(db_session, "test_record", {"value": "drained"})
+        db_session.commit()
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+    assert calls == ["woken", "drained"]
+    assert not worker.running
+
+def test_logout_leaves_pruning_to_a_job(client, db_session, session_factory):
+    db_session.add(RevokedToken(jti="long-expired", expires_at=1))
+    db_session.commit()
+    token = create_access_token(data={"sub": "someone"})
+
+    client.post("/api/v1/auth/logout", headers={"Authorization": f"Bearer {token}"})
+    assert db_session.scalar(select(RevokedToken.id).where(RevokedToken.jti == "long-expired")) is not None
+
+    assert run_pending(session_factory) == 1
+    assert db_session.scalar(select(RevokedToken.id).where(RevokedToken.jti == "long-expired")) is None
@@ -0,0 +1,114 @@
+from sqlalchemy import func, select
+from app.repositories.post_repository import PostRepository
+from app.models import Job, Post, Like, Retweet
+
+def test_create_returns_loaded_row_in_one_statement(db_session, count_queries):
+    repo = PostRepository(db_session)
+
+    with count_queries() as statements:
+        post = repo.create(content="Test post", owner_id=1)
+        # Database defaults come back with the insert, nothing is reloaded
+        assert post.id is not None
+        assert post.timestamp is not None
+
+    assert len(statements) == 1
+    assert "RETURNING" in statements[0]
+
+def test_update_single_statement(db_session, count_queries):
+    repo = PostRepository(db_session)
+    post_id = repo.create(content="Test post", owner_id=1).id
+
+    with count_queries() as statements:
+        post = repo.update(post_id, content="Edited")
+        assert post.content == "Edited"
+
+    assert len(statements) == 1
+    assert db_session.get(Post, post_id).content == "Edited"
+
+def test_update_missing_returns_none(db_session):
+    repo = PostRepository(db_session)
+
+    assert repo.update(12345, content="Edited") is None
+
+def test_delete_reports_affected_row(db_session):
+    repo = PostRepository(db_session)
+    post_id = repo.create(content="Test post", owner_id=1).id
+
+    assert repo.delete(post_id) is True
+    assert repo.delete(post_id) is False
+
+def test_create_many_keeps_input_order(db_session, count_queries):
+    repo = PostRepository(db_session)
+
+    with count_queries() as statements:
+        posts = repo.create_many([{"content": f"post {i}", "owner_id": 1} for i in range(5)])
+
+    assert len(statements) == 1
+    assert [post.content for post in posts] == [f"post {i}" for i in range(5)]
+    assert repo.create_many([{"content": "quiet", "owner_id": 1}], returning=False) == []
+    assert db_session.scalar(select(func.count()).select_from(Post)) == 6
+
+def test_update_many_and_delete_many_count_rows(db_session):
+    repo = PostRepository(db_session)
+    ids = [post.id for post in repo.create_many([{"content": f"post {i}", "owner_id": 1} for i in range(3)])]
+
+    assert repo.update_many([{"id": post_id, "content": "bulk"} for post_id in ids] + [{"id": 999, "content": "bulk"}]) == 3
+    assert {post.content for post in repo.get_posts()} == {"bulk"}
+    assert repo.delete_many(ids[:2] + [999]) == 2
+    assert [post.id for post in repo.get_posts()] == ids[2:]
+
+def test_delete_many_is_soft_and_queues_a_purge(db_session, count_queries):
+    repo = PostRepository(db_session)
+    ids = [post.id for post in repo.create_many([{"content": f"post {i}", "owner_id": 1} for i in range(2)])]
+    db_session.add_all([Like(user_id=2, post_id=ids[0]), Retweet(user_id=3, post_id=ids[1])])
+    db_session.commit()
+
+    with count_queries() as statements:
+        assert repo.delete_many(ids) == 2
+
+    # One UPDATE marking the posts and one INSERT queueing the purge; no interaction is touched yet
+    assert len(statements) == 2
+    assert repo.get_posts() == [] and repo.get(ids[0]) is None
+    assert db_session.scalar(select(func.count()).select_from(Like)) == 1
+    assert db_session.scalar(select(func.count()).select_from(Job).where(Job.kind == "purge_deleted_posts")) == 1
+
+def test_purge_removes_interactions_a_chunk_at_a_time(db_session):
+    repo = PostRepository(db_session)
+    post_id = repo.create(content="viral", owner_id=1).id
+    db_session.add_all([Like(user_id=user_id, post_id=post_id) for user_id in range(2, 7)])
+    db_session.commit()
+    repo.delete(post_id)
+
+    assert repo.purge_deleted([post_id], chunk_size=2) == [post_id]
+    assert db_session.scalar(select(func.count()).select_from(Like)) == 3
+    assert repo.purge_deleted([post_id], chunk_size=2) == [post_id]
+    assert repo.purge_deleted([post_id], chunk_size=2) == []
+    assert db_session.scalar(select(func.count()).select_from(Like)) == 0
+    assert db_session.scalar(select(func.count()).select_from(Post)) == 0
+
+def test_get_cached_serves_detached_copies(db_session, count_queries):
+    repo = PostRepository(db_session)
+    post_id = repo.create(content="Cached post", owner_id=1).id
+    assert repo.get_cached(post_id).content == "Cached post"
+
+    with count_queries() as statements:
+        post = repo.get_cached(post_id)
+
+    assert statements == []
+    assert post.content == "Cached post"
+    assert post.timestamp is not None
+    assert post not in db_session
+
+def test_writes_invalidate_the_cache(db_session):
+    repo = PostRepository(db_session)
+    post_id = repo.create(content="Cached post", owner_id=1).id
+    repo.get_cached(post_id)
+
+    repo.update(post_id, content="Edited")
+    assert repo.get_cached(post_id).content == "Edited"
+
+    repo.update_many([{"id": post_id, "content": "Bulk edited"}])
+    assert repo.get_cached(post_id).content == "Bulk edited"
+
+    repo.delete(post_id)
+    assert repo.get_cached(post_id) is None
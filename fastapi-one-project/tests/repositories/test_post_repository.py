@@ -1,6 +1,8 @@
-import pytest
+from datetime import datetime
+from sqlalchemy import event
 from app.repositories.post_repository import PostRepository
-from app.models import Post, Like, Retweet
+from app.models import Post, Like, Retweet, UserStats
+from app.repositories.user_stats_repository import UserStatsRepository
 
 def test_create_post(db_session):
     repo = PostRepository(db_session)
@@ -73,4 +75,106 @@ def test_unlike_post(db_session):
     
     # Verify like is removed
     like = db_session.query(Like).filter_by(post_id=post.id, user_id=2).first()
-    assert like is None 
\ No newline at end of file
+    assert like is None 
+def test_feed_order_is_creation_order_and_pages_stably(db_session):
+    repo = PostRepository(db_session)
+    # Created back to back, most of these share a timestamp millisecond
+    created = [repo.create(content=f"post {index}", owner_id=1).id for index in range(40)]
+
+    first_page = [post.id for post in repo.get_posts(limit=15)]
+    # A post arriving between page loads doesn't shift the next page
+    repo.create(content="late post", owner_id=1)
+    second_page = [post.id for post in repo.get_posts(limit=15, before=first_page[-1])]
+    third_page = [row.id for row in repo.get_posts_with_counts(1, limit=15, before=second_page[-1])]
+
+    assert first_page + second_page + third_page == created[::-1]
+
+def test_feed_queries_read_posts_in_key_order(db_session):
+    repo = PostRepository(db_session)
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db_session.bind, "before_cursor_execute", capture)
+    try:
+        repo.get_posts(limit=10, before=2 ** 52)
+        repo.get_posts_with_counts(current_user_id=1, limit=10, before=2 ** 52)
+    finally:
+        event.remove(db_session.bind, "before_cursor_execute", capture)
+
+    assert len(statements) == 2
+    for statement, parameters in statements:
+        plan = db_session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        details = [row[-1] for row in plan]
+        # Walked backwards through the primary key (the rowid), with no sort step
+        assert not any("TEMP B-TREE" in detail for detail in details)
+        assert "SEARCH posts USING INTEGER PRIMARY KEY (rowid<?)" in details
+
+def test_edit_is_one_conditional_update_recording_a_revision(db_session, count_queries):
+    repo = PostRepository(db_session)
+    post_id = repo.create(content="First draft", owner_id=1).id
+    long_ago = datetime(2000, 1, 1)
+
+    with count_queries() as statements:
+        post = repo.edit(post_id, owner_id=1, content="Second draft", created_after=long_ago)
+
+    assert len(statements) == 1
+    assert post.content == "Second draft"
+    repo.edit(post_id, owner_id=1, content="Final", created_after=long_ago)
+    # Newest first, each holding the content its edit replaced
+    revisions = repo.get_revisions(post_id)
+    assert [revision.content for revision in revisions] == ["Second draft", "First draft"]
+    assert revisions[0].replaced_at is not None
+    assert [revision.content for revision in repo.get_revisions(post_id, before=revisions[0].id)] == ["First draft"]
+
+def test_edit_matches_nothing_outside_ownership_or_window(db_session):
+    repo = PostRepository(db_session)
+    post_id = repo.create(content="Original", owner_id=1).id
+
+    assert repo.edit(post_id, owner_id=2, content="Hijacked", created_after=datetime(2000, 1, 1)) is None
+    assert repo.edit(post_id, owner_id=1, content="Late", created_after=datetime(2100, 1, 1)) is None
+    assert repo.get(post_id).content == "Original"
+    assert repo.get_revisions(post_id) == []
+
+def test_deleting_a_deleted_post_rolls_back_staged_counters(db_session):
+    repo = PostRepository(db_session)
+    stats = UserStatsRepository(db_session)
+    post_id = repo.create(content="Twice", owner_id=1).id
+    stats.increment(1, posts_count=1)
+    db_session.commit()
+
+    stats.increment(1, posts_count=-1)
+    assert repo.delete(post_id) is True
+    # A second, concurrent delete of the same post stages its decrement too
+    stats.increment(1, posts_count=-1)
+    assert repo.delete(post_id) is False
+
+    db_session.expire_all()
+    assert db_session.get(UserStats, 1).posts_count == 0
+
+def test_ranking_candidates(db_session):
+    repo = PostRepository(db_session)
+    old, quiet, popular, other = (repo.create(content=f"post {i}", owner_id=owner).id for i, owner in enumerate((1, 1, 1, 2)))
+    db_session.add_all([Like(user_id=5, post_id=popular), Like(user_id=6, post_id=popular), Retweet(user_id=5, post_id=other)])
+    db_session.commit()
+    repo.delete(quiet)
+
+    # Newest first, deleted posts left out, counts attached
+    rows = repo.feed_candidates([1])
+    assert [row.id for row in rows] == [popular, old]
+    assert (rows[0].likes_count, rows[0].retweets_count) == (2, 0)
+    assert [row.id for row in repo.feed_candidates([1], after=old)] == [popular]
+    assert repo.feed_candidates([]) == []
+    # Most engaged first, only after the given id
+    assert [row.id for row in repo.trending_candidates(after=old)] == [popular, other]
+    assert [row.id for row in repo.trending_candidates(after=old, limit=1)] == [popular]
+    assert repo.affinity(5, [1, 2, 3]) == {1: 1, 2: 1}
+    assert repo.affinity(6, [2]) == {}
+
+def test_posts_with_counts_by_ids_keep_the_given_order(db_session):
+    repo = PostRepository(db_session)
+    first, second = (repo.create(content=f"post {i}", owner_id=1).id for i in range(2))
+
+    assert [row.id for row in repo.get_posts_with_counts_by_ids(1, [first, 999, second])] == [first, second]
+    assert repo.get_posts_with_counts_by_ids(1, []) == []
@@ -0,0 +1,147 @@
+import pytest
+from datetime import datetime
+
+from app.core.database import create_db_engine
+from app.core.sharding import ShardRouter, shard_router
+from app.models import Like, Post, User
+from app.repositories.sharded_post_repository import ShardedPostRepository
+
+@pytest.fixture
+def router(tmp_path):
+    """
+    Three SQLite files standing in for the post shards
+    """
+    router = ShardRouter([create_db_engine(f"sqlite:///{tmp_path / f'shard{index}.db'}") for index in range(3)])
+    router.create_tables()
+    yield router
+    for shard in router.shards:
+        shard.dispose()
+
+@pytest.fixture
+def repo(db_session, router):
+    for user_id in range(1, 4):
+        db_session.add(User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", hashed_password="x"))
+    db_session.commit()
+    repo = ShardedPostRepository(db_session, router)
+    yield repo
+    repo.close()
+
+def test_posts_live_on_their_owners_shard(repo, router):
+    post = repo.create(content="Sharded post", owner_id=2)
+
+    assert router.shard_for_post(post.id) == router.shard_for_user(2) == 2
+    with router.session(2) as shard:
+        assert shard.get(Post, post.id) is not None
+    with router.session(0) as shard:
+        assert shard.get(Post, post.id) is None
+    assert post.owner_username == "user2"
+    assert repo.get(post.id).content == "Sharded post"
+
+def test_feed_merges_shards_newest_first(repo):
+    created = [repo.create(content=f"post {index}", owner_id=index % 3 + 1) for index in range(9)]
+
+    feed = repo.get_posts(skip=2, limit=4)
+
+    assert [post.id for post in feed] == [post.id for post in reversed(created)][2:6]
+    assert [post.owner_username for post in feed] == [post.owner_username for post in reversed(created)][2:6]
+
+def test_interactions_are_counted_on_the_posts_shard(repo, router):
+    post = repo.create(content="Liked post", owner_id=3)
+    other = repo.create(content="Other post", owner_id=1)
+
+    assert repo.like_post(post.id, user_id=1) is True
+    assert repo.like_post(post.id, user_id=1) is False
+    assert repo.retweet_post(post.id, user_id=2) is True
+    with router.session(router.shard_for_post(post.id)) as shard:
+        assert shard.query(Like).filter_by(post_id=post.id).count() == 1
+
+    rows = repo.get_posts_with_counts(current_user_id=3)
+
+    assert [row["id"] for row in rows] == [other.id, post.id]
+    assert rows[1]["likes_count"] == 1
+    assert rows[1]["retweets_count"] == 1
+    assert rows[1]["is_owner"] is True
+    assert rows[1]["owner_username"] == "user3"
+
+def test_timeline_merges_shards_and_skips_superseded_events(repo):
+    first = repo.create(content="first", owner_id=1)
+    second = repo.create(content="second", owner_id=2)
+    repo.retweet_post(first.id, user_id=2)
+    repo.retweet_post(first.id, user_id=3)
+
+    timeline = repo.get_timeline(limit=10)
+
+    assert [(entry["post"]["content"], entry["retweeted_by"]) for entry in timeline] == [
+        ("first", "user3"), ("second", None),
+    ]
+    assert timeline[0]["post"]["owner_username"] == "user1"
+    # Scoped to user2, whose retweet is now the latest event for the first post
+    assert [entry["retweeted_by"] for entry in repo.get_timeline(limit=10, user_ids={2})] == ["user2", None]
+
+def test_update_and_delete_route_by_post_id(repo):
+    post = repo.create(content="Original", owner_id=1)
+    repo.like_post(post.id, user_id=2)
+
+    assert repo.update(post.id, content="Edited").content == "Edited"
+    assert repo.delete(post.id) is True
+    assert repo.get(post.id) is None
+    assert repo.purge_deleted([post.id], chunk_size=100) == []
+    assert repo.unlike_post(post.id, user_id=2) is False
+
+def test_api_serves_posts_from_shards(client, test_user, test_post, router):
+    client.post("/api/v1/auth/register", json=test_user)
+    token = client.post(
+        "/api/v1/auth/token",
+        data={"username": test_user["username"], "password": test_user["password"]},
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    shard_router.configure(router.shards)
+    try:
+        created = client.post("/api/v1/posts/", json=test_post, headers=headers).json()
+        client.post(f"/api/v1/posts/{created['id']}/like", headers=headers)
+
+        assert router.shard_for_post(created["id"]) == router.shard_for_user(created["owner_id"])
+        assert client.get("/api/v1/posts/").json()[0]["owner_username"] == test_user["username"]
+        with_counts = client.get("/api/v1/posts/with_counts/", headers=headers).json()
+        assert with_counts[0]["likes_count"] == 1
+        assert with_counts[0]["is_owner"] is True
+    finally:
+        shard_router.configure([])
+
+def test_profile_reads_stay_on_the_owners_shard(repo):
+    posts = [repo.create(content=f"post {index}", owner_id=index % 3 + 1) for index in range(6)]
+    repo.like_post(posts[0].id, user_id=2)
+    repo.like_post(posts[3].id, user_id=3)
+    repo.like_post(posts[1].id, user_id=1)
+
+    assert [post.id for post in repo.get_posts(owner_id=1)] == [posts[3].id, posts[0].id]
+    assert repo.post_stats_by_owner([1, 2, 3]) == {
+        1: {"posts_count": 2, "likes_received": 2},
+        2: {"posts_count": 2, "likes_received": 1},
+        3: {"posts_count": 2, "likes_received": 0},
+    }
+
+def test_edit_records_revisions_on_the_posts_shard(repo):
+    post = repo.create(content="Original", owner_id=2)
+
+    edited = repo.edit(post.id, owner_id=2, content="Edited", created_after=datetime(2000, 1, 1))
+
+    assert edited.owner_username == "user2"
+    assert [revision.content for revision in repo.get_revisions(post.id)] == ["Original"]
+
+def test_ranking_candidates_gather_across_shards(repo):
+    created = [repo.create(content=f"post {index}", owner_id=index % 3 + 1) for index in range(6)]
+    repo.like_post(created[1].id, user_id=1)
+    repo.like_post(created[4].id, user_id=1)
+    repo.retweet_post(created[4].id, user_id=2)
+
+    assert [row.id for row in repo.feed_candidates([2, 3])] == [post.id for post in reversed(created) if post.owner_id != 1]
+    assert [row.id for row in repo.feed_candidates([2, 3], after=created[3].id, limit=1)] == [created[5].id]
+    assert [row.id for row in repo.trending_candidates(after=0, limit=2)] == [created[4].id, created[1].id]
+    assert repo.affinity(1, [1, 2, 3]) == {2: 2}
+
+    rows = repo.get_posts_with_counts_by_ids(1, [created[4].id, created[0].id])
+    assert [row["id"] for row in rows] == [created[4].id, created[0].id]
+    assert [row["owner_username"] for row in rows] == ["user2", "user1"]
+    assert (rows[0]["likes_count"], rows[0]["retweets_count"], rows[1]["is_owner"]) == (1, 1, True)
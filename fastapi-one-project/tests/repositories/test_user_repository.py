@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.core.cache import user_cache
+from app.repositories.user_repository import UserRepository
+
+def test_cached_users_leave_out_password_hashes(db_session):
+    repo = UserRepository(db_session)
+    user = repo.create(username="cached", email="cached@example.com", hashed_password="secret-hash")
+    repo.get_by_username_cached("cached")
+
+    cached = repo.get_by_username_cached("cached")
+
+    assert (cached.id, cached.email) == (user.id, "cached@example.com")
+    assert user_cache.local.get("users:username:cached") is not None
+    assert "hashed_password" not in user_cache.local.get("users:username:cached")
+
+def test_user_writes_invalidate_username_entries(db_session):
+    repo = UserRepository(db_session)
+    user_id = repo.create(username="before", email="before@example.com", hashed_password="x").id
+    repo.get_by_username_cached("before")
+
+    repo.update(user_id, username="after")
+
+    assert repo.get_by_username_cached("before") is None
+    assert repo.get_by_username_cached("after").id == user_id
+
+def test_conflicting_field_matches_constraint_names_exactly(db_session):
+    repo = UserRepository(db_session)
+    repo.create(username="taken", email="taken@example.com", hashed_password="x")
+    with pytest.raises(IntegrityError) as raised:
+        repo.create(username="other", email="taken@example.com", hashed_password="x")
+    db_session.rollback()
+    assert UserRepository.conflicting_field(raised.value) == "email"
+
+    def error(message):
+        return IntegrityError("INSERT", {}, Exception(message))
+
+    assert UserRepository.conflicting_field(error('duplicate key value violates unique constraint "ix_users_username"')) == "username"
+    assert UserRepository.conflicting_field(error("UNIQUE constraint failed: users.email_verified_username")) is None
+    assert UserRepository.conflicting_field(error('violates unique constraint "ix_profiles_email"')) is None
@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.security import verify_password
+from app.core.sharding import ShardRouter
+from app.models import Follow, Like, Post, User, UserStats
+from app.services.bulk_loader import BulkLoader
+
+def secondary_indexes(engine):
+    inspector = inspect(engine)
+    return {index["name"] for table in ("users", "posts", "likes", "retweets") for index in inspector.get_indexes(table)}
+
+@pytest.fixture
+def engine(db_session):
+    return db_session.get_bind()
+
+def records():
+    start = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    yield {"type": "user", "id": 1, "username": "alice", "email": "alice@example.com", "password": "secret-1"}
+    yield {"type": "user", "id": 2, "username": "bob", "email": "bob@example.com", "password": "secret-2"}
+    yield {"type": "user", "id": 3, "username": "carol", "email": "carol@example.com", "hashed_password": "already-hashed"}
+    for minute in range(5):
+        yield {"type": "post", "content": f"post {minute}", "owner_id": minute % 2 + 1,
+               "timestamp": (start + timedelta(minutes=minute)).isoformat()}
+    yield {"type": "post", "id": 7, "content": "with id", "owner_id": 3}
+    yield {"type": "follow", "follower_id": 2, "followee_id": 1}
+    yield {"type": "follow", "follower_id": 3, "followee_id": 1}
+    yield {"type": "like", "user_id": 2, "post_id": 7}
+    yield {"type": "checkpoint", "cursor": "ignored"}
+
+def test_load_writes_every_table_in_chunks(db_session, engine):
+    indexes = secondary_indexes(engine)
+    progress = []
+    loader = BulkLoader(engine, ShardRouter(), chunk_size=2, hash_workers=2, progress=lambda *args: progress.append(args[:2]))
+
+    report = loader.load(records())
+
+    assert report.rows == {"users": 3, "posts": 6, "follows": 2, "likes": 1, "retweets": 0}
+    assert report.rows_per_second > 0
+    assert ("posts", 6) in progress and ("posts", 2) in progress
+    users = {user.username: user for user in db_session.scalars(select(User))}
+    assert verify_password("secret-2", users["bob"].hashed_password)
+    assert users["carol"].hashed_password == "already-hashed"
+    # Imported posts get ids in timestamp order, so feeds show them where they belong
+    contents = db_session.scalars(select(Post.content).where(Post.id != 7).order_by(Post.id.desc())).all()
+    assert contents == ["post 4", "post 3", "post 2", "post 1", "post 0"]
+    assert db_session.scalar(select(Post.timestamp).where(Post.content == "post 0")).year == 2024
+    assert len(db_session.execute(select(Follow)).all()) == 2
+    assert db_session.get(Like, (2, 7)) is not None
+    stats = db_session.get(UserStats, 1)
+    assert (stats.posts_count, stats.followers_count) == (3, 2)
+    assert db_session.get(UserStats, 3).likes_received == 1
+    assert secondary_indexes(engine) == indexes
+
+def test_parents_are_written_before_their_children(engine):
+    progress = []
+    rows = [
+        {"type": "user", "id": 1, "username": "alice", "email": "alice@example.com", "password": "secret-1"},
+        {"type": "user", "id": 2, "username": "bob", "email": "bob@example.com", "hashed_password": "x"},
+        {"type": "post", "id": 7, "content": "liked", "owner_id": 1},
+        {"type": "like", "user_id": 1, "post_id": 7},
+        {"type": "like", "user_id": 2, "post_id": 7},
+    ]
+
+    # The likes chunk fills up while the post and the hashing users are still pending
+    BulkLoader(engine, ShardRouter(), chunk_size=2, hash_workers=1, rebuild_stats=False,
+               progress=lambda *args: progress.append(args[:2])).load(rows)
+
+    assert progress == [("users", 2), ("posts", 1), ("likes", 2)]
+
+def test_shared_password_hashes_hash_each_password_once(db_session, engine):
+    users = [
+        {"type": "user", "username": f"user{i}", "email": f"user{i}@example.com", "password": "fixture"}
+        for i in range(4)
+    ]
+
+    BulkLoader(engine, ShardRouter(), chunk_size=3, hash_workers=1, share_password_hashes=True).load(users)
+
+    hashes = set(db_session.scalars(select(User.hashed_password)))
+    assert len(hashes) == 1
+    assert verify_password("fixture", hashes.pop())
+
+def test_failed_load_keeps_committed_chunks_and_restores_indexes(db_session, engine):
+    indexes = secondary_indexes(engine)
+    rows = [
+        {"type": "user", "username": name, "email": f"{name}{i}@example.com", "hashed_password": "x"}
+        for i, name in enumerate(["alice", "bob", "carol", "alice"])
+    ]
+
+    with pytest.raises(IntegrityError):
+        BulkLoader(engine, ShardRouter(), chunk_size=2, hash_workers=1).load(rows)
+
+    assert set(db_session.scalars(select(User.username))) == {"alice", "bob"}
+    assert secondary_indexes(engine) == indexes
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() != 0
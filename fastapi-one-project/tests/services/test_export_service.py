@@ -0,0 +1,123 @@
+import gzip
+import json
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import create_db_engine
+from app.core.sharding import ShardRouter
+from app.models import Follow, Like, Post, User
+from app.repositories.export_repository import ExportRepository
+from app.services.export_service import Checkpoint, ExportService, export_to_file
+
+@pytest.fixture
+def dataset(db_session):
+    for user_id in range(1, 5):
+        db_session.add(User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", hashed_password="x"))
+    for post_id in range(1, 6):
+        db_session.add(Post(id=post_id, content=f"post {post_id}", owner_id=post_id % 4 + 1))
+    db_session.flush()
+    db_session.execute(insert(Like), [{"user_id": user_id, "post_id": post_id} for user_id in (1, 2) for post_id in (1, 2, 3)])
+    db_session.execute(insert(Follow), [{"follower_id": 1, "followee_id": 2}, {"follower_id": 3, "followee_id": 1}])
+    db_session.commit()
+
+@pytest.fixture
+def service(db_session, dataset):
+    return ExportService(sessionmaker(bind=db_session.get_bind()), ShardRouter(), batch_size=2, checkpoint_rows=2)
+
+def lines(chunks):
+    return [json.loads(line) for line in b"".join(c for c in chunks if not isinstance(c, Checkpoint)).splitlines()]
+
+def rows(records):
+    return [record for record in records if record["type"] not in ("checkpoint", "done")]
+
+def test_export_streams_every_row_with_checkpoints(service):
+    records = lines(service.export(["posts", "likes", "follows"]))
+
+    exported = rows(records)
+    assert [row["id"] for row in exported if row["type"] == "post"] == [1, 2, 3, 4, 5]
+    assert len([row for row in exported if row["type"] == "like"]) == 6
+    assert {"type": "follow", "follower_id": 3, "followee_id": 1} in exported
+    assert "timestamp" in exported[0]
+    assert sum(record["type"] == "checkpoint" for record in records) >= 3
+    assert records[-1] == {"type": "done", "rows": 13}
+
+def test_repository_fetches_in_batches(db_session, dataset):
+    batches = list(ExportRepository(db_session).stream("likes", after=[1, 2], batch_size=2))
+
+    assert [[(row["user_id"], row["post_id"]) for row in batch] for batch in batches] == [[(1, 3), (2, 1)], [(2, 2), (2, 3)]]
+
+def test_resuming_from_any_checkpoint_exports_the_rest_once(service):
+    entities = ["posts", "likes"]
+    full = service.export(entities)
+    checkpoints = [chunk.cursor for chunk in full if isinstance(chunk, Checkpoint)]
+    everything = rows(lines(service.export(entities)))
+
+    for cursor in checkpoints:
+        head = []
+        for chunk in service.export(entities):
+            if isinstance(chunk, Checkpoint):
+                if chunk.cursor == cursor:
+                    break
+            else:
+                head.append(chunk)
+        assert rows(lines(head)) + rows(lines(service.export(entities, cursor))) == everything
+
+def test_cursor_must_match_the_export(service):
+    cursor = next(chunk.cursor for chunk in service.export(["posts"]) if isinstance(chunk, Checkpoint))
+
+    with pytest.raises(Exception) as error:
+        service.export(["likes"], cursor)
+    assert error.value.status_code == 400
+    with pytest.raises(Exception) as error:
+        service.export(["posts"], "not-a-cursor")
+    assert error.value.detail == "Invalid export cursor"
+
+def test_interrupted_gzip_file_export_resumes(service, tmp_path, monkeypatch):
+    path = str(tmp_path / "export.ndjson.gz")
+    export = service.export
+    calls = []
+
+    def interrupted(entities, cursor=None, compress=False):
+        # The first run dies after its second checkpoint, mid-way through a gzip member
+        chunks = export(entities, cursor, compress)
+        if calls:
+            return chunks
+        calls.append(cursor)
+
+        def generate():
+            seen = 0
+            for chunk in chunks:
+                yield chunk
+                seen += isinstance(chunk, Checkpoint)
+                if seen == 2:
+                    yield b"\x1f\x8b partial member"
+                    raise KeyboardInterrupt
+        return generate()
+
+    monkeypatch.setattr(service, "export", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        export_to_file(service, path, ["posts", "likes"], compress=True)
+    export_to_file(service, path, ["posts", "likes"], compress=True, resume=True)
+
+    with gzip.open(path) as output:
+        records = [json.loads(line) for line in output]
+    assert rows(records) == rows(lines(export(["posts", "likes"])))
+    assert records[-1]["type"] == "done"
+    assert not (tmp_path / "export.ndjson.gz.checkpoint").exists()
+
+def test_sharded_tables_are_exported_from_every_shard(db_session, tmp_path):
+    router = ShardRouter([create_db_engine(f"sqlite:///{tmp_path / f'shard{index}.db'}") for index in range(2)])
+    router.create_tables()
+    for shard in range(2):
+        with router.session(shard) as db:
+            db.add(Post(id=shard + 10, content=f"on shard {shard}", owner_id=shard))
+            db.commit()
+    service = ExportService(sessionmaker(bind=db_session.get_bind()), router)
+
+    records = rows(lines(service.export(["posts"])))
+
+    assert [record["content"] for record in records] == ["on shard 0", "on shard 1"]
+    for shard in router.shards:
+        shard.dispose()
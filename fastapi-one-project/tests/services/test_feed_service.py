@@ -0,0 +1,115 @@
+import time
+import numpy as np
+import pytest
+
+from app.core.cache import LRUCache
+from app.core.ids import id_at
+from app.core.metrics import metrics
+from app.models import Follow, Like, Post, User
+from app.repositories.post_repository import PostRepository
+from app.repositories.user_repository import UserRepository
+from app.services.feed_service import FeedService, FeedWeights, score_candidates
+
+HOUR_MS = 3_600_000
+WEIGHTS = FeedWeights(recency=1.0, velocity=0.6, affinity=0.4, followed=0.5, half_life_hours=6.0)
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def feed(db_session, clock):
+    for user_id in range(1, 5):
+        db_session.add(User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", hashed_password="x"))
+    # user1 follows user2 and user3; user4 is a stranger
+    db_session.execute(Follow.insert(), [{"follower_id": 1, "followee_id": 2}, {"follower_id": 1, "followee_id": 3}])
+    db_session.commit()
+    return FeedService(
+        PostRepository(db_session), UserRepository(db_session), cache=LRUCache(100, clock), clock=clock, weights=WEIGHTS
+    )
+
+def add_post(db_session, clock, owner_id, hours_ago, sequence=0):
+    post = Post(id=id_at(int((clock.now - hours_ago * 3600) * 1000), sequence=sequence), owner_id=owner_id, content="post")
+    db_session.add(post)
+    db_session.commit()
+    return post.id
+
+def test_scores_decay_with_age_and_rise_with_engagement():
+    now_ms = 1_800_000_000_000
+    ids = np.array([id_at(now_ms), id_at(now_ms - 6 * HOUR_MS), id_at(now_ms - 6 * HOUR_MS), id_at(now_ms)], dtype=np.int64)
+    zeros = np.zeros(4)
+
+    scores = score_candidates(ids, np.array([0, 0, 40, 0.0]), zeros, np.array([0, 0, 0, 1.0]), zeros, now_ms, WEIGHTS)
+
+    # One half-life halves the recency score
+    assert scores[0] == pytest.approx(1.0)
+    assert scores[1] == pytest.approx(0.5)
+    # Engagement lifts an older post; following the author lifts a post by the followed weight
+    assert scores[2] > scores[0]
+    assert scores[3] == pytest.approx(1.5)
+
+def test_ranks_followed_and_trending_posts_without_the_readers_own(feed, db_session, clock):
+    old_followed = add_post(db_session, clock, owner_id=2, hours_ago=20)
+    new_followed = add_post(db_session, clock, owner_id=3, hours_ago=1)
+    trending = add_post(db_session, clock, owner_id=4, hours_ago=2)
+    own = add_post(db_session, clock, owner_id=1, hours_ago=0.5)
+    db_session.add_all([Like(user_id=user_id, post_id=trending) for user_id in range(5, 30)] + [Like(user_id=1, post_id=own)])
+    db_session.commit()
+
+    page = feed.get_for_you(1)
+
+    assert [row.id for row in page] == [trending, new_followed, old_followed]
+    assert page[0].owner_username == "user4"
+    assert page[0].likes_count == 25
+    assert [row.id for row in feed.get_for_you(1, skip=1, limit=1)] == [new_followed]
+
+def test_serves_refreshes_and_rebuilds_the_cached_ranking(feed, db_session, clock, count_queries):
+    first = add_post(db_session, clock, owner_id=2, hours_ago=1)
+    feed.get_for_you(1)
+
+    with count_queries() as statements:
+        feed.get_for_you(1)
+    # Only the page is read
+    assert len(statements) == 1
+
+    second = add_post(db_session, clock, owner_id=3, hours_ago=0)
+    assert [row.id for row in feed.get_for_you(1)] == [first]
+    clock.now += 31
+    hits = metrics.counter("feed_ranking_requests_total", path="refresh")
+    with count_queries() as statements:
+        assert [row.id for row in feed.get_for_you(1)] == [second, first]
+    # Follows, the new posts after the watermark, then the page
+    assert len(statements) == 3
+    assert metrics.counter("feed_ranking_requests_total", path="refresh") == hits + 1
+
+    # A new follow changes the candidates, so the ranking is built again
+    stranger = add_post(db_session, clock, owner_id=4, hours_ago=0)
+    db_session.execute(Follow.insert().values(follower_id=1, followee_id=4))
+    db_session.commit()
+    clock.now += 31
+    assert stranger in [row.id for row in feed.get_for_you(1)]
+
+def test_over_budget_skips_optional_stages_and_rebuilds_next_time(feed, db_session, clock):
+    followed = add_post(db_session, clock, owner_id=2, hours_ago=1)
+    add_post(db_session, clock, owner_id=4, hours_ago=1, sequence=1)
+    feed.latency_budget_ms = 0
+    degraded = metrics.counter("feed_ranking_degraded_total", stage="trending")
+
+    assert [row.id for row in feed.get_for_you(1)] == [followed]
+    assert metrics.counter("feed_ranking_degraded_total", stage="trending") == degraded + 1
+
+    feed.latency_budget_ms = 1000
+    clock.now += 31
+    assert len(feed.get_for_you(1)) == 2
+
+def test_falls_back_to_the_chronological_feed(feed, db_session, clock):
+    own = add_post(db_session, clock, owner_id=1, hours_ago=100)
+
+    assert [row.id for row in feed.get_for_you(1)] == [own]
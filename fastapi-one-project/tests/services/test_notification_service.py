@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Notification, NotificationActor, NotificationCounter, User
+from app.repositories.notification_repository import NotificationRepository
+from app.services.notification_service import MENTION_PATTERN, generate_notifications
+
+@pytest.fixture
+def users(db_session):
+    for user_id in range(1, 46):
+        db_session.add(User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", hashed_password="x"))
+    db_session.commit()
+
+def like(actor_id, post_id=100, recipient_id=1):
+    return {"kind": "like", "recipient_id": recipient_id, "actor_id": actor_id, "post_id": post_id}
+
+def follow(actor_id, recipient_id=1):
+    return {"kind": "follow", "recipient_id": recipient_id, "actor_id": actor_id}
+
+def test_burst_of_likes_becomes_one_grouped_row(db_session, users):
+    generate_notifications(db_session, [like(actor_id) for actor_id in range(2, 44)])
+    db_session.commit()
+
+    [row] = db_session.scalars(select(Notification)).all()
+    assert row.actor_count == 42
+    assert row.actor_username == "user43"
+    assert NotificationRepository(db_session).unread_count(1) == 1
+
+def test_later_events_fold_into_the_unread_row_and_move_it_up(db_session, users):
+    generate_notifications(db_session, [like(2, post_id=100), like(3, post_id=200)])
+    db_session.commit()
+    first = {row.post_id: row.sort_key for row in db_session.scalars(select(Notification))}
+
+    generate_notifications(db_session, [like(4, post_id=100), like(4, post_id=100)])
+    db_session.commit()
+
+    inbox = NotificationRepository(db_session).get_inbox(1)
+    assert [(row.post_id, row.actor_count) for row in inbox] == [(100, 2), (200, 1)]
+    assert inbox[0].sort_key > first[100]
+    assert db_session.get(NotificationCounter, 1).unread == 2
+
+def test_actors_are_counted_once_across_batches(db_session, users):
+    generate_notifications(db_session, [like(2), like(3)])
+    db_session.commit()
+    before = db_session.scalar(select(Notification.sort_key))
+
+    # user2 unliked and liked again, after user3
+    generate_notifications(db_session, [like(2)])
+    db_session.commit()
+    generate_notifications(db_session, [like(2), like(4)])
+    db_session.commit()
+
+    [row] = db_session.scalars(select(Notification)).all()
+    assert (row.actor_count, row.actor_username) == (3, "user4")
+    assert row.sort_key > before
+
+def test_follows_fold_into_one_unread_row(db_session, users):
+    generate_notifications(db_session, [follow(2)])
+    db_session.commit()
+    generate_notifications(db_session, [follow(3)])
+    db_session.commit()
+
+    assert [row.actor_count for row in db_session.scalars(select(Notification))] == [2]
+    assert db_session.get(NotificationCounter, 1).unread == 1
+
+def test_unread_group_has_a_single_row(db_session, users):
+    generate_notifications(db_session, [like(2)])
+    db_session.commit()
+
+    db_session.add(Notification(user_id=1, kind="like", post_id=100, sort_key=1, last_actor_id=3))
+    with pytest.raises(IntegrityError):
+        db_session.commit()
+
+def test_read_rows_start_a_new_group(db_session, users):
+    repo = NotificationRepository(db_session)
+    generate_notifications(db_session, [like(2)])
+    db_session.commit()
+
+    assert repo.mark_read(1) == 0
+    generate_notifications(db_session, [like(3)])
+    db_session.commit()
+
+    assert [row.actor_count for row in repo.get_inbox(1)] == [1, 1]
+    assert repo.unread_count(1) == 1
+    # Only the unread row keeps its actors
+    assert db_session.scalar(select(func.count()).select_from(NotificationActor)) == 1
+
+def test_mentions_resolve_usernames_and_skip_the_author(db_session, users):
+    generate_notifications(db_session, [
+        {"kind": "mention", "usernames": ["user2", "user3", "nobody"], "actor_id": 3, "post_id": 100},
+    ])
+    db_session.commit()
+
+    assert [(row.user_id, row.kind) for row in db_session.scalars(select(Notification))] == [(2, "mention")]
+
+def test_mention_pattern_ignores_email_addresses():
+    assert MENTION_PATTERN.findall("hi @alice and @bob_2, mail me at carol@example.com") == ["alice", "bob_2"]
@@ -0,0 +1,132 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Job, Post, ScheduledPost, User, UserStats
+from app.repositories.scheduled_post_repository import ScheduledPostRepository
+from app.services.post_scheduler import PostScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_800_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def make_scheduler(db_session, clock):
+    db_session.add_all([
+        User(id=1, username="alice", email="alice@example.com", hashed_password="x"),
+        User(id=2, username="bob", email="bob@example.com", hashed_password="x"),
+    ])
+    db_session.commit()
+    session_factory = sessionmaker(bind=db_session.get_bind())
+
+    def make(worker_id="worker-a"):
+        return PostScheduler(session_factory, lookahead_seconds=300, scan_seconds=60, lease_seconds=60, worker_id=worker_id, clock=clock)
+
+    return make
+
+def schedule(db_session, clock, in_seconds, content="later", owner_id=1):
+    return ScheduledPostRepository(db_session).create(
+        owner_id=owner_id, content=content, status="scheduled", publish_at=clock.now + in_seconds, created_at=clock.now
+    ).id
+
+def test_scan_leases_only_posts_inside_the_window(make_scheduler, db_session, clock, count_queries):
+    scheduler = make_scheduler()
+    soon, late = schedule(db_session, clock, 10), schedule(db_session, clock, 3600)
+
+    with count_queries() as statements:
+        assert scheduler.scan() == 1
+    # One UPDATE ... RETURNING leases the batch
+    assert len([statement for statement in statements if statement.startswith("UPDATE")]) == 1
+    assert len(scheduler) == 1
+    row = db_session.get(ScheduledPost, soon)
+    assert (row.locked_by, row.locked_until) == ("worker-a", clock.now + 10 + 60)
+    assert db_session.get(ScheduledPost, late).locked_by is None
+    # A live lease keeps the post off every other worker's heap
+    assert make_scheduler("worker-b").scan() == 0
+
+def test_due_posts_go_through_the_create_path(make_scheduler, db_session, clock):
+    scheduler = make_scheduler()
+    scheduled_id = schedule(db_session, clock, 10, content="hello @bob")
+    scheduler.scan()
+
+    assert scheduler.publish_due() == 0
+    clock.now += 10
+    assert scheduler.publish_due() == 1
+
+    db_session.expire_all()
+    post = db_session.scalars(select(Post)).one()
+    assert (post.owner_id, post.content) == (1, "hello @bob")
+    row = db_session.get(ScheduledPost, scheduled_id)
+    assert (row.status, row.post_id, row.locked_by) == ("published", post.id, None)
+    # Counters and the mention notification, as for a post created by hand
+    assert db_session.get(UserStats, 1).posts_count == 1
+    assert db_session.scalar(select(func.count()).select_from(Job).where(Job.kind == "notify")) == 1
+    # Publishing is once only
+    assert scheduler.publish(scheduled_id) is None
+
+def test_cancelled_and_taken_over_posts_are_skipped(make_scheduler, db_session, clock):
+    scheduler = make_scheduler()
+    cancelled = schedule(db_session, clock, 10)
+    taken_over = schedule(db_session, clock, 10)
+    scheduler.scan()
+    assert ScheduledPostRepository(db_session).cancel(cancelled, owner_id=1) is True
+    assert ScheduledPostRepository(db_session).cancel(cancelled, owner_id=1) is False
+
+    # worker-a stalls past its lease; the recovery scan of worker-b takes the post over
+    clock.now += 10 + 61
+    assert make_scheduler("worker-b").scan() == 1
+    assert scheduler.publish_due() == 2
+
+    db_session.expire_all()
+    assert db_session.scalar(select(func.count()).select_from(Post)) == 0
+    assert db_session.get(ScheduledPost, taken_over).locked_by == "worker-b"
+
+def test_late_posts_publish_at_once_and_released_posts_are_taken_over(make_scheduler, db_session, clock):
+    scheduler = make_scheduler()
+    missed = schedule(db_session, clock, -120)
+    held = schedule(db_session, clock, 100)
+    scheduler.scan()
+
+    assert scheduler.publish_due() == 1
+    ScheduledPostRepository(db_session).release("worker-a")
+    db_session.expire_all()
+    assert db_session.get(ScheduledPost, missed).status == "published"
+    assert db_session.get(ScheduledPost, held).locked_by is None
+    assert make_scheduler("worker-b").scan() == 1
+
+def test_running_scheduler_wakes_for_the_earliest_post(db_session):
+    db_session.add(User(id=1, username="alice", email="alice@example.com", hashed_password="x"))
+    db_session.commit()
+    scheduler = PostScheduler(sessionmaker(bind=db_session.get_bind()), scan_seconds=60, worker_id="worker-a")
+
+    async def scenario():
+        await scheduler.start()
+        publish_at = time.time() + 0.05
+        locked_until = scheduler.lease_for(publish_at)
+        scheduled = ScheduledPostRepository(db_session).create(
+            owner_id=1, content="on time", status="scheduled", publish_at=publish_at,
+            locked_by=scheduler.worker_id, locked_until=locked_until, created_at=time.time(),
+        )
+        scheduler.add(scheduled.id, publish_at)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if not len(scheduler) and db_session.scalar(select(func.count()).select_from(Post)):
+                break
+        published_at = time.time()
+        await scheduler.stop()
+        return publish_at, published_at
+
+    publish_at, published_at = asyncio.run(scenario())
+
+    assert db_session.scalar(select(func.count()).select_from(Post)) == 1
+    assert published_at - publish_at < 0.5
+    assert not scheduler.running
@@ -0,0 +1,19 @@
+import pytest
+from app.core.security import verify_password
+from app.models import User
+from app.repositories.user_repository import UserRepository
+from app.services.user_service import UserService
+
+def test_import_users_in_chunks(db_session):
+    service = UserService(UserRepository(db_session))
+    users = [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "password": f"password{i}"}
+        for i in range(5)
+    ]
+
+    imported = service.import_users(users, chunk_size=2, max_workers=2)
+
+    assert imported == 5
+    assert db_session.query(User).count() == 5
+    user = UserRepository(db_session).get_by_username("user3")
+    assert verify_password("password3", user.hashed_password)
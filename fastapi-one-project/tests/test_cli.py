@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+
+def test_load_leases_a_worker_id(tmp_path):
+    records = tmp_path / "records.ndjson"
+    records.write_text("\n".join(json.dumps(record) for record in [
+        {"type": "user", "id": 1, "username": "alice", "email": "alice@example.com", "hashed_password": "x"},
+        {"type": "post", "content": "no id or timestamp", "owner_id": 1},
+        {"type": "retweet", "user_id": 1, "post_id": 7},
+        {"type": "post", "id": 7, "content": "with id", "owner_id": 1},
+    ]))
+    # A separate process, so conftest's SNOWFLAKE_WORKER_ID doesn't apply
+    env = {"SQLALCHEMY_DATABASE_URL": f"sqlite:///{tmp_path / 'cli.db'}", "PATH": ""}
+
+    subprocess.run(
+        [sys.executable, "-m", "app.cli", "load", str(records), "--hash-workers", "1"],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+
+    with create_engine(f"sqlite:///{tmp_path / 'cli.db'}").connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM posts WHERE id != 7")).scalar() == 1
+        assert conn.execute(text("SELECT id FROM retweets")).scalar() is not None
+        # Released once the load is done
+        assert conn.execute(text("SELECT max(expires_at) FROM worker_leases")).scalar() == 0
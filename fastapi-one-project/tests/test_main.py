@@ -0,0 +1,31 @@
+from app.main import static_assets
+
+def test_landing_page_links_hashed_assets(client):
+    response = client.get("/")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
+    assert static_assets.url("css/styles.css") in response.text
+    assert static_assets.url("js/app.js") in response.text
+    assert client.get(static_assets.url("js/app.js")).status_code == 200
+
+def test_landing_page_is_cached_with_etag(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+    cached = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+
+    assert cached.status_code == 304
+
+def test_range_requests_pass_through_compression(client):
+    url = static_assets.url("css/styles.css")
+    full = client.get(url, headers={"Accept-Encoding": "identity"})
+
+    partial = client.get(url, headers={"Range": "bytes=0-2047", "Accept-Encoding": "gzip"})
+
+    assert partial.status_code == 206
+    assert "content-encoding" not in partial.headers
+    assert partial.headers["content-range"] == f"bytes 0-2047/{len(full.content)}"
+    assert partial.content == full.content[:2048]
+    assert not partial.headers["etag"].startswith("W/")
+    assert partial.headers["vary"] == "Accept-Encoding"